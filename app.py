@@ -10,179 +10,2598 @@ import sys
 import zipfile
 import shutil
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_from_directory, send_file, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, send_from_directory, send_file, session, redirect, url_for, flash, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 import csv
 from io import StringIO, BytesIO
 from difflib import unified_diff, SequenceMatcher
+from bisect import bisect_left
 import json
+import re
+import hashlib
+import tempfile
+import time
+import atexit
+import contextvars
+import copy
+import logging
+import logging.handlers
+import queue
+import multiprocessing
+import multiprocessing.util
+import threading
+import sqlite3
+import secrets
+import fcntl
+import mmap
+from array import array
+from contextlib import closing, contextmanager
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
-import requests
+from werkzeug.security import check_password_hash
 import base64
+from urllib.parse import quote
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'staffview-secret-key-change-in-production')
 
-# Linear Configuration
-# Set these as environment variables in production
-LINEAR_API_KEY = os.environ.get('LINEAR_API_KEY')
-LINEAR_API_URL = 'https://api.linear.app/graphql'
-LINEAR_TEAM_ID = os.environ.get('LINEAR_TEAM_ID', 'ENG')  # Default to ENG team
+# Linear Configuration
+# Set these as environment variables in production
+LINEAR_API_KEY = os.environ.get('LINEAR_API_KEY')
+LINEAR_API_URL = os.environ.get('LINEAR_API_URL', 'https://api.linear.app/graphql')
+LINEAR_TEAM_ID = os.environ.get('LINEAR_TEAM_ID', 'ENG')  # Default to ENG team
+# (connect, read) timeouts in seconds so a slow Linear API cannot pin a worker
+LINEAR_TIMEOUT = (
+    float(os.environ.get('LINEAR_CONNECT_TIMEOUT', 3.05)),
+    float(os.environ.get('LINEAR_READ_TIMEOUT', 10))
+)
+
+# Configuration
+UPLOAD_FOLDER = Path(__file__).parent / "uploads"
+UPLOAD_FOLDER.mkdir(exist_ok=True)
+
+# Use environment variable or default to uploads/extracted
+# This makes it work on both local and deployed environments
+default_artifacts = UPLOAD_FOLDER / "extracted"
+ARTIFACTS_DIR = Path(os.getenv('ARTIFACTS_DIR', str(default_artifacts)))
+
+# If default local path exists, use it (for development)
+local_dev_path = Path("/Users/yeltsinz/Downloads/regression-diffs (1)")
+if local_dev_path.exists():
+    ARTIFACTS_DIR = local_dev_path
+
+# Every uploaded bundle is extracted once into its own content-addressed
+# workspace; the registry file is shared by all gunicorn workers
+WORKSPACES_DIR = UPLOAD_FOLDER / 'workspaces'
+WORKSPACES_DIR.mkdir(exist_ok=True)
+WORKSPACE_REGISTRY = UPLOAD_FOLDER / 'workspaces.json'
+WORKSPACE_LOCK = UPLOAD_FOLDER / 'workspaces.lock'
+WORKSPACE_MAX_COUNT = int(os.environ.get('WORKSPACE_MAX_COUNT', 20))
+# Workspaces used this recently are never evicted, even above the count
+WORKSPACE_EVICT_GRACE_SECONDS = int(os.environ.get('WORKSPACE_EVICT_GRACE_SECONDS', 3600))
+# Reads refresh a workspace's last_used_at at most this often
+WORKSPACE_TOUCH_INTERVAL = 60
+
+# Directory for storing ZIP files for Linear attachments
+LINEAR_ATTACHMENTS_DIR = Path(__file__).parent / 'linear_attachments'
+LINEAR_ATTACHMENTS_DIR.mkdir(exist_ok=True)
+
+# On-disk diff result cache, shared by all gunicorn workers
+# Entries are evicted least-recently-used once the size budget is exceeded
+DIFF_CACHE_DIR = Path(os.environ.get('DIFF_CACHE_DIR', str(UPLOAD_FOLDER / 'diff_cache')))
+DIFF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+DIFF_CACHE_MAX_BYTES = int(os.environ.get('DIFF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Stats index written next to the scrolls after every upload
+STATS_INDEX_FILENAME = '.stats_index.json'
+STATS_INDEX_WORKERS = int(os.environ.get('STATS_INDEX_WORKERS', os.cpu_count() or 1))
+
+# SHA-256 of every uploaded scroll, and how each pair changed since the previous upload
+FINGERPRINTS_FILENAME = '.fingerprints.json'
+
+app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
+
+# Logging
+# Records go through a QueueHandler, so a request only appends to an
+# in-memory queue; a QueueListener thread per process does the formatting
+# and the writes. Every record carries the id of the request (or job) it
+# came from, which is also returned to clients as X-Request-ID.
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# 'json' (one object per line) or 'text'
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+# Records dropped rather than blocking the caller once the queue is full
+LOG_QUEUE_SIZE = 10000
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Client-supplied request ids are accepted only in this shape
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+log = logging.getLogger('wizardview')
+# Attributes every LogRecord has; anything else was passed in extra=
+_LOG_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'request_id'}
+_log_listener_pid = None
+
+
+class JSONLogFormatter(logging.Formatter):
+    """One JSON object per record, including fields passed in extra="""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'pid': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _LOG_RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue records with their message and traceback rendered but extra fields
+    kept as attributes, so the listener can still write them as JSON keys
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Dropped rather than blocking the request; counted so the loss shows
+            inc('wizardview_log_dropped_total', level=record.levelname)
+
+
+def configure_logging():
+    """Attach the queue handler and start this process's listener thread"""
+    global _log_listener_pid
+    if _log_listener_pid == os.getpid():
+        return
+    
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == 'json':
+        stream_handler.setFormatter(JSONLogFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'))
+    
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(_RequestIdFilter())
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    # Write out whatever is still queued when the process exits
+    atexit.register(listener.stop)
+    
+    log.handlers = [queue_handler]
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
+    _log_listener_pid = os.getpid()
+
+
+configure_logging()
+
+
+def with_request_id(func):
+    """Wrap func so records it logs from a pool thread keep the caller's request id"""
+    request_id = request_id_var.get()
+    
+    def run(*args, **kwargs):
+        request_id_var.set(request_id)
+        return func(*args, **kwargs)
+    return run
+
+
+@app.before_request
+def assign_request_id():
+    request_id = request.headers.get(REQUEST_ID_HEADER, '')
+    if not REQUEST_ID_RE.match(request_id):
+        request_id = secrets.token_hex(8)
+    g.request_id = request_id
+    request_id_var.set(request_id)
+
+
+@app.after_request
+def send_request_id(response):
+    response.headers[REQUEST_ID_HEADER] = g.get('request_id', '-')
+    return response
+
+
+# Metrics
+# Counters and latency histograms kept per process and flushed to
+# METRICS_DIR/<pid>.json; /metrics adds up the files of every gunicorn
+# worker and diff pool process and renders the Prometheus text format.
+
+METRICS_DIR = Path(os.environ.get('METRICS_DIR', str(UPLOAD_FOLDER / 'metrics')))
+METRICS_DIR.mkdir(parents=True, exist_ok=True)
+# Bearer token /metrics requires when set
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# A process writes its file at most this often, and when it exits
+METRICS_FLUSH_SECONDS = 2.0
+# Histogram bucket upper bounds in seconds
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_HELP = {
+    'wizardview_request_seconds': ('histogram', 'Request latency by endpoint'),
+    'wizardview_response_bytes_total': ('counter', 'Response body bytes sent by endpoint and encoding'),
+    'wizardview_scroll_read_seconds': ('histogram', 'Scroll reads: line index builds and whole-file reads'),
+    'wizardview_scroll_read_bytes_total': ('counter', 'Scroll bytes read by operation'),
+    'wizardview_diff_seconds': ('histogram', 'Line and cell diff computation by engine'),
+    'wizardview_json_seconds': ('histogram', 'JSON response serialization'),
+    'wizardview_zip_seconds': ('histogram', 'ZIP extraction and creation by operation'),
+    'wizardview_zip_bytes_total': ('counter', 'Bytes extracted from uploads and written to attachment ZIPs'),
+    'wizardview_downloads_total': ('counter', 'File downloads by how they were sent (send_file or nginx offload)'),
+    'wizardview_blob_bytes_total': ('counter', 'Extracted scroll bytes newly stored or already in the blob store'),
+    'wizardview_linear_request_seconds': ('histogram', 'Linear GraphQL calls by operation and outcome'),
+    'wizardview_cache_requests_total': ('counter', 'Cache lookups by cache and result (hit or miss)'),
+    'wizardview_warm_up_seconds': ('histogram', 'Worker warm-up before accepting connections'),
+    'wizardview_log_dropped_total': ('counter', 'Log records dropped by level because the log queue was full'),
+}
+
+_metrics_lock = threading.Lock()
+_metrics = {'counters': {}, 'histograms': {}}
+# PID the counters belong to; a forked child starts from zero
+_metrics_pid = None
+_metrics_flushed_at = 0.0
+
+
+def _metric_key(name, labels):
+    """'name{label="value",...}' with labels sorted, used as the series key"""
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}="{labels[k]}"' for k in sorted(labels)) + '}'
+
+
+def _own_metrics():
+    global _metrics, _metrics_pid
+    if _metrics_pid != os.getpid():
+        _metrics = {'counters': {}, 'histograms': {}}
+        _metrics_pid = os.getpid()
+        # Runs when a gunicorn worker or a pool process exits normally
+        multiprocessing.util.Finalize(None, flush_metrics, exitpriority=10)
+    return _metrics
+
+
+def inc(name, value=1, **labels):
+    """Add to a counter"""
+    with _metrics_lock:
+        counters = _own_metrics()['counters']
+        key = _metric_key(name, labels)
+        counters[key] = counters.get(key, 0) + value
+    _maybe_flush_metrics()
+
+
+def observe(name, seconds, **labels):
+    """Record one duration in a histogram: [count per bucket..., +Inf count, sum]"""
+    with _metrics_lock:
+        histograms = _own_metrics()['histograms']
+        key = _metric_key(name, labels)
+        series = histograms.get(key)
+        if series is None:
+            series = histograms[key] = [0] * (len(METRICS_BUCKETS) + 1) + [0.0]
+        series[bisect_left(METRICS_BUCKETS, seconds)] += 1
+        series[-1] += seconds
+    _maybe_flush_metrics()
+
+
+@contextmanager
+def timed(name, **labels):
+    """Observe the duration of a with block"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def flush_metrics():
+    """Write this process's metrics file"""
+    global _metrics_flushed_at
+    with _metrics_lock:
+        if _metrics_pid != os.getpid():
+            return
+        snapshot = json.dumps(_metrics)
+        _metrics_flushed_at = time.time()
+    path = METRICS_DIR / f"{os.getpid()}.json"
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, prefix='.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _maybe_flush_metrics():
+    if time.time() - _metrics_flushed_at >= METRICS_FLUSH_SECONDS:
+        flush_metrics()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge_metrics(total, snapshot):
+    for key, value in snapshot['counters'].items():
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for key, series in snapshot['histograms'].items():
+        current = total['histograms'].get(key)
+        total['histograms'][key] = series if current is None else [a + b for a, b in zip(current, series)]
+
+
+def collect_metrics():
+    """
+    Metrics of every process that wrote a file
+    Files of processes that have exited are folded into archive.json, so
+    totals survive restarts of the diff pool without the files piling up.
+    """
+    flush_metrics()
+    total = {'counters': {}, 'histograms': {}}
+    with open(METRICS_DIR / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = METRICS_DIR / 'archive.json'
+        try:
+            archive = json.loads(archive_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            archive = {'counters': {}, 'histograms': {}}
+        
+        retired = []
+        for path in METRICS_DIR.glob('[0-9]*.json'):
+            try:
+                snapshot = json.loads(path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            if _pid_alive(int(path.stem)):
+                _merge_metrics(total, snapshot)
+            else:
+                _merge_metrics(archive, snapshot)
+                retired.append(path)
+        
+        if retired:
+            tmp_path = archive_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(archive), encoding='utf-8')
+            os.replace(tmp_path, archive_path)
+            for path in retired:
+                path.unlink(missing_ok=True)
+    _merge_metrics(total, archive)
+    return total
+
+
+def render_metrics(metrics):
+    """Prometheus text exposition format"""
+    series_by_name = {}
+    for kind in ('counters', 'histograms'):
+        for key, value in metrics[kind].items():
+            name, _, labels = key.partition('{')
+            series_by_name.setdefault(name, []).append((labels.rstrip('}'), value))
+    
+    lines = []
+    for name in sorted(series_by_name):
+        kind, help_text = METRIC_HELP.get(name, ('untyped', ''))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series_by_name[name]):
+            if kind != 'histogram':
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+                continue
+            prefix = labels + ',' if labels else ''
+            cumulative = 0
+            for bound, count in zip(METRICS_BUCKETS + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ''
+            lines.append(f"{name}_sum{suffix} {value[-1]:.6f}")
+            lines.append(f"{name}_count{suffix} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, timing every serialization"""
+
+    def dumps(self, obj, **kwargs):
+        with timed('wizardview_json_seconds'):
+            return super().dumps(obj, **kwargs)
+
+
+app.json = TimedJSONProvider(app)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    Latency and body size per route; registered before compress_response,
+    so it runs after it and counts the bytes actually sent. Streamed
+    responses are timed up to their first byte and their size is unknown.
+    """
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    start = g.get('request_start')
+    if start is not None:
+        observe('wizardview_request_seconds', time.perf_counter() - start,
+                endpoint=endpoint, method=request.method)
+    if response.content_length is not None:
+        inc('wizardview_response_bytes_total', response.content_length, endpoint=endpoint,
+            encoding=response.headers.get('Content-Encoding', 'identity'))
+    return response
+
+
+# Simple user storage (in production, use a database)
+# Password is hashed using werkzeug.security. The hash is precomputed because
+# scrypt takes about 0.1s, which every worker paid at import. Regenerate with
+# python -c "from werkzeug.security import generate_password_hash as g; print(g('...'))"
+# or set WIZARDVIEW_PASSWORD_HASH to rotate the password without a deploy.
+USERS = {
+    'sdet-team@drivetrain.ai': os.environ.get(
+        'WIZARDVIEW_PASSWORD_HASH',
+        'scrypt:32768:8:1$68kMK59h4JeJsvZS$7a2838bbef4109e07aab2fb366757df19cbc94d1bf972d1ffbfa37b282d5dd533a2eba34a9a3a8c9b474cf1e3b025d3c955aad7b73c07d713f9c6a7d8f8980d0'
+    ),
+}
+
+# Login required decorator
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'logged_in' not in session:
+            return redirect(url_for('login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def extract_artifact(zip_path, extract_to):
+    """Extract scroll bundle zip file"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(extract_to)
+    return extract_to
+
+
+# Bytes copied per read when streaming members out of an uploaded bundle
+INGEST_CHUNK_SIZE = 256 * 1024
+
+
+def is_scroll_member(name):
+    """True for ZIP members that get_artifact_structure will pick up"""
+    parts = name.split('/')
+    file_name = parts[-1]
+    if not file_name or file_name.startswith('.') or '__MACOSX' in parts:
+        return False
+    # Refuse absolute paths and directory traversal
+    if name.startswith('/') or '..' in parts or '\\' in name:
+        return False
+    return '-feat' in file_name or '-main' in file_name
+
+
+def spool_stream(stream):
+    """Copy a non-seekable stream into a spooled temp file, rewound"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, dir=UPLOAD_FOLDER)
+    shutil.copyfileobj(stream, spooled, INGEST_CHUNK_SIZE)
+    spooled.seek(0)
+    return spooled
+
+
+# Content-addressed blob store
+# Every extracted scroll body is stored once as BLOBS_DIR/<sha[:2]>/<sha>
+# and workspaces hold hard links to it, so identical scrolls across tenants
+# and nightly runs share one inode (and with it one line index). by-crc/
+# maps a member's ZIP CRC-32 and size to the blob it most likely is; such a
+# member is decompressed and hashed to confirm it but never written again.
+# A blob whose only link left is the store's own is unused and gets swept.
+
+BLOBS_DIR = Path(os.environ.get('BLOBS_DIR', str(UPLOAD_FOLDER / 'blobs')))
+BLOBS_DIR.mkdir(parents=True, exist_ok=True)
+BLOB_CRC_DIRNAME = 'by-crc'
+# Blobs written this recently are never swept: an upload may be about to link them
+BLOB_SWEEP_GRACE_SECONDS = 3600
+
+
+def _blob_path(digest):
+    return BLOBS_DIR / digest[:2] / digest
+
+
+def _link_blob(blob, target):
+    """
+    Hard link a blob into a workspace, copying when it cannot be linked
+    (another file system, no hard links, or protected_hardlinks refusing a
+    blob owned by another user). The link or copy is made under a temporary
+    name and renamed over target, so an existing file at target (a duplicate
+    ZIP member) is replaced rather than written through into its blob.
+    Raises FileNotFoundError if the blob has just been swept.
+    """
+    target = Path(target)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    # Left behind by a killed process with the same pid and thread id
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(blob, tmp_path)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(blob, tmp_path)
+    try:
+        os.replace(tmp_path, target)
+    finally:
+        # rename() leaves both names when they already link the same blob
+        tmp_path.unlink(missing_ok=True)
+
+
+def _hash_member(zip_ref, info):
+    digest = hashlib.sha256()
+    with zip_ref.open(info) as src:
+        for chunk in iter(lambda: src.read(INGEST_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_member(zip_ref, info, target):
+    """Write one ZIP member to target as a plain file; returns its SHA-256 hex digest"""
+    digest = hashlib.sha256()
+    with open(target, 'wb') as dst, zip_ref.open(info) as src:
+        for chunk in iter(lambda: src.read(INGEST_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            dst.write(chunk)
+    return digest.hexdigest()
+
+
+def store_member(zip_ref, info, target):
+    """
+    Place one ZIP member at target through the blob store
+    Returns (SHA-256 hex digest, True if the body was already stored).
+    """
+    crc_link = BLOBS_DIR / BLOB_CRC_DIRNAME / f"{info.CRC:08x}-{info.file_size}"
+    try:
+        known = os.path.basename(os.readlink(crc_link))
+    except OSError:
+        known = None
+    
+    if known is not None:
+        # A CRC-32 match is only a hint; the SHA-256 decides
+        digest = _hash_member(zip_ref, info)
+        if digest == known:
+            try:
+                _link_blob(_blob_path(digest), target)
+                return digest, True
+            except FileNotFoundError:
+                pass  # swept since the link was read, store it again
+    
+    fd, tmp_path = tempfile.mkstemp(dir=BLOBS_DIR, suffix='.tmp')
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as dst, zip_ref.open(info) as src:
+            for chunk in iter(lambda: src.read(INGEST_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                dst.write(chunk)
+        digest = digest.hexdigest()
+        blob = _blob_path(digest)
+        blob.parent.mkdir(exist_ok=True)
+        try:
+            _link_blob(blob, target)
+            reused = True
+        except FileNotFoundError:
+            # Read-only, so no view can change the body under the others
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, blob)
+            tmp_path = None
+            _link_blob(blob, target)
+            reused = False
+    finally:
+        if tmp_path is not None:
+            os.remove(tmp_path)
+    
+    # Point the CRC link at this blob, replacing one left by a CRC collision
+    link_tmp = crc_link.with_name(f".{crc_link.name}.{os.getpid()}.{threading.get_ident()}")
+    try:
+        os.symlink(os.path.join('..', digest[:2], digest), link_tmp)
+        os.replace(link_tmp, crc_link)
+    except OSError:
+        pass
+    return digest, reused
+
+
+def sweep_blobs():
+    """Remove blobs no workspace links to any more and CRC links left dangling; returns bytes freed"""
+    cutoff = time.time() - BLOB_SWEEP_GRACE_SECONDS
+    freed = 0
+    for blob in BLOBS_DIR.glob('??/*'):
+        try:
+            st = blob.stat()
+        except OSError:
+            continue
+        if st.st_nlink == 1 and st.st_mtime < cutoff:
+            blob.unlink(missing_ok=True)
+            freed += st.st_size
+    # Left behind by uploads that died mid-write
+    for tmp_path in BLOBS_DIR.glob('*.tmp'):
+        try:
+            if tmp_path.stat().st_mtime < cutoff:
+                tmp_path.unlink()
+        except OSError:
+            pass
+    crc_dir = BLOBS_DIR / BLOB_CRC_DIRNAME
+    if crc_dir.exists():
+        for link in crc_dir.iterdir():
+            if not link.exists():
+                link.unlink(missing_ok=True)
+    return freed
+
+
+def ingest_artifact(stream, extract_to, progress=None, blobs=True):
+    """
+    Stream scroll members out of an uploaded bundle without saving the ZIP
+    stream must be seekable (Werkzeug spools uploads to a temp file); anything
+    else is spooled first. Only -feat/-main members are extracted, in chunks,
+    into the blob store and linked into extract_to. With blobs=False they are
+    written as plain files instead, for throwaway directories whose scrolls
+    must not stay in the server's store. Their digests are saved to
+    FINGERPRINTS_FILENAME. progress(members_done, members_total,
+    bytes_written) is called per member. Returns a summary dict.
+    """
+    extract_to = Path(extract_to)
+    spooled = None
+    if not stream.seekable():
+        stream = spooled = spool_stream(stream)
+
+    start = time.perf_counter()
+    try:
+        with zipfile.ZipFile(stream, 'r') as zip_ref:
+            members = [info for info in zip_ref.infolist() if not info.is_dir() and is_scroll_member(info.filename)]
+            skipped = sum(1 for info in zip_ref.infolist() if not info.is_dir()) - len(members)
+
+            bytes_written = 0
+            bytes_stored = 0
+            reused = 0
+            created_dirs = set()
+            fingerprints = {}
+            if blobs:
+                (BLOBS_DIR / BLOB_CRC_DIRNAME).mkdir(exist_ok=True)
+            for done, info in enumerate(members, start=1):
+                target = extract_to / info.filename
+                if target.parent not in created_dirs:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    created_dirs.add(target.parent)
+                if blobs:
+                    fingerprints[info.filename], stored_before = store_member(zip_ref, info, target)
+                else:
+                    fingerprints[info.filename], stored_before = write_member(zip_ref, info, target), False
+                bytes_written += info.file_size
+                if stored_before:
+                    reused += 1
+                else:
+                    bytes_stored += info.file_size
+                if progress:
+                    progress(done, len(members), bytes_written)
+    finally:
+        if spooled is not None:
+            spooled.close()
+    observe('wizardview_zip_seconds', time.perf_counter() - start, op='extract')
+    inc('wizardview_zip_bytes_total', bytes_written, op='extract')
+    if blobs:
+        inc('wizardview_blob_bytes_total', bytes_stored, result='stored')
+        inc('wizardview_blob_bytes_total', bytes_written - bytes_stored, result='reused')
+
+    write_fingerprints(extract_to, {'files': fingerprints})
+    return {
+        'members': len(members),
+        'skipped': skipped,
+        'bytes_written': bytes_written,
+        'reused': reused,
+        'bytes_stored': bytes_stored
+    }
+
+
+# Workspaces
+
+@contextmanager
+def _workspace_registry_lock():
+    """Exclusive cross-process lock for registry read-modify-write"""
+    with open(WORKSPACE_LOCK, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def load_workspace_registry():
+    """Read the workspace registry: {workspace_id: entry}"""
+    try:
+        with open(WORKSPACE_REGISTRY, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_workspace_registry(registry):
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, prefix='.workspaces', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_path, WORKSPACE_REGISTRY)
+
+
+def get_workspace(workspace_id):
+    """Registry entry for a workspace whose directory still exists, else None"""
+    entry = load_workspace_registry().get(workspace_id)
+    if entry and Path(entry['path']).exists():
+        return entry
+    return None
+
+
+def register_workspace(workspace_id, path, name, source, **extra):
+    """
+    Add or refresh a workspace in the shared registry
+    Uploaded workspaces beyond WORKSPACE_MAX_COUNT are removed least recently
+    used first, skipping any used within WORKSPACE_EVICT_GRACE_SECONDS or
+    with a queued or running job.
+    """
+    with _workspace_registry_lock():
+        registry = load_workspace_registry()
+        entry = registry.get(workspace_id, {})
+        entry.update(extra)
+        entry.update({
+            'id': workspace_id,
+            'name': name,
+            'path': str(path),
+            'source': source,
+            'created_at': entry.get('created_at', time.time()),
+            'last_used_at': time.time()
+        })
+        registry[workspace_id] = entry
+
+        uploads = sorted(
+            (e for e in registry.values() if e['source'] == 'upload'),
+            key=lambda e: e['last_used_at']
+        )
+        excess = max(0, len(uploads) - WORKSPACE_MAX_COUNT)
+        evicted = []
+        if excess:
+            cutoff = time.time() - WORKSPACE_EVICT_GRACE_SECONDS
+            busy = busy_job_paths()
+            evicted = [
+                e for e in uploads if e['last_used_at'] < cutoff and e['path'] not in busy
+            ][:excess]
+        for stale in evicted:
+            shutil.rmtree(stale['path'], ignore_errors=True)
+            del registry[stale['id']]
+
+        _write_workspace_registry(registry)
+    
+    if evicted:
+        # Scrolls only the removed workspaces used are not needed any more
+        freed = sweep_blobs()
+        log.info("Removed %d workspaces, freed %d blob bytes", len(evicted), freed)
+    return entry
+
+
+def touch_workspace(entry):
+    """Mark a workspace as used now, at most once per WORKSPACE_TOUCH_INTERVAL"""
+    if time.time() - entry.get('last_used_at', 0) < WORKSPACE_TOUCH_INTERVAL:
+        return
+    with _workspace_registry_lock():
+        registry = load_workspace_registry()
+        current = registry.get(entry['id'])
+        if current is None:
+            return
+        current['last_used_at'] = time.time()
+        _write_workspace_registry(registry)
+
+
+def upload_workspace_id(stream):
+    """Content-addressed workspace ID for an uploaded bundle (stream is rewound)"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(INGEST_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()[:16]
+
+
+def path_workspace_id(path):
+    """Stable workspace ID for a directory that was not uploaded (e.g. sample scrolls)"""
+    return 'dir-' + hashlib.sha256(str(Path(path).resolve()).encode('utf-8')).hexdigest()[:12]
+
+
+def current_artifacts_dir():
+    """
+    Scroll directory for this request
+    A ?workspace= URL parameter wins over the session's workspace; without
+    either the configured ARTIFACTS_DIR is used. Returns None if an explicitly
+    requested workspace does not exist.
+    """
+    workspace_id = request.args.get('workspace')
+    if workspace_id:
+        entry = get_workspace(workspace_id)
+        if entry is None:
+            return None
+        touch_workspace(entry)
+        return Path(entry['path'])
+
+    workspace_id = session.get('workspace')
+    if workspace_id:
+        entry = get_workspace(workspace_id)
+        if entry:
+            # Browsing keeps a workspace from being evicted
+            touch_workspace(entry)
+            return Path(entry['path'])
+        session.pop('workspace', None)
+
+    return ARTIFACTS_DIR
+
+
+# Structure index persisted in every scroll directory; a tenant folder is
+# only listed again when its mtime changes
+STRUCTURE_INDEX_FILENAME = '.structure_index.json'
+STRUCTURE_INDEX_VERSION = '1'
+
+# A file created in the same mtime tick as the last listing would not change
+# the mtime again, so folders modified this recently are listed every time
+STRUCTURE_MTIME_SLACK_NS = 2 * 10**9
+
+# In-process copy of each directory's structure index, keyed by path
+_structure_indexes = {}
+
+
+def _scan_folder(folder_path):
+    """Group the scroll files of one tenant folder: {file_id: {'feat': name, 'main': name}}"""
+    with os.scandir(folder_path) as entries:
+        files = sorted(entry.name for entry in entries if entry.is_file())
+    
+    # Group files by their base ID (e.g., CHART-426)
+    file_groups = {}
+    for file_name in files:
+        # Extract base ID (everything before -feat or -main)
+        if '-feat' in file_name:
+            base_id = file_name.replace('-feat', '')
+            if base_id not in file_groups:
+                file_groups[base_id] = {}
+            file_groups[base_id]['feat'] = file_name
+        elif '-main' in file_name:
+            base_id = file_name.replace('-main', '')
+            if base_id not in file_groups:
+                file_groups[base_id] = {}
+            file_groups[base_id]['main'] = file_name
+    return file_groups
+
+
+def _read_structure_index(base_path):
+    try:
+        with open(base_path / STRUCTURE_INDEX_FILENAME, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != STRUCTURE_INDEX_VERSION:
+        return None
+    return index
+
+
+def load_structure_index(base_path):
+    """
+    Structure index of a scroll directory, refreshed incrementally
+    Returns {'version', 'digest', 'folders': {folder_id: {'mtime_ns', 'groups'}}}.
+    Only folders whose mtime changed since the last call are listed again;
+    the digest changes whenever the grouped tree does.
+    """
+    base_path = Path(base_path)
+    key = str(base_path)
+    index = _structure_indexes.get(key) or _read_structure_index(base_path) or {'folders': {}}
+    
+    try:
+        with os.scandir(base_path) as entries:
+            folders = sorted((entry.name, entry.stat().st_mtime_ns) for entry in entries if entry.is_dir())
+    except FileNotFoundError:
+        folders = []
+    
+    now = time.time_ns()
+    refreshed = {}
+    changed = [name for name, _ in folders] != list(index['folders'])
+    for folder_id, mtime_ns in folders:
+        cached = index['folders'].get(folder_id)
+        if cached and cached['mtime_ns'] == mtime_ns:
+            refreshed[folder_id] = cached
+            continue
+        refreshed[folder_id] = {
+            'mtime_ns': mtime_ns if now - mtime_ns > STRUCTURE_MTIME_SLACK_NS else None,
+            'groups': _scan_folder(base_path / folder_id)
+        }
+        changed = True
+    
+    if changed or index.get('version') != STRUCTURE_INDEX_VERSION:
+        tree = {folder_id: entry['groups'] for folder_id, entry in refreshed.items()}
+        index = {
+            'version': STRUCTURE_INDEX_VERSION,
+            'digest': hashlib.sha256(json.dumps(tree, sort_keys=True).encode('utf-8')).hexdigest()[:16],
+            'folders': refreshed
+        }
+        try:
+            _write_json_atomic(base_path / STRUCTURE_INDEX_FILENAME, index)
+        except OSError:
+            # Read-only scroll directories still get the in-process index
+            pass
+    
+    _structure_indexes[key] = index
+    return index
+
+
+def structure_from_index(index):
+    """A get_artifact_structure result that callers are free to modify"""
+    return {
+        folder_id: {file_id: dict(files) for file_id, files in entry['groups'].items()}
+        for folder_id, entry in index['folders'].items()
+    }
+
+
+def get_artifact_structure(base_path):
+    """
+    Get the structure of the scroll directory
+    Returns: {folder_id: {file_id: {'feat': name, 'main': name}}}
+    """
+    return structure_from_index(load_structure_index(base_path))
+
+
+def structure_etag(base_path, index):
+    """
+    Entity tag of the /api/structure response for a scroll directory
+    Covers the tree and the stats and fingerprint files merged into it.
+    """
+    base_path = Path(base_path)
+    parts = [str(base_path.resolve()), index['digest']]
+    for name in (STATS_INDEX_FILENAME, FINGERPRINTS_FILENAME):
+        try:
+            parts.append(str(os.stat(base_path / name).st_mtime_ns))
+        except OSError:
+            parts.append('-')
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+
+
+def read_csv_file(file_path):
+    """Read CSV file and return as list of rows"""
+    try:
+        with ScrollReader(file_path) as scroll:
+            return scroll.lines()
+    except Exception as e:
+        return [f"Error reading file: {str(e)}"]
+
+
+def parse_csv_row(row):
+    """Parse CSV row into structured data"""
+    parts = next(csv.reader([row]), [])
+    return {
+        'raw': row,
+        'parts': parts
+    }
+
+
+# Diff engines
+# Every engine takes the main and feat line lists and returns
+# SequenceMatcher-style opcodes: (tag, i1, i2, j1, j2)
+
+DEFAULT_DIFF_ENGINE = os.environ.get('DIFF_ENGINE', 'patience')
+
+# Bump whenever an engine's output changes so cached results are not reused
+DIFF_ENGINE_VERSION = '2'
+
+# Lines that occur more often than this in a region are never used as
+# anchors by the histogram engine (same cutoff git uses)
+HISTOGRAM_MAX_CHAIN = 64
+
+# Regions without a usable anchor that are at most this many lines
+# (main + feat) are handed to SequenceMatcher, larger ones become a replace
+HISTOGRAM_FALLBACK_LINES = 2000
+
+
+def _intern_lines(main_lines, feat_lines):
+    """Map every distinct line to a small int so engines compare ints, not strings"""
+    ids = {}
+    main_ids = [ids.setdefault(line, len(ids)) for line in main_lines]
+    feat_ids = [ids.setdefault(line, len(ids)) for line in feat_lines]
+    return main_ids, feat_ids
+
+
+def _histogram_best_region(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    Find the longest common run anchored on the rarest lines of a region
+    Returns (a_start, b_start, length) or None if no line is rare enough
+    """
+    occurrences = {}
+    for i in range(a_lo, a_hi):
+        occurrences.setdefault(a[i], []).append(i)
+
+    best = None
+    best_count = HISTOGRAM_MAX_CHAIN + 1
+    best_len = 0
+
+    j = b_lo
+    while j < b_hi:
+        positions = occurrences.get(b[j])
+        if positions is None or len(positions) > best_count:
+            j += 1
+            continue
+
+        next_j = j + 1
+        for i in positions:
+            # Extend the match in both directions, tracking the rarest line in it
+            sa, sb, ea, eb = i, j, i + 1, j + 1
+            count = len(positions)
+            while sa > a_lo and sb > b_lo and a[sa - 1] == b[sb - 1]:
+                sa -= 1
+                sb -= 1
+                count = min(count, len(occurrences[a[sa]]))
+            while ea < a_hi and eb < b_hi and a[ea] == b[eb]:
+                count = min(count, len(occurrences[a[ea]]))
+                ea += 1
+                eb += 1
+
+            if eb > next_j:
+                next_j = eb
+
+            length = ea - sa
+            if count < best_count or (count == best_count and length > best_len):
+                best = (sa, sb, length)
+                best_count = count
+                best_len = length
+        j = next_j
+
+    return best
+
+
+def _patience_anchors(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    Lines that occur exactly once on both sides of a region, reduced to
+    their longest increasing run (patience sorting)
+    Returns a list of (a_index, b_index) pairs in order
+    """
+    count_a = {}
+    pos_a = {}
+    for i in range(a_lo, a_hi):
+        line = a[i]
+        count_a[line] = count_a.get(line, 0) + 1
+        pos_a[line] = i
+
+    count_b = {}
+    for j in range(b_lo, b_hi):
+        line = b[j]
+        count_b[line] = count_b.get(line, 0) + 1
+
+    candidates = [
+        (pos_a[b[j]], j) for j in range(b_lo, b_hi)
+        if count_b[b[j]] == 1 and count_a.get(b[j]) == 1
+    ]
+    if not candidates:
+        return []
+
+    # Longest increasing subsequence on the main-side positions
+    tails = []
+    tail_ids = []
+    previous = [None] * len(candidates)
+    for idx, (i, _) in enumerate(candidates):
+        k = bisect_left(tails, i)
+        if k:
+            previous[idx] = tail_ids[k - 1]
+        if k == len(tails):
+            tails.append(i)
+            tail_ids.append(idx)
+        else:
+            tails[k] = i
+            tail_ids[k] = idx
+
+    anchors = []
+    idx = tail_ids[-1]
+    while idx is not None:
+        anchors.append(candidates[idx])
+        idx = previous[idx]
+    anchors.reverse()
+    return anchors
+
+
+def _histogram_matching_blocks(a, b, patience=False):
+    """
+    Histogram diff (as in git/JGit) returning sorted matching blocks
+    Common prefixes and suffixes are trimmed first, then each region is split
+    around its rarest common run. With patience=True every line unique to
+    both sides of a region is used as an anchor in one pass, and the
+    histogram split only runs where no such line exists. Uses an explicit
+    stack, so huge files cannot hit the recursion limit.
+    """
+    blocks = []
+    stack = [(0, len(a), 0, len(b))]
+
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+
+        # Trim common prefix
+        start_a, start_b = a_lo, b_lo
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            a_lo += 1
+            b_lo += 1
+        if a_lo > start_a:
+            blocks.append((start_a, start_b, a_lo - start_a))
+
+        # Trim common suffix
+        end_a = a_hi
+        while a_hi > a_lo and b_hi > b_lo and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+        if a_hi < end_a:
+            blocks.append((a_hi, b_hi, end_a - a_hi))
+
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        if patience:
+            anchors = _patience_anchors(a, b, a_lo, a_hi, b_lo, b_hi)
+            if anchors:
+                prev_a, prev_b = a_lo, b_lo
+                for i, j in anchors:
+                    blocks.append((i, j, 1))
+                    stack.append((prev_a, i, prev_b, j))
+                    prev_a, prev_b = i + 1, j + 1
+                stack.append((prev_a, a_hi, prev_b, b_hi))
+                continue
+
+        region = _histogram_best_region(a, b, a_lo, a_hi, b_lo, b_hi)
+        if region is None:
+            # Only very common lines left - small regions are cheap enough
+            # for SequenceMatcher, big ones are reported as a replace
+            if (a_hi - a_lo) + (b_hi - b_lo) <= HISTOGRAM_FALLBACK_LINES:
+                matcher = SequenceMatcher(None, a[a_lo:a_hi], b[b_lo:b_hi], autojunk=False)
+                for ai, bj, size in matcher.get_matching_blocks():
+                    if size:
+                        blocks.append((a_lo + ai, b_lo + bj, size))
+            continue
+
+        ra, rb, length = region
+        blocks.append(region)
+        stack.append((a_lo, ra, b_lo, rb))
+        stack.append((ra + length, a_hi, rb + length, b_hi))
+
+    blocks.sort()
+    return blocks
+
+
+def _opcodes_from_blocks(blocks, len_a, len_b):
+    """Turn sorted matching blocks into SequenceMatcher-style opcodes"""
+    # Merge adjacent blocks so equal runs come out as a single opcode
+    merged = []
+    for ai, bj, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == ai and merged[-1][1] + merged[-1][2] == bj:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((ai, bj, size))
+    merged.append((len_a, len_b, 0))
+
+    opcodes = []
+    i = j = 0
+    for ai, bj, size in merged:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+def _difflib_opcodes(main_lines, feat_lines):
+    """Original SequenceMatcher path (quadratic worst case)"""
+    return SequenceMatcher(None, main_lines, feat_lines).get_opcodes()
+
+
+def _histogram_opcodes(main_lines, feat_lines):
+    """Histogram diff over interned lines (near-linear on typical scrolls)"""
+    main_ids, feat_ids = _intern_lines(main_lines, feat_lines)
+    blocks = _histogram_matching_blocks(main_ids, feat_ids)
+    return _opcodes_from_blocks(blocks, len(main_ids), len(feat_ids))
+
+
+def _patience_opcodes(main_lines, feat_lines):
+    """Patience diff over interned lines, histogram where no unique lines exist"""
+    main_ids, feat_ids = _intern_lines(main_lines, feat_lines)
+    blocks = _histogram_matching_blocks(main_ids, feat_ids, patience=True)
+    return _opcodes_from_blocks(blocks, len(main_ids), len(feat_ids))
+
+
+DIFF_ENGINES = {
+    'difflib': _difflib_opcodes,
+    'histogram': _histogram_opcodes,
+    'patience': _patience_opcodes,
+}
+
+
+def get_diff_opcodes(main_lines, feat_lines, engine=None):
+    """Run the selected diff engine over two line lists"""
+    engine = engine or DEFAULT_DIFF_ENGINE
+    if engine not in DIFF_ENGINES:
+        raise ValueError(f"Unknown diff engine: {engine}")
+
+    # Fast path: identical scrolls need no diff at all
+    if main_lines == feat_lines:
+        return [('equal', 0, len(main_lines), 0, len(feat_lines))] if main_lines else []
+
+    with timed('wizardview_diff_seconds', engine=engine):
+        return DIFF_ENGINES[engine](main_lines, feat_lines)
+
+
+def stats_from_opcodes(opcodes, main_count, feat_count):
+    """
+    Count unchanged, modified, added and removed lines from diff opcodes
+    """
+    # Initialize counters
+    added = 0
+    removed = 0
+    modified = 0
+    unchanged = 0
+    
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            # Lines are identical
+            unchanged += (i2 - i1)
+        elif tag == 'delete':
+            # Lines only in main (removed in feat)
+            removed += (i2 - i1)
+        elif tag == 'insert':
+            # Lines only in feat (added in feat)
+            added += (j2 - j1)
+        elif tag == 'replace':
+            # Lines exist in both but are different (modified)
+            # Count the number of modified lines as the minimum of the two ranges
+            # The difference goes to added or removed
+            main_count_range = i2 - i1
+            feat_count_range = j2 - j1
+            
+            if main_count_range == feat_count_range:
+                # Same number of lines, all modified
+                modified += main_count_range
+            elif main_count_range > feat_count_range:
+                # More lines in main, some were modified, some were removed
+                modified += feat_count_range
+                removed += (main_count_range - feat_count_range)
+            else:
+                # More lines in feat, some were modified, some were added
+                modified += main_count_range
+                added += (feat_count_range - main_count_range)
+    
+    return {
+        'unchanged': unchanged,
+        'modified': modified,
+        'added': added,
+        'removed': removed,
+        'total': max(main_count, feat_count)
+    }
+
+
+def calculate_diff_stats(main_content, feat_content, engine=None):
+    """
+    Calculate diff statistics with the selected diff engine
+    Returns accurate counts of added, removed, modified, and unchanged lines
+    """
+    stats, _ = calculate_diff(main_content, feat_content, engine)
+    return stats
+
+
+def calculate_diff(main_content, feat_content, engine=None):
+    """
+    Diff statistics plus the changed hunks
+    Hunks are [tag, main_start, main_end, feat_start, feat_end] with
+    0-based, end-exclusive line ranges; equal runs are left out.
+    """
+    return diff_lines(main_content.splitlines(), feat_content.splitlines(), engine)
+
+
+def diff_lines(main_lines, feat_lines, engine=None):
+    """calculate_diff over line sequences (strings or per-line hashes)"""
+    opcodes = get_diff_opcodes(main_lines, feat_lines, engine)
+    stats = stats_from_opcodes(opcodes, len(main_lines), len(feat_lines))
+    hunks = [list(opcode) for opcode in opcodes if opcode[0] != 'equal']
+    return stats, hunks
+
+
+# Memory-mapped scroll reads
+# Scrolls are read through mmap with a byte-offset line index, so serving a
+# window of lines or diffing never holds a decoded copy of a whole file.
+
+# Bump whenever the index layout changes
+LINE_INDEX_VERSION = '1'
+# Bytes of a mapping processed before its pages are handed back to the kernel
+SCROLL_SCAN_WINDOW = 4 * 1024 * 1024
+# Lines hashed per slice of the mapping when diffing
+SCROLL_HASH_BATCH = 65536
+
+
+def _line_index_path(st):
+    """
+    Index files live in the diff cache directory and share its LRU budget
+    Keyed by inode, size and mtime; workspaces are never modified in place.
+    """
+    raw = f"lines:{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{LINE_INDEX_VERSION}"
+    key = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    return DIFF_CACHE_DIR / key[:2] / f"{key}.idx"
+
+
+class ScrollReader:
+    """
+    Read-only, memory-mapped view of one scroll
+    Lines are split on newlines with a trailing carriage return dropped.
+    The index file holds the SHA-256 of the scroll followed by the start
+    offset of every line and one end marker, so it is built in a single
+    pass on first access and mapped, not loaded, afterwards.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = None
+        self._index_mmap = None
+        self._offsets = None
+        try:
+            st = os.fstat(self._file.fileno())
+            self.size = st.st_size
+            if self.size:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._open_index(st)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def close(self):
+        if self._offsets is not None:
+            self._offsets.release()
+            self._offsets = None
+        for mapping in (self._index_mmap, self._mmap):
+            if mapping is not None:
+                mapping.close()
+        self._index_mmap = self._mmap = None
+        self._file.close()
+
+    def _open_index(self, st):
+        index_path = _line_index_path(st)
+        try:
+            index_file = open(index_path, 'rb')
+            os.utime(index_path)  # mtime is the LRU clock
+        except OSError:
+            self._build_index(index_path)
+            index_file = open(index_path, 'rb')
+        with index_file:
+            self._index_mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.content_hash = self._index_mmap[:32].hex()
+        self._offsets = memoryview(self._index_mmap)[32:].cast('Q')
+
+    @timed('wizardview_scroll_read_seconds', op='index')
+    def _build_index(self, index_path):
+        """Hash the scroll and record line starts, one window at a time"""
+        inc('wizardview_scroll_read_bytes_total', self.size, op='index')
+        digest = hashlib.sha256()
+        index_path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=index_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(bytes(32))  # digest, filled in once the whole file is read
+                offsets = array('Q', [0])
+                for pos in range(0, self.size, SCROLL_SCAN_WINDOW):
+                    chunk = self._mmap[pos:pos + SCROLL_SCAN_WINDOW]
+                    digest.update(chunk)
+                    newline = chunk.find(b'\n')
+                    while newline != -1:
+                        offsets.append(pos + newline + 1)
+                        newline = chunk.find(b'\n', newline + 1)
+                    out.write(offsets)
+                    offsets = array('Q')
+                    self._release(pos, pos + len(chunk))
+
+                # The end marker sits one past the newline that would end the last
+                # line; a final newline already left exactly that offset behind
+                if self.size and self._mmap[self.size - 1] != ord('\n'):
+                    offsets.append(self.size + 1)
+                out.write(offsets)
+                out.seek(0)
+                out.write(digest.digest())
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        evict_diff_cache()
+
+    def _release(self, start, end):
+        """Drop mapped pages we are done with so they stop counting towards RSS"""
+        start -= start % mmap.PAGESIZE
+        if end > start and hasattr(mmap, 'MADV_DONTNEED'):
+            self._mmap.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def _slice(self, start, end):
+        """Raw bytes of lines [start, end), newline separated"""
+        if start >= end:
+            return b''
+        return self._mmap[self._offsets[start]:self._offsets[end] - 1]
+
+    def raw_lines(self, start=0, end=None):
+        """Lines [start, end) as bytes"""
+        end = len(self) if end is None else min(end, len(self))
+        if start >= end:
+            return []
+        data = self._slice(start, end)
+        lines = data.split(b'\n')
+        if b'\r' in data:
+            lines = [line[:-1] if line.endswith(b'\r') else line for line in lines]
+        return lines
+
+    def lines(self, start=0, end=None):
+        """Lines [start, end) decoded as UTF-8"""
+        return [line.decode('utf-8') for line in self.raw_lines(start, end)]
+
+    def read_text(self):
+        """Whole scroll decoded; only for callers that really need every byte"""
+        if self._mmap is None:
+            return ''
+        inc('wizardview_scroll_read_bytes_total', self.size, op='text')
+        with timed('wizardview_scroll_read_seconds', op='text'):
+            return self._mmap[:].decode('utf-8')
+
+    @property
+    def final_newline(self):
+        """True if the scroll ends with a newline"""
+        return self._mmap is not None and self._mmap[-1:] == b'\n'
+
+    def line_hashes(self):
+        """
+        hash() of every line, for diffing without keeping line text around
+        Only compared within one process, so hash randomization is harmless;
+        a 64-bit collision between two different lines is vanishingly rare.
+        """
+        hashes = array('q')
+        for start in range(0, len(self), SCROLL_HASH_BATCH):
+            end = min(start + SCROLL_HASH_BATCH, len(self))
+            hashes.extend(map(hash, self.raw_lines(start, end)))
+            self._release(self._offsets[start], self._offsets[end] - 1)
+        return hashes
+
+
+# CSV cell diff
+# Rows are matched on key columns with a hash join instead of by position,
+# so an inserted row no longer shifts every row below it into "modified"
+
+# Header names (lower-cased) tried first as a single-column key
+CSV_KEY_HINTS = ('id', 'key', 'uuid', 'name')
+# Rows sampled to tell dimension columns from value columns
+CSV_KEY_SAMPLE_ROWS = 2000
+# Most changed rows returned by one cell diff; counts always cover every row
+CSV_DIFF_MAX_ROWS = 1000
+# Default tolerances of the numeric mode: |feat - main| <= atol + rtol * |main|
+NUMERIC_ATOL = float(os.environ.get('NUMERIC_ATOL', 1e-6))
+NUMERIC_RTOL = float(os.environ.get('NUMERIC_RTOL', 1e-9))
+
+
+def parse_csv_text(text):
+    """
+    Header and rows of a CSV scroll, parsed with the csv module
+    Rows are (line_number, cells) with 1-based line numbers of the row's first line
+    """
+    reader = csv.reader(StringIO(text, newline=''))
+    header = next(reader, [])
+    rows = []
+    line = reader.line_num + 1
+    for cells in reader:
+        if cells:
+            rows.append((line, cells))
+        line = reader.line_num + 1
+    return header, rows
+
+
+def _single_line_records(text):
+    """
+    Header line and (line_number, raw_line) records, or None when a quoted
+    field spans lines and records cannot be told apart without parsing
+    """
+    lines = text.splitlines()
+    if any(line.count('"') % 2 for line in lines):
+        return None
+    if not lines:
+        return '', []
+    return lines[0], [(number, line) for number, line in enumerate(lines[1:], start=2) if line]
+
+
+def _drop_common(records, common):
+    """Records left after taking out as many copies of each line as common holds"""
+    remaining = dict(common)
+    kept = []
+    for number, line in records:
+        if remaining.get(line):
+            remaining[line] -= 1
+        else:
+            kept.append((number, line))
+    return kept
+
+
+def _parse_records(records):
+    """
+    csv-parse (line_number, raw_line) records into (line_number, cells) rows
+    A record without quotes parses to exactly its comma-separated parts,
+    so only quoted records go through the csv module
+    """
+    rows = []
+    for number, line in records:
+        cells = next(csv.reader([line]), []) if '"' in line else line.split(',')
+        rows.append((number, cells))
+    return rows
+
+
+def _column_names(header):
+    """Header names made unique so columns can be matched by name across sides"""
+    seen = {}
+    names = []
+    for name in header:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        names.append(name if count == 0 else f"{name}#{count + 1}")
+    return names
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def detect_key_columns(names, rows):
+    """
+    Pick the columns that identify a row
+    A hinted column (id, key, ...) wins when it is unique in the sample;
+    otherwise every column that is mostly non-numeric is treated as a
+    dimension of the export and together they form the key.
+    """
+    sample = [cells for _, cells in rows[:CSV_KEY_SAMPLE_ROWS]]
+    for index, name in enumerate(names):
+        lowered = name.strip().lower()
+        if lowered in CSV_KEY_HINTS or lowered.endswith('_id'):
+            values = [cells[index] if index < len(cells) else '' for cells in sample]
+            if len(set(values)) == len(values):
+                return [name]
+
+    dimensions = []
+    for index, name in enumerate(names):
+        values = [cells[index] for cells in sample if index < len(cells) and cells[index] != '']
+        numeric = sum(1 for value in values if _is_number(value))
+        if values and numeric * 2 < len(values):
+            dimensions.append(name)
+    return dimensions or names[:1]
+
+
+def _row_keys(rows, key_indexes):
+    """
+    Yield (key, line, cells) for every row
+    Duplicate keys get an occurrence number so the join stays one-to-one
+    """
+    occurrences = {}
+    for line, cells in rows:
+        values = tuple(cells[i] if i < len(cells) else '' for i in key_indexes)
+        count = occurrences.get(values, 0)
+        occurrences[values] = count + 1
+        yield values + (count,), line, cells
+
+
+@timed('wizardview_diff_seconds', engine='cells')
+def diff_csv(main_text, feat_text, key_columns=None, tolerance=None):
+    """
+    Cell-level diff of two CSV scrolls
+    Rows are aligned by key_columns (header names, auto-detected when None)
+    and columns by header name. With tolerance=(atol, rtol) numeric cells
+    only count as changed outside the tolerance.
+    Raises ValueError for an unknown key column.
+    """
+    stats = {'added': 0, 'removed': 0, 'modified': 0, 'unchanged': 0}
+
+    main_records = _single_line_records(main_text)
+    feat_records = _single_line_records(feat_text)
+    if main_records and feat_records and main_records[0] == feat_records[0]:
+        # Same header and one record per line: byte-identical lines are unchanged
+        # rows whatever the key, so only the remaining lines need parsing
+        main_header = next(csv.reader([main_records[0]]), [])
+        feat_header = main_header
+        sample_rows = _parse_records((main_records[1] or feat_records[1])[:CSV_KEY_SAMPLE_ROWS])
+        common = Counter(line for _, line in main_records[1]) & Counter(line for _, line in feat_records[1])
+        stats['unchanged'] = sum(common.values())
+        main_rows = _parse_records(_drop_common(main_records[1], common))
+        feat_rows = _parse_records(_drop_common(feat_records[1], common))
+    else:
+        main_header, main_rows = parse_csv_text(main_text)
+        feat_header, feat_rows = parse_csv_text(feat_text)
+        sample_rows = main_rows or feat_rows
+    main_names = _column_names(main_header)
+    feat_names = _column_names(feat_header)
+
+    key_source = 'request' if key_columns else 'auto'
+    if not key_columns:
+        key_columns = detect_key_columns(main_names, sample_rows)
+    missing = [name for name in key_columns if name not in main_names or name not in feat_names]
+    if missing:
+        raise ValueError(f"Unknown key column: {', '.join(missing)}")
+
+    main_positions = {name: i for i, name in enumerate(main_names)}
+    feat_positions = {name: i for i, name in enumerate(feat_names)}
+    common_columns = [name for name in main_names if name in feat_positions]
+    column_pairs = [(name, main_positions[name], feat_positions[name]) for name in common_columns]
+    # With identical headers an unchanged row can be spotted with one list compare
+    same_layout = main_names == feat_names
+
+    # Hash join: index main by key, then probe with every feat row
+    main_by_key = {
+        key: (line, cells)
+        for key, line, cells in _row_keys(main_rows, [main_positions[n] for n in key_columns])
+    }
+
+    added = []
+    # Rows on both sides whose text differs; their cells are compared below
+    matched = []
+    for key, feat_line, feat_cells in _row_keys(feat_rows, [feat_positions[n] for n in key_columns]):
+        match = main_by_key.pop(key, None)
+        if match is None:
+            added.append({'key': list(key[:-1]), 'status': 'added',
+                          'main_line': None, 'feat_line': feat_line, 'cells': {}})
+            continue
+
+        main_line, main_cells = match
+        if same_layout and main_cells == feat_cells:
+            stats['unchanged'] += 1
+            continue
+        matched.append((key, main_line, feat_line, main_cells, feat_cells))
+
+    if tolerance is None:
+        row_cells = _text_cell_changes(matched, column_pairs)
+        numeric_columns = None
+    else:
+        row_cells, numeric_columns = _numeric_cell_changes(matched, column_pairs, *tolerance)
+
+    column_changes = dict.fromkeys(common_columns, 0)
+    modified = []
+    for (key, main_line, feat_line, _, _), cells in zip(matched, row_cells):
+        if not cells:
+            stats['unchanged'] += 1
+            continue
+        for name in cells:
+            column_changes[name] += 1
+        modified.append({'key': list(key[:-1]), 'status': 'modified',
+                         'main_line': main_line, 'feat_line': feat_line, 'cells': cells})
+
+    # Whatever is left in main had no partner in feat
+    removed = [
+        {'key': list(key[:-1]), 'status': 'removed', 'main_line': main_line, 'feat_line': None, 'cells': {}}
+        for key, (main_line, _) in main_by_key.items()
+    ]
+
+    stats['added'] = len(added)
+    stats['modified'] = len(modified)
+    stats['removed'] = len(removed)
+    stats['total'] = stats['added'] + stats['removed'] + stats['modified'] + stats['unchanged']
+
+    # Changed rows in feat order, then the removed ones
+    changed_rows = sorted(added + modified, key=lambda row: row['feat_line']) + removed
+    return {
+        'key_columns': key_columns,
+        'key_source': key_source,
+        'columns': {
+            'added': [name for name in feat_names if name not in main_positions],
+            'removed': [name for name in main_names if name not in feat_positions]
+        },
+        'stats': stats,
+        'column_changes': {name: count for name, count in column_changes.items() if count},
+        'numeric_columns': numeric_columns,
+        'rows': changed_rows[:CSV_DIFF_MAX_ROWS],
+        'truncated': len(changed_rows) > CSV_DIFF_MAX_ROWS
+    }
+
+
+def _cell(cells, index):
+    return cells[index] if index < len(cells) else ''
+
+
+def _aligned_rows(matched, column_pairs):
+    """Yield (row, main_values, feat_values) with both sides in column_pairs order"""
+    main_columns = [main_col for _, main_col, _ in column_pairs]
+    feat_columns = [feat_col for _, _, feat_col in column_pairs]
+    # Identical layouts let rows be used as they are
+    aligned = main_columns == feat_columns == list(range(len(column_pairs)))
+
+    for row, (_, _, _, main_cells, feat_cells) in enumerate(matched):
+        if not (aligned and len(main_cells) == len(feat_cells) == len(column_pairs)):
+            main_cells = [_cell(main_cells, i) for i in main_columns]
+            feat_cells = [_cell(feat_cells, i) for i in feat_columns]
+        yield row, main_cells, feat_cells
+
+
+def _text_cell_changes(matched, column_pairs):
+    """Changed cells of every matched row, compared as strings"""
+    names = [name for name, _, _ in column_pairs]
+    changes = [{} for _ in matched]
+    for row, main_cells, feat_cells in _aligned_rows(matched, column_pairs):
+        for name, main_value, feat_value in zip(names, main_cells, feat_cells):
+            if main_value != feat_value:
+                changes[row][name] = [main_value, feat_value]
+    return changes
+
+
+def _parse_floats(np, values):
+    """Strings as a float64 array plus a mask of the cells that are numbers"""
+    try:
+        return np.array(values, dtype=np.float64), np.ones(len(values), dtype=bool)
+    except ValueError:
+        pass
+
+    # Some cells are blanks or labels: parse cell by cell
+    parsed = np.full(len(values), np.nan)
+    is_number = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        try:
+            parsed[i] = float(value)
+            is_number[i] = True
+        except ValueError:
+            pass
+    return parsed, is_number
+
+
+def _numeric_cell_changes(matched, column_pairs, atol, rtol):
+    """
+    Changed cells of every matched row, with numbers compared within tolerance
+    Matched rows are loaded into NumPy object matrices so equal cells drop out
+    in one vectorized compare; the differing cells are parsed into float64
+    arrays and checked with a single isclose, and per-column counts and deltas
+    come from bincount. Cells that are not numbers fall back to string equality.
+    Returns (changes, numeric_columns) where numeric_columns has, for every
+    column with numeric differences, the changed count, the cells absorbed by
+    the tolerance and the max and mean absolute delta over differing cells.
+    """
+    import numpy as np  # Only the numeric mode pays for the import
+
+    changes = [{} for _ in matched]
+    numeric_columns = {}
+
+    if not matched or not column_pairs:
+        return changes, numeric_columns
+
+    # Object matrices keep the parsed strings; equal cells drop out in one compare
+    aligned = list(_aligned_rows(matched, column_pairs))
+    main_matrix = np.array([main_cells for _, main_cells, _ in aligned], dtype=object)
+    feat_matrix = np.array([feat_cells for _, _, feat_cells in aligned], dtype=object)
+    del aligned
+    row_index, col_index = np.nonzero(main_matrix != feat_matrix)
+    if not row_index.size:
+        return changes, numeric_columns
+    main_values = main_matrix[row_index, col_index].tolist()
+    feat_values = feat_matrix[row_index, col_index].tolist()
+
+    main_numbers, main_is_number = _parse_floats(np, main_values)
+    feat_numbers, feat_is_number = _parse_floats(np, feat_values)
+    numbers = main_is_number & feat_is_number
+    with np.errstate(invalid='ignore'):
+        close = numbers & np.isclose(feat_numbers, main_numbers, rtol=rtol, atol=atol, equal_nan=True)
+        delta = np.abs(feat_numbers - main_numbers)
+    measured = numbers & np.isfinite(delta) & (delta > 0)
+
+    width = len(column_pairs)
+    numeric_count = np.bincount(col_index[numbers], minlength=width)
+    changed_count = np.bincount(col_index[numbers & ~close], minlength=width)
+    within_count = np.bincount(col_index[close], minlength=width)
+    delta_count = np.bincount(col_index[measured], minlength=width)
+    delta_sum = np.bincount(col_index[measured], weights=delta[measured], minlength=width)
+    delta_max = np.zeros(width)
+    np.maximum.at(delta_max, col_index[measured], delta[measured])
+
+    for col in np.flatnonzero(numeric_count).tolist():
+        numeric_columns[column_pairs[col][0]] = {
+            'changed': int(changed_count[col]),
+            'within_tolerance': int(within_count[col]),
+            'max_delta': float(delta_max[col]) if delta_count[col] else None,
+            'mean_delta': float(delta_sum[col] / delta_count[col]) if delta_count[col] else None
+        }
+
+    # Outside the tolerance, or not a number on both sides
+    for i in np.flatnonzero(~close).tolist():
+        changes[int(row_index[i])][column_pairs[col_index[i]][0]] = [main_values[i], feat_values[i]]
+    return changes, numeric_columns
+
+
+# Diff result cache
+
+# Minimum seconds between eviction sweeps in one worker
+DIFF_CACHE_EVICT_INTERVAL = 60
+# Temp files younger than this may still be renamed into place by a writer
+DIFF_CACHE_TMP_GRACE_SECONDS = 3600
+_last_cache_eviction = 0.0
+
+
+def content_hash(data):
+    """SHA-256 hex digest of a scroll's raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def diff_cache_key(main_hash, feat_hash, engine):
+    """Cache key for a main/feat pair: both content hashes plus engine and version"""
+    raw = f"{main_hash}:{feat_hash}:{engine}:{DIFF_ENGINE_VERSION}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _diff_cache_path(key):
+    return DIFF_CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def diff_cache_get(key):
+    """Return a cached entry or None, marking it as recently used"""
+    path = _diff_cache_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        os.utime(path)  # mtime is the LRU clock
+    except (OSError, ValueError):
+        inc('wizardview_cache_requests_total', cache='diff', result='miss')
+        return None
+    inc('wizardview_cache_requests_total', cache='diff', result='hit')
+    return entry
+
+
+def diff_cache_put(key, entry):
+    """Atomically store an entry so concurrent workers never see partial files"""
+    path = _diff_cache_path(key)
+    try:
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log.warning("Diff cache write failed: %s", e)
+        return
+    evict_diff_cache()
+
+
+def evict_diff_cache(force=False):
+    """
+    Delete least-recently-used entries until the cache fits its budget
+    Temp files are left to their writers unless older than
+    DIFF_CACHE_TMP_GRACE_SECONDS. Sweeps are rate limited per worker unless
+    force=True
+    """
+    global _last_cache_eviction
+    now = time.time()
+    if not force and now - _last_cache_eviction < DIFF_CACHE_EVICT_INTERVAL:
+        return
+    _last_cache_eviction = now
+
+    entries = []
+    total = 0
+    for shard in os.scandir(DIFF_CACHE_DIR):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith('.tmp'):
+                # Left by a writer that died
+                if st.st_mtime < now - DIFF_CACHE_TMP_GRACE_SECONDS:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+    if total <= DIFF_CACHE_MAX_BYTES:
+        return
+
+    # Drop oldest first down to 90% of the budget to avoid sweeping on every write
+    target = DIFF_CACHE_MAX_BYTES * 0.9
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def cached_scroll_diff(main, feat, engine=None):
+    """
+    Stats and hunks for two open ScrollReaders, served from the disk cache when possible
+    Returns (entry, cache_hit) where entry has 'engine', 'stats' and 'hunks'
+    """
+    engine = engine or DEFAULT_DIFF_ENGINE
+    key = diff_cache_key(main.content_hash, feat.content_hash, engine)
+
+    entry = diff_cache_get(key)
+    if entry is not None and 'hunks' in entry:
+        return entry, True
+
+    # Lines are compared by hash, so no line text is kept while diffing
+    stats, hunks = diff_lines(main.line_hashes(), feat.line_hashes(), engine)
+    entry = {'engine': engine, 'stats': stats, 'hunks': hunks}
+    diff_cache_put(key, entry)
+    return entry, False
+
+
+def cached_csv_diff(main, feat, key_columns=None, tolerance=None):
+    """diff_csv for two open ScrollReaders, cached like line diffs"""
+    engine = 'cells:' + (','.join(key_columns) if key_columns else 'auto')
+    if tolerance is not None:
+        engine += ':numeric:%r:%r' % tolerance
+    key = diff_cache_key(main.content_hash, feat.content_hash, engine)
+
+    entry = diff_cache_get(key)
+    if entry is not None:
+        return entry, True
+
+    entry = diff_csv(main.read_text(), feat.read_text(), key_columns, tolerance)
+    diff_cache_put(key, entry)
+    return entry, False
+
+
+# Bundle stats index
+
+def _process_pool(max_workers=None):
+    """
+    Process pool for CPU-heavy diff work
+    Uses forkserver so children never inherit locks held by worker threads.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers or STATS_INDEX_WORKERS,
+        mp_context=multiprocessing.get_context('forkserver')
+    )
+
+
+def pair_stats(folder_path, file_id, engine=None):
+    """
+    Stats, sizes and content hashes for one feat/main pair
+    Module level so it can run in a process pool
+    """
+    folder_path = Path(folder_path)
+    with ScrollReader(folder_path / f"{file_id}-main") as main, \
+            ScrollReader(folder_path / f"{file_id}-feat") as feat:
+        diff, _ = cached_scroll_diff(main, feat, engine)
+
+        entry = dict(diff['stats'])
+        entry['main_size'] = main.size
+        entry['feat_size'] = feat.size
+        entry['main_hash'] = main.content_hash
+        entry['feat_hash'] = feat.content_hash
+    return entry
+
+
+def complete_pairs(structure):
+    """Yield (folder_id, file_id) for every group that has both a feat and a main scroll"""
+    for folder_id, file_groups in structure.items():
+        for file_id, files in file_groups.items():
+            if 'feat' in files and 'main' in files:
+                yield folder_id, file_id
+
+
+def iter_pair_stats(base_path, pairs, engine=None, max_workers=None):
+    """
+    Diff many pairs in parallel, yielding (folder_id, file_id, entry) as each finishes
+    entry is None if the pair could not be read or diffed
+    """
+    return iter_pair_results(pair_stats, base_path, pairs, engine, max_workers)
+
+
+def iter_pair_results(func, base_path, pairs, engine=None, max_workers=None):
+    """
+    Run func(folder_path, file_id, engine) over many pairs, in a process pool
+    for more than a handful; func must be module level
+    Closing the generator early cancels the pairs not started yet.
+    """
+    base_path = Path(base_path)
+    pairs = list(pairs)
+
+    # A pool is not worth its startup cost for a handful of pairs
+    if len(pairs) < 8 or (max_workers or STATS_INDEX_WORKERS) <= 1:
+        for folder_id, file_id in pairs:
+            try:
+                entry = func(base_path / folder_id, file_id, engine)
+            except Exception as e:
+                log.warning("Failed to diff %s/%s: %s", folder_id, file_id, e)
+                entry = None
+            yield folder_id, file_id, entry
+        return
+
+    pool = _process_pool(max_workers)
+    finished = False
+    try:
+        futures = {
+            pool.submit(func, base_path / folder_id, file_id, engine): (folder_id, file_id)
+            for folder_id, file_id in pairs
+        }
+        for future in as_completed(futures):
+            folder_id, file_id = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                log.warning("Failed to diff %s/%s: %s", folder_id, file_id, e)
+                entry = None
+            yield folder_id, file_id, entry
+        finished = True
+    finally:
+        # A closed generator (the NDJSON client went away) drops the queued
+        # pairs instead of diffing the rest of the bundle for nobody
+        pool.shutdown(wait=finished, cancel_futures=not finished)
+
+
+def summarize_folder(file_entries):
+    """Roll per-file stats up into per-folder totals"""
+    totals = {'files': len(file_entries), 'changed': 0, 'added': 0, 'removed': 0, 'modified': 0, 'unchanged': 0}
+    for entry in file_entries.values():
+        for key in ('added', 'removed', 'modified', 'unchanged'):
+            totals[key] += entry[key]
+        if entry['added'] or entry['removed'] or entry['modified']:
+            totals['changed'] += 1
+    return totals
+
+
+def build_stats_index(base_path, engine=None, max_workers=None, carried=None, progress=None):
+    """
+    Diff every feat/main pair of a bundle and write the stats index
+    carried ({folder: {file: entry}}, see carried_over_stats) holds entries
+    for pairs known to be unchanged; those pairs are not diffed again.
+    progress(pairs_done, pairs_total, pair) is called once up front with no
+    pair and then as each pair finishes with pair=(folder_id, file_id, entry),
+    entry being None if the pair could not be diffed.
+    Returns the index: {'engine', 'version', 'folders': {...}, 'files': {folder: {file: entry}}}
+    """
+    base_path = Path(base_path)
+    engine = engine or DEFAULT_DIFF_ENGINE
+    structure = get_artifact_structure(base_path)
+    carried = carried or {}
+
+    files = {}
+    pending = []
+    for folder_id, file_id in complete_pairs(structure):
+        entry = carried.get(folder_id, {}).get(file_id)
+        if entry is not None:
+            files.setdefault(folder_id, {})[file_id] = entry
+        else:
+            pending.append((folder_id, file_id))
+
+    total = len(pending) + sum(len(entries) for entries in files.values())
+    done = total - len(pending)
+    if progress:
+        progress(done, total, None)
+    for folder_id, file_id, entry in iter_pair_stats(base_path, pending, engine, max_workers):
+        if entry is not None:
+            files.setdefault(folder_id, {})[file_id] = entry
+        done += 1
+        if progress:
+            progress(done, total, (folder_id, file_id, entry))
+
+    index = {
+        'engine': engine,
+        'version': DIFF_ENGINE_VERSION,
+        'generated_at': time.time(),
+        'folders': {folder_id: summarize_folder(entries) for folder_id, entries in files.items()},
+        'files': files
+    }
+    write_stats_index(base_path, index)
+    return index
+
+
+def _write_json_atomic(path, data):
+    """Write JSON next to its final location, then rename it into place"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def write_stats_index(base_path, index):
+    """Atomically write the stats index into the bundle directory"""
+    _write_json_atomic(Path(base_path) / STATS_INDEX_FILENAME, index)
+
+
+def load_stats_index(base_path):
+    """Read the stats index of a bundle, or None if missing or built by another engine version"""
+    try:
+        with open(Path(base_path) / STATS_INDEX_FILENAME, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != DIFF_ENGINE_VERSION:
+        return None
+    return index
+
+
+def attach_stats(structure, index):
+    """Merge per-file stats from the index into a get_artifact_structure result"""
+    if not index:
+        return structure
+    for folder_id, file_groups in structure.items():
+        folder_stats = index['files'].get(folder_id, {})
+        for file_id, files in file_groups.items():
+            entry = folder_stats.get(file_id)
+            if entry:
+                files['stats'] = {
+                    key: entry[key] for key in ('added', 'removed', 'modified', 'unchanged', 'total')
+                }
+    return structure
+
 
-# Configuration
-UPLOAD_FOLDER = Path(__file__).parent / "uploads"
-UPLOAD_FOLDER.mkdir(exist_ok=True)
+# Run-to-run changes
 
-# Use environment variable or default to uploads/extracted
-# This makes it work on both local and deployed environments
-default_artifacts = UPLOAD_FOLDER / "extracted"
-ARTIFACTS_DIR = Path(os.getenv('ARTIFACTS_DIR', str(default_artifacts)))
+def write_fingerprints(base_path, manifest):
+    """Atomically write the fingerprint manifest into the bundle directory"""
+    _write_json_atomic(Path(base_path) / FINGERPRINTS_FILENAME, manifest)
 
-# If default local path exists, use it (for development)
-local_dev_path = Path("/Users/yeltsinz/Downloads/regression-diffs (1)")
-if local_dev_path.exists():
-    ARTIFACTS_DIR = local_dev_path
 
-# Directory for storing ZIP files for Linear attachments
-LINEAR_ATTACHMENTS_DIR = Path(__file__).parent / 'linear_attachments'
-LINEAR_ATTACHMENTS_DIR.mkdir(exist_ok=True)
+def load_fingerprints(base_path):
+    """
+    Fingerprint manifest of an uploaded bundle, or None for other directories
+    {'files': {member path: sha256}, 'baseline': workspace id or None,
+     'changes': {folder: {file: status}}, 'summary': {...}}
+    """
+    try:
+        with open(Path(base_path) / FINGERPRINTS_FILENAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
 
-# Simple user storage (in production, use a database)
-# Password is hashed using werkzeug.security
-USERS = {
-    'sdet-team@drivetrain.ai': generate_password_hash('OneRing2RuleThemAll'),
-}
+def fingerprint_groups(fingerprints):
+    """Group {member path: sha256} the way get_artifact_structure does: {folder: {file: {side: sha256}}}"""
+    groups = {}
+    for member, digest in fingerprints.items():
+        parts = member.split('/')
+        if len(parts) != 2:
+            continue
+        folder_id, file_name = parts
+        if '-feat' in file_name:
+            side, base_id = 'feat', file_name.replace('-feat', '')
+        elif '-main' in file_name:
+            side, base_id = 'main', file_name.replace('-main', '')
+        else:
+            continue
+        groups.setdefault(folder_id, {}).setdefault(base_id, {})[side] = digest
+    return groups
 
-# Login required decorator
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'logged_in' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
 
+def resolve_baseline(requested, workspace_id):
+    """
+    Workspace an upload is compared against
+    requested is the upload's baseline form field: a workspace ID, 'none' to
+    skip the comparison, or empty for the previous upload.
+    """
+    if requested == 'none':
+        return None
+    if requested:
+        return get_workspace(requested)
+    return previous_upload_workspace(workspace_id)
 
-def extract_artifact(zip_path, extract_to):
-    """Extract scroll bundle zip file"""
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_to)
-    return extract_to
 
+def previous_upload_workspace(workspace_id):
+    """Most recently created upload workspace other than workspace_id, or None"""
+    uploads = [
+        entry for entry in load_workspace_registry().values()
+        if entry['source'] == 'upload' and entry['id'] != workspace_id and Path(entry['path']).exists()
+    ]
+    return max(uploads, key=lambda entry: entry['created_at'], default=None)
 
-def get_artifact_structure(base_path):
+
+def compare_with_baseline(base_path, baseline_id, baseline_path):
     """
-    Get the structure of the scroll directory
-    Returns: {folder_id: [file_pairs]}
+    Mark every file group of a freshly ingested bundle as new, changed or
+    carried_over relative to a baseline bundle, and save the result in the
+    fingerprint manifest. Returns the summary counts, or None if either
+    bundle has no fingerprints.
     """
-    base_path = Path(base_path)
-    structure = {}
-    
-    if not base_path.exists():
+    manifest = load_fingerprints(base_path)
+    baseline = load_fingerprints(baseline_path)
+    if not manifest or not baseline:
+        return None
+    current = fingerprint_groups(manifest['files'])
+    previous = fingerprint_groups(baseline['files'])
+
+    changes = {}
+    counts = Counter()
+    for folder_id, file_groups in current.items():
+        for file_id, sides in file_groups.items():
+            before = previous.get(folder_id, {}).get(file_id)
+            if before is None:
+                status = 'new'
+            elif before == sides:
+                status = 'carried_over'
+            else:
+                status = 'changed'
+            changes.setdefault(folder_id, {})[file_id] = status
+            counts[status] += 1
+    counts['removed'] = sum(
+        1 for folder_id, file_groups in previous.items()
+        for file_id in file_groups if file_id not in current.get(folder_id, {})
+    )
+
+    manifest['baseline'] = baseline_id
+    manifest['changes'] = changes
+    manifest['summary'] = {
+        'baseline': baseline_id,
+        **{status: counts[status] for status in ('new', 'changed', 'carried_over', 'removed')}
+    }
+    write_fingerprints(base_path, manifest)
+    return manifest['summary']
+
+
+def carried_over_stats(base_path, baseline_path, engine=None):
+    """
+    Stats index entries of a baseline bundle whose feat and main scrolls are
+    byte-identical in this bundle: {folder: {file: entry}}
+    Matched on SHA-256, so the entries (content hashes included) stay valid.
+    """
+    engine = engine or DEFAULT_DIFF_ENGINE
+    manifest = load_fingerprints(base_path)
+    index = load_stats_index(baseline_path)
+    if not manifest or not index or index.get('engine') != engine:
+        return {}
+
+    current = fingerprint_groups(manifest['files'])
+    carried = {}
+    for folder_id, file_groups in index['files'].items():
+        for file_id, entry in file_groups.items():
+            sides = current.get(folder_id, {}).get(file_id, {})
+            if sides.get('main') == entry['main_hash'] and sides.get('feat') == entry['feat_hash']:
+                carried.setdefault(folder_id, {})[file_id] = entry
+    return carried
+
+
+def attach_changes(structure, manifest):
+    """Merge new/changed/carried_over statuses into a get_artifact_structure result"""
+    if not manifest or 'changes' not in manifest:
         return structure
-    
-    # Get all subdirectories (like 508, 561, etc.)
-    for folder in sorted(base_path.iterdir()):
-        if folder.is_dir():
-            folder_id = folder.name
-            files = sorted([f.name for f in folder.iterdir() if f.is_file()])
-            
-            # Group files by their base ID (e.g., CHART-426)
-            file_groups = {}
-            for file_name in files:
-                # Extract base ID (everything before -feat or -main)
-                if '-feat' in file_name:
-                    base_id = file_name.replace('-feat', '')
-                    if base_id not in file_groups:
-                        file_groups[base_id] = {}
-                    file_groups[base_id]['feat'] = file_name
-                elif '-main' in file_name:
-                    base_id = file_name.replace('-main', '')
-                    if base_id not in file_groups:
-                        file_groups[base_id] = {}
-                    file_groups[base_id]['main'] = file_name
-            
-            structure[folder_id] = file_groups
-    
+    for folder_id, file_groups in structure.items():
+        folder_changes = manifest['changes'].get(folder_id, {})
+        for file_id, files in file_groups.items():
+            status = folder_changes.get(file_id)
+            if status:
+                files['run_status'] = status
     return structure
 
 
-def read_csv_file(file_path):
-    """Read CSV file and return as list of rows"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            return content.splitlines()
-    except Exception as e:
-        return [f"Error reading file: {str(e)}"]
+# Bundle summary
+# Ranks every pair of a bundle by how much it changed
 
+# Pairs listed in the closing summary record, most severe first
+SUMMARY_TOP_PAIRS = 100
 
-def parse_csv_row(row):
-    """Parse CSV row into structured data"""
-    parts = row.split(',')
-    return {
-        'raw': row,
-        'parts': parts
+
+def pair_severity(entry):
+    """(changed lines, share of the scroll that changed) used to rank pairs"""
+    changed = entry['added'] + entry['removed'] + entry['modified']
+    return changed, round(changed / entry['total'], 4) if entry['total'] else 0.0
+
+
+def _summary_record(folder_id, file_id, entry):
+    changed, ratio = pair_severity(entry)
+    record = {'type': 'pair', 'folder': folder_id, 'file': file_id}
+    record.update({key: entry[key] for key in ('added', 'removed', 'modified', 'unchanged', 'total')})
+    record['changed'] = changed
+    record['change_ratio'] = ratio
+    return record
+
+
+def iter_bundle_summary(base_path, engine=None, max_workers=None, top=SUMMARY_TOP_PAIRS):
+    """
+    Stats for every pair of a bundle as a stream of records
+    Yields a 'start' record, one 'pair' (or 'error') record per pair as it
+    finishes, and a closing 'summary' record with per-folder totals and the
+    most changed pairs sorted by severity. Pairs already in a current stats
+    index are not diffed again, and a complete run writes the index.
+    """
+    base_path = Path(base_path)
+    engine = engine or DEFAULT_DIFF_ENGINE
+    started = time.time()
+    structure = get_artifact_structure(base_path)
+    pairs = list(complete_pairs(structure))
+
+    index = load_stats_index(base_path)
+    indexed = index['files'] if index and index.get('engine') == engine else {}
+    pending = [(f, p) for f, p in pairs if p not in indexed.get(f, {})]
+
+    yield {'type': 'start', 'engine': engine, 'pairs': len(pairs), 'indexed': len(pairs) - len(pending)}
+
+    files = {}
+    done = 0
+    for folder_id, file_id in pairs:
+        entry = indexed.get(folder_id, {}).get(file_id)
+        if entry is not None:
+            files.setdefault(folder_id, {})[file_id] = entry
+            done += 1
+            yield dict(_summary_record(folder_id, file_id, entry), done=done, cached=True)
+
+    failed = 0
+    for folder_id, file_id, entry in iter_pair_stats(base_path, pending, engine, max_workers):
+        done += 1
+        if entry is None:
+            failed += 1
+            yield {'type': 'error', 'folder': folder_id, 'file': file_id, 'done': done}
+            continue
+        files.setdefault(folder_id, {})[file_id] = entry
+        yield dict(_summary_record(folder_id, file_id, entry), done=done, cached=False)
+
+    folders = {folder_id: summarize_folder(entries) for folder_id, entries in files.items()}
+    if pending and not failed:
+        try:
+            write_stats_index(base_path, {
+                'engine': engine,
+                'version': DIFF_ENGINE_VERSION,
+                'generated_at': time.time(),
+                'folders': folders,
+                'files': files
+            })
+        except OSError as e:
+            log.warning("Could not write stats index for %s: %s", base_path, e)
+
+    ranked = sorted(
+        (_summary_record(folder_id, file_id, entry)
+         for folder_id, entries in files.items() for file_id, entry in entries.items()),
+        key=lambda record: (record['changed'], record['change_ratio']),
+        reverse=True
+    )
+    folder_order = sorted(
+        folders,
+        key=lambda folder_id: (folders[folder_id]['changed'],
+                               folders[folder_id]['added'] + folders[folder_id]['removed'] + folders[folder_id]['modified']),
+        reverse=True
+    )
+    yield {
+        'type': 'summary',
+        'engine': engine,
+        'pairs': len(pairs),
+        'changed_pairs': sum(1 for record in ranked if record['changed']),
+        'failed': failed,
+        'elapsed': round(time.time() - started, 3),
+        'folders': {folder_id: folders[folder_id] for folder_id in folder_order},
+        'top': [record for record in ranked[:top] if record['changed']]
     }
 
 
-def calculate_diff_stats(main_content, feat_content):
+# Diff clustering
+# One code change usually produces the same diff in many tenant folders.
+# Pairs are grouped by a digest of their changed lines (identical diffs) and
+# by MinHash/LSH over digit-masked changed lines (near-identical diffs).
+
+# Bump whenever the signature layout or normalization changes
+CLUSTER_VERSION = '1'
+# MinHash permutations, split into LSH bands; 32 bands of 4 rows make
+# pairs above ~0.6 Jaccard similarity candidates with near certainty
+CLUSTER_NUM_PERM = 128
+CLUSTER_BANDS = 32
+# Default estimated Jaccard similarity for two diffs to share a cluster
+CLUSTER_SIMILARITY = 0.8
+# Changed lines of one pair that go into its signature
+CLUSTER_MAX_LINES = 5000
+# Changed lines kept per pair to show what a cluster is about
+CLUSTER_SAMPLE_LINES = 8
+CLUSTER_SEED = 7
+
+# Numbers (ids, counts, amounts) differ per tenant even when the regression is the same
+_DIGITS_RE = re.compile(rb'\d+(?:\.\d+)?')
+# (a, b) of the MinHash permutations, created on first use in each process
+_minhash_params = None
+# Prime just above 2**32 so (a * x + b) stays within uint64 for 32-bit x
+_MINHASH_PRIME = 4294967311
+
+
+def minhash(tokens):
+    """MinHash signature of a set of 32-bit token hashes"""
+    global _minhash_params
+    import numpy as np  # Only clustering pays for the import
+
+    if _minhash_params is None:
+        rng = np.random.default_rng(CLUSTER_SEED)
+        _minhash_params = (
+            rng.integers(1, 1 << 31, CLUSTER_NUM_PERM, dtype=np.uint64),
+            rng.integers(0, 1 << 32, CLUSTER_NUM_PERM, dtype=np.uint64)
+        )
+    a, b = _minhash_params
+    x = np.fromiter(tokens, dtype=np.uint64, count=len(tokens))
+    return ((a[:, None] * x[None, :] + b[:, None]) % np.uint64(_MINHASH_PRIME)).min(axis=1).tolist()
+
+
+def pair_signature(folder_path, file_id, engine=None):
     """
-    Intelligently calculate diff statistics using SequenceMatcher
-    Returns accurate counts of added, removed, modified, and unchanged lines
+    Clustering signature of one pair: digest and MinHash of its changed lines
+    Cached in the diff cache by content hashes; module level for the process pool.
+    Unchanged pairs get changed=0 and no digest.
     """
-    from difflib import SequenceMatcher
-    
-    main_lines = main_content.splitlines()
-    feat_lines = feat_content.splitlines()
-    
-    # Initialize counters
-    added = 0
-    removed = 0
-    modified = 0
-    unchanged = 0
-    
-    # Use SequenceMatcher for accurate line-by-line comparison
-    matcher = SequenceMatcher(None, main_lines, feat_lines)
-    
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            # Lines are identical
-            unchanged += (i2 - i1)
-        elif tag == 'delete':
-            # Lines only in main (removed in feat)
-            removed += (i2 - i1)
-        elif tag == 'insert':
-            # Lines only in feat (added in feat)
-            added += (j2 - j1)
-        elif tag == 'replace':
-            # Lines exist in both but are different (modified)
-            # Count the number of modified lines as the minimum of the two ranges
-            # The difference goes to added or removed
-            main_count = i2 - i1
-            feat_count = j2 - j1
-            
-            if main_count == feat_count:
-                # Same number of lines, all modified
-                modified += main_count
-            elif main_count > feat_count:
-                # More lines in main, some were modified, some were removed
-                modified += feat_count
-                removed += (main_count - feat_count)
-            else:
-                # More lines in feat, some were modified, some were added
-                modified += main_count
-                added += (feat_count - main_count)
-    
+    engine = engine or DEFAULT_DIFF_ENGINE
+    folder_path = Path(folder_path)
+    with ScrollReader(folder_path / f"{file_id}-main") as main, \
+            ScrollReader(folder_path / f"{file_id}-feat") as feat:
+        key = diff_cache_key(main.content_hash, feat.content_hash, f"signature:{engine}:{CLUSTER_VERSION}")
+        entry = diff_cache_get(key)
+        if entry is not None:
+            return entry
+
+        diff, _ = cached_scroll_diff(main, feat, engine)
+        changed = []
+        for tag, i1, i2, j1, j2 in diff['hunks']:
+            changed.extend(b'-' + b' '.join(line.split()) for line in main.raw_lines(i1, i2))
+            changed.extend(b'+' + b' '.join(line.split()) for line in feat.raw_lines(j1, j2))
+            if len(changed) >= CLUSTER_MAX_LINES:
+                del changed[CLUSTER_MAX_LINES:]
+                break
+
+    stats = diff['stats']
+    entry = {
+        'changed': stats['added'] + stats['removed'] + stats['modified'],
+        'digest': None,
+        'minhash': None,
+        'sample': [line.decode('utf-8', 'replace') for line in changed[:CLUSTER_SAMPLE_LINES]]
+    }
+    if changed:
+        entry['digest'] = hashlib.sha256(b'\n'.join(changed)).hexdigest()
+        entry['minhash'] = minhash({zlib.crc32(_DIGITS_RE.sub(b'#', line)) for line in changed})
+    diff_cache_put(key, entry)
+    return entry
+
+
+def cluster_signatures(signatures, threshold=CLUSTER_SIMILARITY):
+    """
+    Group pairs by signature
+    signatures maps (folder_id, file_id) to pair_signature entries of changed
+    pairs. Every digest in a cluster is within threshold of the cluster's
+    representative, so similarity does not chain from one diff to the next.
+    Returns lists of lists of pair keys, one list per exact digest, grouped
+    into clusters; clusters are sorted by size, largest first.
+    """
+    import numpy as np
+
+    exact = {}
+    for pair in sorted(signatures):
+        exact.setdefault(signatures[pair]['digest'], []).append(pair)
+    digests = list(exact)
+    if not digests:
+        return []
+
+    # LSH runs over one representative per digest: identical diffs are already grouped
+    matrix = np.array([signatures[exact[digest][0]]['minhash'] for digest in digests], dtype=np.uint64)
+    parent = list(range(len(digests)))
+    size = [1] * len(digests)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def similar(i, j):
+        return np.count_nonzero(matrix[i] == matrix[j]) >= threshold * CLUSTER_NUM_PERM
+
+    rows = CLUSTER_NUM_PERM // CLUSTER_BANDS
+    for band in range(CLUSTER_BANDS):
+        buckets = {}
+        for i, band_key in enumerate(map(bytes, matrix[:, band * rows:(band + 1) * rows])):
+            buckets.setdefault(band_key, []).append(i)
+        for members in buckets.values():
+            for position, i in enumerate(members[1:], start=1):
+                for j in members[:position]:
+                    root_i, root_j = find(i), find(j)
+                    if root_i == root_j:
+                        continue
+                    # A candidate joins a cluster only if its full signature
+                    # matches the root, the cluster's representative
+                    if size[root_i] == 1 and similar(i, root_j):
+                        parent[i] = root_j
+                        size[root_j] += 1
+                    elif size[root_j] == 1 and similar(j, root_i):
+                        parent[j] = root_i
+                        size[root_i] += 1
+
+    clusters = {}
+    for i, digest in enumerate(digests):
+        clusters.setdefault(find(i), []).append(exact[digest])
+    return sorted(
+        (sorted(groups, key=len, reverse=True) for groups in clusters.values()),
+        key=lambda groups: sum(len(group) for group in groups),
+        reverse=True
+    )
+
+
+def cluster_bundle(base_path, engine=None, threshold=CLUSTER_SIMILARITY, max_workers=None):
+    """
+    Cluster the changed pairs of a bundle in one pass
+    Pairs a current stats index marks as unchanged are not read at all.
+    Each cluster lists its pairs, how many distinct diffs it merges, and the
+    first changed lines of its most common diff.
+    """
+    base_path = Path(base_path)
+    engine = engine or DEFAULT_DIFF_ENGINE
+    started = time.time()
+    pairs = list(complete_pairs(get_artifact_structure(base_path)))
+
+    index = load_stats_index(base_path)
+    indexed = index['files'] if index and index.get('engine') == engine else {}
+
+    def unchanged(folder_id, file_id):
+        entry = indexed.get(folder_id, {}).get(file_id)
+        return entry is not None and not (entry['added'] or entry['removed'] or entry['modified'])
+
+    pending = [(f, p) for f, p in pairs if not unchanged(f, p)]
+    signatures = {}
+    failed = 0
+    for folder_id, file_id, entry in iter_pair_results(pair_signature, base_path, pending, engine, max_workers):
+        if entry is None:
+            failed += 1
+        elif entry['digest'] is not None:
+            signatures[(folder_id, file_id)] = entry
+
+    clusters = []
+    for number, groups in enumerate(cluster_signatures(signatures, threshold), start=1):
+        members = [pair for group in groups for pair in group]
+        representative = signatures[groups[0][0]]
+        clusters.append({
+            'id': number,
+            'size': len(members),
+            'distinct_diffs': len(groups),
+            'folders': len({folder_id for folder_id, _ in members}),
+            'changed': sum(signatures[pair]['changed'] for pair in members),
+            'sample': representative['sample'],
+            'pairs': [{'folder': folder_id, 'file': file_id, 'changed': signatures[(folder_id, file_id)]['changed']}
+                      for folder_id, file_id in members]
+        })
+
     return {
-        'unchanged': unchanged,
-        'modified': modified,
-        'added': added,
-        'removed': removed,
-        'total': max(len(main_lines), len(feat_lines))
+        'engine': engine,
+        'threshold': threshold,
+        'pairs': len(pairs),
+        'changed_pairs': len(signatures),
+        'failed': failed,
+        'elapsed': round(time.time() - started, 3),
+        'clusters': clusters
     }
 
 
@@ -213,8 +2632,8 @@ def compare_files(feat_path, main_path):
         # Parse cell-level differences for modified rows
         cell_diffs = []
         if status == 'modified' and feat_line and main_line:
-            feat_parts = feat_line.split(',')
-            main_parts = main_line.split(',')
+            feat_parts = parse_csv_row(feat_line)['parts']
+            main_parts = parse_csv_row(main_line)['parts']
             max_parts = max(len(feat_parts), len(main_parts))
             
             for j in range(max_parts):
@@ -249,6 +2668,430 @@ def compare_files(feat_path, main_path):
     }
 
 
+# Background jobs
+# Uploads, bundle analysis and bulk Linear filing can run outside the request.
+# Jobs live in a SQLite table shared by every gunicorn worker, and each worker
+# process runs a runner thread that claims queued jobs, so no broker is needed.
+# A job whose worker dies stops sending heartbeats and is queued again,
+# unless its kind allows a single attempt.
+
+JOBS_DB = UPLOAD_FOLDER / 'jobs.sqlite3'
+# Uploaded bundles waiting for their job, kept until the job finishes
+JOBS_DIR = UPLOAD_FOLDER / 'jobs'
+JOB_RUNNER_THREADS = int(os.environ.get('JOB_RUNNER_THREADS', 1))
+JOB_POLL_SECONDS = 1.0
+JOB_HEARTBEAT_SECONDS = 5
+# Running jobs without a heartbeat for this long belong to a dead worker
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 60))
+JOB_MAX_ATTEMPTS = 3
+# Progress is written at most this often, the last update always
+JOB_PROGRESS_INTERVAL = 0.5
+# Finished jobs are deleted after a week
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+# Most events one SSE poll sends, and how often a stream polls the database
+JOB_EVENTS_BATCH = 500
+JOB_EVENTS_POLL_SECONDS = 0.5
+# Comment line sent on idle streams so proxies keep them open
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+JOB_HANDLERS = {}
+# Attempts per kind where it differs from JOB_MAX_ATTEMPTS
+JOB_KIND_MAX_ATTEMPTS = {}
+
+_job_wakeup = threading.Event()
+_job_runner_lock = threading.Lock()
+# PID that started the runner threads; a forked worker starts its own
+_job_runner_pid = None
+_jobs_db_ready = False
+
+
+def job_handler(kind, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Register handler(params, report) -> result for a job kind
+    Jobs of a dead worker are run again up to max_attempts times in all;
+    use 1 for kinds whose side effects must not be repeated.
+    """
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        if max_attempts != JOB_MAX_ATTEMPTS:
+            JOB_KIND_MAX_ATTEMPTS[kind] = max_attempts
+        return func
+    return register
+
+
+def _jobs_connection():
+    """Autocommit connection to the jobs database, created on first use"""
+    global _jobs_db_ready
+    conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if not _jobs_db_ready:
+        # WAL lets workers poll while another one writes progress
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                owner TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat REAL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+        # Ordered events of a job (e.g. one per diffed pair), replayed by the SSE stream
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq)')
+        _jobs_db_ready = True
+    return conn
+
+
+def _job_from_row(row):
+    job = dict(row)
+    for field in ('params', 'progress', 'result'):
+        job[field] = json.loads(job[field]) if job[field] else None
+    return job
+
+
+def enqueue_job(kind, params):
+    """Queue a job for the runner threads and return its ID"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job_id = secrets.token_hex(8)
+    with closing(_jobs_connection()) as conn:
+        conn.execute(
+            'INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?)',
+            (job_id, kind, json.dumps(params), 'queued', time.time())
+        )
+    ensure_job_runner()
+    _job_wakeup.set()
+    return job_id
+
+
+def get_job(job_id):
+    """Job as a dict with params, progress and result decoded, or None"""
+    with closing(_jobs_connection()) as conn:
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return _job_from_row(row) if row else None
+
+
+def busy_job_paths():
+    """Scroll directories queued and running jobs read: their 'path', 'workspace' and 'baseline'"""
+    with closing(_jobs_connection()) as conn:
+        rows = conn.execute("SELECT params FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+    paths = set()
+    for row in rows:
+        params = json.loads(row['params'])
+        if params.get('path'):
+            paths.add(params['path'])
+        for key in ('workspace', 'baseline'):
+            if params.get(key):
+                paths.add(str(WORKSPACES_DIR / params[key]))
+    return paths
+
+
+def get_job_events(job_id, after=0, limit=JOB_EVENTS_BATCH):
+    """Events of a job with a sequence number above after: [(seq, type, data JSON)]"""
+    with closing(_jobs_connection()) as conn:
+        return conn.execute(
+            'SELECT seq, type, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?',
+            (job_id, after, limit)
+        ).fetchall()
+
+
+def list_jobs(limit=50):
+    """Most recent jobs first"""
+    with closing(_jobs_connection()) as conn:
+        rows = conn.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+    return [_job_from_row(row) for row in rows]
+
+
+def _claim_job(owner):
+    """
+    Requeue jobs of dead workers, then atomically take the oldest queued job
+    Returns the claimed job or None
+    """
+    now = time.time()
+    with closing(_jobs_connection()) as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            limits = [value for item in JOB_KIND_MAX_ATTEMPTS.items() for value in item]
+            conn.execute(
+                """UPDATE jobs SET status = 'failed', error = 'Worker stopped responding', finished_at = ?
+                   WHERE status = 'running' AND heartbeat < ? AND attempts >= CASE kind """
+                + 'WHEN ? THEN ? ' * len(JOB_KIND_MAX_ATTEMPTS) + 'ELSE ? END',
+                (now, now - JOB_STALE_SECONDS, *limits, JOB_MAX_ATTEMPTS)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL WHERE status = 'running' AND heartbeat < ?",
+                (now - JOB_STALE_SECONDS,)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (now - JOB_RETENTION_SECONDS,)
+            )
+            conn.execute('DELETE FROM job_events WHERE job_id NOT IN (SELECT id FROM jobs)')
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    """UPDATE jobs SET status = 'running', owner = ?, started_at = ?, heartbeat = ?,
+                       attempts = attempts + 1 WHERE id = ?""",
+                    (owner, now, now, row['id'])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    return _job_from_row(row) if row else None
+
+
+class JobReporter:
+    """
+    Progress callback handed to job handlers: report(stage='extract', done=3, total=10)
+    report.event(type, **data) records an event for the SSE stream.
+    Writes are throttled and batched; everything pending is written when the
+    job finishes. Updates only land while this runner still owns the job.
+    """
+
+    def __init__(self, job_id, owner):
+        self.job_id = job_id
+        self.owner = owner
+        self._last_write = 0.0
+        self._latest = None
+        self._events = []
+
+    def __call__(self, force=False, **progress):
+        self._latest = progress
+        self._maybe_flush(force)
+
+    def event(self, event_type, force=False, **data):
+        self._events.append((self.job_id, event_type, json.dumps(data)))
+        self._maybe_flush(force)
+
+    def heartbeat(self):
+        self._update('heartbeat = ?', time.time())
+
+    def finish(self, status, result=None, error=None):
+        self._flush()
+        self._update('status = ?, result = ?, error = ?, finished_at = ?',
+                     status, json.dumps(result) if result is not None else None, error, time.time())
+
+    def _maybe_flush(self, force):
+        if force or time.time() - self._last_write >= JOB_PROGRESS_INTERVAL:
+            self._flush()
+
+    def _flush(self):
+        self._last_write = time.time()
+        with closing(_jobs_connection()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            owned = conn.execute(
+                'UPDATE jobs SET progress = ?, heartbeat = ? WHERE id = ? AND owner = ?',
+                (json.dumps(self._latest) if self._latest else None, self._last_write, self.job_id, self.owner)
+            ).rowcount
+            if owned and self._events:
+                conn.executemany('INSERT INTO job_events (job_id, type, data) VALUES (?, ?, ?)', self._events)
+            conn.execute('COMMIT')
+        self._events = []
+
+    def _update(self, assignments, *values):
+        with closing(_jobs_connection()) as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ? AND owner = ?',
+                         (*values, self.job_id, self.owner))
+
+
+def _run_job(job, owner):
+    # Log records written while the job runs carry its id
+    request_id_var.set(job['id'])
+    reporter = JobReporter(job['id'], owner)
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            reporter.heartbeat()
+
+    threading.Thread(target=beat, daemon=True).start()
+    started = time.time()
+    try:
+        result = JOB_HANDLERS[job['kind']](job['params'], reporter)
+        reporter.finish('done', result)
+        log.info("Job %s (%s) done in %.1fs", job['id'], job['kind'], time.time() - started)
+    except Exception as e:
+        reporter.finish('failed', error=str(e))
+        log.exception("Job %s (%s) failed", job['id'], job['kind'])
+    finally:
+        stop.set()
+
+
+def _job_runner():
+    owner = f"{os.getpid()}-{threading.get_ident()}"
+    while True:
+        try:
+            job = _claim_job(owner)
+            if job is not None:
+                _run_job(job, owner)
+                continue
+        except Exception as e:
+            log.exception("Job runner error")
+        # Idle workers still publish their latest metrics
+        _maybe_flush_metrics()
+        _job_wakeup.wait(JOB_POLL_SECONDS)
+        _job_wakeup.clear()
+
+
+def ensure_job_runner():
+    """Start this process's runner threads unless they are already running"""
+    global _job_runner_pid
+    if _job_runner_pid == os.getpid():
+        return
+    with _job_runner_lock:
+        if _job_runner_pid == os.getpid():
+            return
+        for _ in range(JOB_RUNNER_THREADS):
+            threading.Thread(target=_job_runner, name='job-runner', daemon=True).start()
+        _job_runner_pid = os.getpid()
+
+
+def _pair_reporter(report):
+    """build_stats_index progress callback that records a 'pair' event per finished pair"""
+    def progress(done, total, pair):
+        if pair is not None:
+            folder_id, file_id, entry = pair
+            stats = {key: entry[key] for key in ('added', 'removed', 'modified', 'unchanged', 'total')} if entry else None
+            report.event('pair', folder=folder_id, file=file_id, stats=stats, done=done, total=total)
+        report(stage='diff', done=done, total=total)
+    return progress
+
+
+@job_handler('upload')
+def run_upload_job(params, report):
+    """Extract and analyze a bundle parked in JOBS_DIR by an async /api/upload"""
+    def progress(stage, **data):
+        if stage == 'ready':
+            # The workspace can be browsed while its pairs are still being diffed
+            report.event('ready', force=True, **data)
+        else:
+            report(stage=stage, **data)
+
+    zip_path = Path(params['zip'])
+    try:
+        with open(zip_path, 'rb') as stream:
+            workspace_path, ingest = ingest_upload(
+                stream, params['workspace'], params['name'], params.get('baseline'),
+                progress=progress, pair_progress=_pair_reporter(report)
+            )
+    finally:
+        # Left in place only if the worker dies, so the retry can use it
+        zip_path.unlink(missing_ok=True)
+
+    structure = get_artifact_structure(workspace_path)
+    register_workspace(params['workspace'], workspace_path, params['name'], 'upload',
+                       artifact_count=len(structure))
+    manifest = load_fingerprints(workspace_path)
+    return {
+        'workspace': params['workspace'],
+        'reused': ingest is None,
+        'artifact_count': len(structure),
+        'file_count': sum(len(file_groups) for file_groups in structure.values()),
+        'ingest': ingest,
+        'changes': manifest.get('summary') if manifest else None
+    }
+
+
+@job_handler('analyze')
+def run_analyze_job(params, report):
+    """Rebuild the stats index of a scroll directory"""
+    index = build_stats_index(params['path'], params.get('engine'), progress=_pair_reporter(report))
+    return {
+        'engine': index['engine'],
+        'pairs': sum(len(entries) for entries in index['files'].values()),
+        'folders': index['folders']
+    }
+
+
+# Never run twice: a retry would file every issue created before the worker died again
+@job_handler('linear-issues', max_attempts=1)
+def run_linear_issues_job(params, report):
+    """Bulk Linear filing queued by /api/linear/create-issues?async=1"""
+    body, status = file_linear_issues(
+        Path(params['path']), params['items'], params['assigneeId'], params['attachZip'], progress=report
+    )
+    if status != 200:
+        raise RuntimeError(body['error'])
+    return body
+
+
+@job_handler('attachment-zip')
+def run_attachment_zip_job(params, report):
+    """Build the Linear attachment ZIPs named while filing issues"""
+    filenames = params['filenames']
+    built = 0
+    for done, filename in enumerate(filenames, start=1):
+        if ensure_attachment_zip(filename) is not None:
+            built += 1
+        report(stage='zip', done=done, total=len(filenames))
+    return {'zips': built, 'missing': len(filenames) - built}
+
+
+# Response compression
+# Negotiated per request from Accept-Encoding; brotli is used when installed
+
+# Smaller bodies are not worth the compression overhead
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_MIMETYPES = {
+    'application/json', 'text/html', 'text/css', 'text/plain', 'text/csv', 'application/javascript'
+}
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+# Quality 5 compresses JSON better than gzip -6 in about the same time
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+
+def compress_body(data, encoding):
+    """Compress a response body with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+@app.after_request
+def compress_response(response):
+    """Compress buffered text responses with the best encoding the client accepts"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli else ['gzip'])
+    if encoding is None:
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    
+    response.set_data(compress_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The bytes differ per encoding, so a strong validator becomes a weak one
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page"""
@@ -282,23 +3125,93 @@ def index():
     return render_template('dashboard.html', username=session.get('username'))
 
 
-@app.route('/compare')
+@app.route('/compare')
+@login_required
+def compare_view():
+    """Comparison interface"""
+    return render_template('index.html', username=session.get('username'))
+
+
+@app.route('/api/structure')
+@login_required
+def get_structure():
+    """Get scroll directory structure"""
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return jsonify({'error': 'Workspace not found'}), 404
+    
+    # Check if the scroll directory exists
+    if not artifacts_dir.exists():
+        return jsonify({})
+    
+    # The browser revalidates with If-None-Match and gets a 304 while the tree is unchanged
+    index = load_structure_index(artifacts_dir)
+    etag = structure_etag(artifacts_dir, index)
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        structure = structure_from_index(index)
+        attach_stats(structure, load_stats_index(artifacts_dir))
+        attach_changes(structure, load_fingerprints(artifacts_dir))
+        response = jsonify(structure)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@app.route('/api/summary')
 @login_required
-def compare_view():
-    """Comparison interface"""
-    return render_template('index.html', username=session.get('username'))
+def bundle_summary():
+    """
+    Stats for every pair of the workspace, streamed as NDJSON as pairs finish
+    The last line ranks folders and pairs by severity; see iter_bundle_summary
+    """
+    engine = request.args.get('engine', DEFAULT_DIFF_ENGINE)
+    if engine not in DIFF_ENGINES:
+        return jsonify({'error': f'Unknown diff engine: {engine}'}), 400
+    top = _int_arg('top', SUMMARY_TOP_PAIRS)
+    if top is None or top < 0:
+        return jsonify({'error': 'Invalid parameters'}), 400
+    
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return jsonify({'error': 'Workspace not found'}), 404
+    
+    def generate():
+        for record in iter_bundle_summary(artifacts_dir, engine, top=top):
+            yield json.dumps(record, separators=(',', ':')) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        # Tell nginx not to buffer, so records reach the client as pairs finish
+        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'}
+    )
 
 
-@app.route('/api/structure')
+@app.route('/api/clusters')
 @login_required
-def get_structure():
-    """Get scroll directory structure"""
-    # Check if ARTIFACTS_DIR exists and has content
-    if not ARTIFACTS_DIR.exists() or not any(ARTIFACTS_DIR.iterdir()):
-        return jsonify({})
+def diff_clusters():
+    """
+    Changed pairs of the workspace grouped into clusters of identical or
+    near-identical diffs; threshold is the minimum estimated similarity of
+    each diff to its cluster's representative
+    """
+    engine = request.args.get('engine', DEFAULT_DIFF_ENGINE)
+    if engine not in DIFF_ENGINES:
+        return jsonify({'error': f'Unknown diff engine: {engine}'}), 400
+    try:
+        threshold = float(request.args.get('threshold', CLUSTER_SIMILARITY))
+    except ValueError:
+        threshold = None
+    if threshold is None or not 0 < threshold <= 1:
+        return jsonify({'error': 'Invalid parameters'}), 400
     
-    structure = get_artifact_structure(ARTIFACTS_DIR)
-    return jsonify(structure)
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return jsonify({'error': 'Workspace not found'}), 404
+    
+    return jsonify(dict(cluster_bundle(artifacts_dir, engine, threshold), success=True))
 
 
 @app.route('/api/compare')
@@ -307,41 +3220,341 @@ def compare():
     """Compare two files and return full contents for Monaco Editor"""
     folder = request.args.get('folder')
     file_id = request.args.get('file')
+    engine = request.args.get('engine', DEFAULT_DIFF_ENGINE)
     
     if not folder or not file_id:
         return jsonify({'error': 'Missing parameters'}), 400
     
-    feat_path = ARTIFACTS_DIR / folder / f"{file_id}-feat"
-    main_path = ARTIFACTS_DIR / folder / f"{file_id}-main"
+    if engine not in DIFF_ENGINES:
+        return jsonify({'error': f'Unknown diff engine: {engine}'}), 400
+    
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return jsonify({'error': 'Workspace not found'}), 404
+    
+    feat_path = artifacts_dir / folder / f"{file_id}-feat"
+    main_path = artifacts_dir / folder / f"{file_id}-main"
     
     if not feat_path.exists() or not main_path.exists():
         return jsonify({'error': 'Files not found'}), 404
     
-    # Read full file contents
+    stats_only = request.args.get('stats_only') == '1'
+    payload_format = request.args.get('format', 'full')
+    if payload_format not in ('full', 'delta'):
+        return jsonify({'error': f'Unknown format: {payload_format}'}), 400
+    
+    # Calculate statistics using intelligent diff algorithm (cached by content hash)
     try:
-        with open(main_path, 'r', encoding='utf-8') as f:
-            main_content = f.read()
-        with open(feat_path, 'r', encoding='utf-8') as f:
-            feat_content = f.read()
-    except Exception as e:
+        with ScrollReader(main_path) as main, ScrollReader(feat_path) as feat:
+            diff, cache_hit = cached_scroll_diff(main, feat, engine)
+            
+            response = {
+                'folder_id': folder,
+                'file_id': file_id,
+                'engine': engine,
+                'cached': cache_hit,
+                'stats': diff['stats']
+            }
+            if not stats_only:
+                response['main_content'] = main.read_text()
+                if payload_format == 'delta':
+                    response['feat_delta'] = line_delta(feat, diff['hunks'])
+                else:
+                    response['feat_content'] = feat.read_text()
+    except (OSError, UnicodeDecodeError) as e:
         return jsonify({'error': f'Error reading files: {str(e)}'}), 500
     
-    # Calculate statistics using intelligent diff algorithm
-    stats = calculate_diff_stats(main_content, feat_content)
+    return jsonify(response)
+
+
+def line_delta(feat, hunks):
+    """
+    The feat scroll as edits against main, from the cached diff hunks
+    Each edit is [equal lines since the previous hunk, main lines replaced,
+    feat lines inserted]; 'inserted' holds the inserted feat lines in order.
+    Equal lines are the same on both sides, so one gap count covers both.
+    Lines come from ScrollReader, so carriage returns are not kept.
+    """
+    edits = []
+    inserted = []
+    previous = 0
+    for tag, i1, i2, j1, j2 in hunks:
+        edits.append([i1 - previous, i2 - i1, j2 - j1])
+        if j2 > j1:
+            inserted.extend(feat.lines(j1, j2))
+        previous = i2
+    return {
+        'edits': edits,
+        'inserted': inserted,
+        'lines': len(feat),
+        'final_newline': feat.final_newline
+    }
+
+
+# Windowed compare API for scrolls too large to ship in one response
+
+# Most lines one /api/compare/lines call returns
+COMPARE_WINDOW_MAX_LINES = 5000
+# Context lines around a hunk from /api/compare/hunk
+COMPARE_HUNK_CONTEXT = 3
+
+
+def _resolve_pair():
+    """
+    Paths of the pair named by ?folder=&file= in the current workspace
+    Returns (main_path, feat_path, None) or (None, None, error_response)
+    """
+    folder = request.args.get('folder')
+    file_id = request.args.get('file')
+    if not folder or not file_id:
+        return None, None, (jsonify({'error': 'Missing parameters'}), 400)
+    
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return None, None, (jsonify({'error': 'Workspace not found'}), 404)
+    
+    main_path = artifacts_dir / folder / f"{file_id}-main"
+    feat_path = artifacts_dir / folder / f"{file_id}-feat"
+    if not feat_path.exists() or not main_path.exists():
+        return None, None, (jsonify({'error': 'Files not found'}), 404)
+    return main_path, feat_path, None
+
+
+def _int_arg(name, default):
+    try:
+        return int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return None
+
+
+@app.route('/api/compare/summary')
+@login_required
+def compare_summary():
+    """Stats, line counts and changed hunks of a pair, without file contents"""
+    engine = request.args.get('engine', DEFAULT_DIFF_ENGINE)
+    if engine not in DIFF_ENGINES:
+        return jsonify({'error': f'Unknown diff engine: {engine}'}), 400
+    
+    main_path, feat_path, error = _resolve_pair()
+    if error:
+        return error
+    
+    try:
+        with ScrollReader(main_path) as main, ScrollReader(feat_path) as feat:
+            entry, cache_hit = cached_scroll_diff(main, feat, engine)
+            main_lines, feat_lines = len(main), len(feat)
+            main_size, feat_size = main.size, feat.size
+    except OSError as e:
+        return jsonify({'error': f'Error reading files: {str(e)}'}), 500
     
     return jsonify({
-        'folder_id': folder,
-        'file_id': file_id,
-        'main_content': main_content,
-        'feat_content': feat_content,
-        'stats': stats
+        'folder_id': request.args['folder'],
+        'file_id': request.args['file'],
+        'engine': engine,
+        'cached': cache_hit,
+        'stats': entry['stats'],
+        'main_lines': main_lines,
+        'feat_lines': feat_lines,
+        'main_size': main_size,
+        'feat_size': feat_size,
+        # [tag, main_start, main_end, feat_start, feat_end], 0-based and end-exclusive
+        'hunks': entry['hunks']
+    })
+
+
+@app.route('/api/compare/lines')
+@login_required
+def compare_lines():
+    """A window of lines from one side: ?side=main|feat&start=0&end=500 (0-based, end-exclusive)"""
+    side = request.args.get('side')
+    start = _int_arg('start', 0)
+    end = _int_arg('end', COMPARE_WINDOW_MAX_LINES)
+    if side not in ('main', 'feat') or start is None or end is None or start < 0 or end < start:
+        return jsonify({'error': 'Invalid parameters'}), 400
+    end = min(end, start + COMPARE_WINDOW_MAX_LINES)
+    
+    main_path, feat_path, error = _resolve_pair()
+    if error:
+        return error
+    
+    try:
+        with ScrollReader(main_path if side == 'main' else feat_path) as scroll:
+            total = len(scroll)
+            lines = scroll.lines(start, end)
+    except (OSError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Error reading files: {str(e)}'}), 500
+    
+    return jsonify({
+        'side': side,
+        'start': start,
+        'end': min(end, total),
+        'total': total,
+        'lines': lines
+    })
+
+
+@app.route('/api/compare/hunk')
+@login_required
+def compare_hunk():
+    """Both sides of one changed hunk with context: ?index=N&context=3"""
+    engine = request.args.get('engine', DEFAULT_DIFF_ENGINE)
+    index = _int_arg('index', -1)
+    context = _int_arg('context', COMPARE_HUNK_CONTEXT)
+    if engine not in DIFF_ENGINES or index is None or index < 0 or context is None or context < 0:
+        return jsonify({'error': 'Invalid parameters'}), 400
+    
+    main_path, feat_path, error = _resolve_pair()
+    if error:
+        return error
+    
+    try:
+        with ScrollReader(main_path) as main, ScrollReader(feat_path) as feat:
+            entry, _ = cached_scroll_diff(main, feat, engine)
+            if index >= len(entry['hunks']):
+                return jsonify({'error': 'Hunk not found'}), 404
+            
+            tag, i1, i2, j1, j2 = entry['hunks'][index]
+            main_start, feat_start = max(0, i1 - context), max(0, j1 - context)
+            main_lines = main.lines(main_start, i2 + context)
+            feat_lines = feat.lines(feat_start, j2 + context)
+    except (OSError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Error reading files: {str(e)}'}), 500
+    
+    return jsonify({
+        'index': index,
+        'hunk': [tag, i1, i2, j1, j2],
+        'main': {'start': main_start, 'lines': main_lines},
+        'feat': {'start': feat_start, 'lines': feat_lines}
+    })
+
+
+@app.route('/api/compare/cells')
+@login_required
+def compare_cells():
+    """
+    Cell-level CSV diff with rows aligned on key columns: ?key=col1,col2 (auto-detected if omitted)
+    ?numeric=1 compares numbers within ?atol= and ?rtol= instead of as text
+    """
+    key_columns = [name for name in request.args.get('key', '').split(',') if name]
+    tolerance = None
+    if request.args.get('numeric') == '1':
+        try:
+            tolerance = (float(request.args.get('atol', NUMERIC_ATOL)),
+                         float(request.args.get('rtol', NUMERIC_RTOL)))
+        except ValueError:
+            return jsonify({'error': 'Invalid tolerance'}), 400
+        if min(tolerance) < 0:
+            return jsonify({'error': 'Invalid tolerance'}), 400
+    
+    main_path, feat_path, error = _resolve_pair()
+    if error:
+        return error
+    
+    try:
+        with ScrollReader(main_path) as main, ScrollReader(feat_path) as feat:
+            entry, cache_hit = cached_csv_diff(main, feat, key_columns, tolerance)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': f'Error reading files: {str(e)}'}), 500
+    except ValueError as e:
+        # Unknown key column
+        return jsonify({'error': str(e)}), 400
+    
+    response = dict(entry)
+    response.update({
+        'folder_id': request.args['folder'],
+        'file_id': request.args['file'],
+        'mode': 'numeric' if tolerance else 'cells',
+        'tolerance': {'atol': tolerance[0], 'rtol': tolerance[1]} if tolerance else None,
+        'cached': cache_hit
     })
+    return jsonify(response)
+
+
+def ingest_upload(stream, workspace_id, name, baseline=None, progress=None, pair_progress=None):
+    """
+    Extract an uploaded bundle into its workspace and diff every pair
+    The workspace is registered as soon as its scrolls are extracted, so it
+    can be browsed while the pairs are diffed. baseline is the upload's
+    baseline form field, see resolve_baseline. progress(stage, **data) gets
+    'extract' (done, total, bytes_written) and 'ready' (workspace) updates;
+    pair_progress is passed on to build_stats_index. Returns
+    (workspace_path, ingest summary), with no summary if the workspace
+    already existed. An existing workspace without a stats index (its
+    worker died while diffing) gets one built here.
+    """
+    workspace = get_workspace(workspace_id)
+    if workspace is not None:
+        workspace_path = Path(workspace['path'])
+        if load_stats_index(workspace_path) is None:
+            if progress:
+                progress('ready', workspace=workspace_id)
+            try:
+                build_stats_index(workspace_path, progress=pair_progress)
+            except Exception as e:
+                log.exception("Failed to build stats index")
+        return workspace_path, None
+    
+    workspace_path = WORKSPACES_DIR / workspace_id
+    # Extract next to the final location, then rename into place so
+    # other workers never see a half-extracted workspace
+    staging = Path(tempfile.mkdtemp(dir=WORKSPACES_DIR, prefix=f".{workspace_id}-"))
+    # mkdtemp creates 0700; nginx must be able to read offloaded downloads
+    os.chmod(staging, 0o755)
+    try:
+        # Stream scroll members straight out of the upload, the ZIP itself is never saved
+        ingest = ingest_artifact(
+            stream, staging,
+            progress=(lambda done, total, written: progress(
+                'extract', done=done, total=total, bytes_written=written)) if progress else None
+        )
+        log.info("Ingested %d scrolls (%d bytes, %d already stored), skipped %d other members",
+                 ingest['members'], ingest['bytes_written'], ingest['reused'], ingest['skipped'])
+        
+        # Pairs byte-identical to the previous run keep that run's stats,
+        # only new and changed pairs are diffed
+        carried = None
+        baseline = resolve_baseline(baseline, workspace_id)
+        if baseline is not None:
+            try:
+                changes = compare_with_baseline(staging, baseline['id'], baseline['path'])
+                carried = carried_over_stats(staging, baseline['path'])
+                if changes:
+                    log.info("Compared with %s: %d new, %d changed, %d carried over, %d removed",
+                             baseline['id'], changes['new'], changes['changed'],
+                             changes['carried_over'], changes['removed'])
+            except Exception as e:
+                log.exception("Failed to compare with previous run")
+        
+        try:
+            os.rename(staging, workspace_path)
+        except OSError:
+            # Another worker extracted the same bundle first and diffs it
+            shutil.rmtree(staging, ignore_errors=True)
+            return workspace_path, ingest
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    
+    register_workspace(workspace_id, workspace_path, name, 'upload')
+    if progress:
+        progress('ready', workspace=workspace_id)
+    
+    # Diff every pair up front so the tree can show change counts
+    try:
+        build_stats_index(workspace_path, carried=carried, progress=pair_progress)
+    except Exception as e:
+        log.exception("Failed to build stats index")
+    return workspace_path, ingest
 
 
 @app.route('/api/upload', methods=['POST'])
 @login_required
 def upload_artifact():
-    """Upload and extract scroll bundle zip file"""
+    """
+    Upload and extract scroll bundle zip file
+    With ?async=1 the bundle is queued as an 'upload' job and the job ID is
+    returned at once (202); poll /api/jobs/<id> for progress and the result.
+    """
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
     
@@ -352,82 +3565,157 @@ def upload_artifact():
     if not file.filename.endswith('.zip'):
         return jsonify({'error': 'Only ZIP files are allowed'}), 400
     
+    async_upload = request.args.get('async') == '1'
     try:
-        # Save uploaded file
-        zip_path = UPLOAD_FOLDER / file.filename
-        file.save(zip_path)
+        stream = file.stream
+        if not stream.seekable():
+            stream = spool_stream(stream)
         
-        # Extract to artifacts directory
-        extract_to = UPLOAD_FOLDER / 'extracted'
-        # Clear previous extraction
-        if extract_to.exists():
-            shutil.rmtree(extract_to)
-        extract_to.mkdir(exist_ok=True)
+        # Identical bundles map to the same workspace and are only extracted once
+        workspace_id = upload_workspace_id(stream)
+        baseline = request.form.get('baseline')
         
-        extract_artifact(zip_path, extract_to)
+        if async_upload:
+            if not zipfile.is_zipfile(stream):
+                raise zipfile.BadZipFile()
+            stream.seek(0)
+            # Park the upload on disk so the job survives a worker restart
+            JOBS_DIR.mkdir(exist_ok=True)
+            zip_path = JOBS_DIR / f"{workspace_id}-{secrets.token_hex(4)}.zip"
+            with open(zip_path, 'wb') as dst:
+                shutil.copyfileobj(stream, dst, INGEST_CHUNK_SIZE)
+            file.close()
+            job_id = enqueue_job('upload', {
+                'zip': str(zip_path),
+                'workspace': workspace_id,
+                'name': file.filename,
+                'baseline': baseline
+            })
+            return jsonify({
+                'success': True,
+                'job': job_id,
+                'status': 'queued',
+                'workspace': workspace_id,
+                'status_url': url_for('job_status', job_id=job_id)
+            }), 202
+        
+        workspace_path, ingest = ingest_upload(stream, workspace_id, file.filename, baseline)
+        file.close()
         
-        # Update global artifacts directory (for this session)
-        global ARTIFACTS_DIR
-        ARTIFACTS_DIR = extract_to
+        structure = attach_stats(get_artifact_structure(workspace_path), load_stats_index(workspace_path))
+        manifest = load_fingerprints(workspace_path)
+        attach_changes(structure, manifest)
+        register_workspace(workspace_id, workspace_path, file.filename, 'upload', artifact_count=len(structure))
         
-        # Get structure to return
-        structure = get_artifact_structure(ARTIFACTS_DIR)
+        # Select the new workspace for this user's session
+        session['workspace'] = workspace_id
         
         return jsonify({
             'success': True,
             'message': 'Scroll uploaded and extracted successfully',
+            'workspace': workspace_id,
+            'reused': ingest is None,
             'artifact_count': len(structure),
+            'ingest': ingest,
+            'changes': manifest.get('summary') if manifest else None,
             'structure': structure
         })
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'Uploaded file is not a valid ZIP archive'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# Downloads
+# With DOWNLOAD_OFFLOAD=nginx the worker only authorizes a download: it
+# answers with an X-Accel-Redirect to an internal nginx location (see
+# deploy-ec2.sh) and nginx sends the file with sendfile. Otherwise send_file
+# streams it. Both honour Range requests and conditional GETs.
+
+DOWNLOAD_OFFLOAD = os.environ.get('DOWNLOAD_OFFLOAD', '')
+# Internal nginx location under which each offloadable directory is aliased
+DOWNLOAD_OFFLOAD_PREFIX = '/_protected'
+
+
+def _offload_roots():
+    """Directories nginx can serve, by their name below DOWNLOAD_OFFLOAD_PREFIX"""
+    return {'uploads': UPLOAD_FOLDER, 'linear_attachments': LINEAR_ATTACHMENTS_DIR}
+
+
+def send_download(path, download_name, mimetype):
+    """Send a file as an attachment, through nginx when offloading is on and it can reach the file"""
+    path = Path(path)
+    if DOWNLOAD_OFFLOAD == 'nginx':
+        resolved = path.resolve()
+        for name, root in _offload_roots().items():
+            try:
+                relative = resolved.relative_to(Path(root).resolve())
+            except ValueError:
+                continue
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = f"{DOWNLOAD_OFFLOAD_PREFIX}/{name}/{quote(relative.as_posix())}"
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+            inc('wizardview_downloads_total', mode='offload')
+            return response
+    
+    inc('wizardview_downloads_total', mode='send_file')
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=download_name, conditional=True)
+
+
 @app.route('/api/download-zip/<filename>')
 def download_zip(filename):
     """
     Download ZIP file from linear_attachments folder
     Note: No login required - this endpoint is used by Linear attachments
-    Files are accessed via specific filenames only (tenant-chart-id.zip)
+    Files are accessed via specific filenames only (tenant-chart-key.zip)
     """
     try:
         # Security: Only allow downloading from linear_attachments directory
         # and prevent directory traversal attacks
-        if '..' in filename or '/' in filename:
+        if '..' in filename or '/' in filename or not filename.endswith('.zip'):
             return jsonify({'error': 'Invalid filename'}), 400
         
-        zip_path = LINEAR_ATTACHMENTS_DIR / filename
-        
-        # Log the request for debugging
-        print(f"📥 ZIP download requested: {filename}", flush=True)
-        print(f"   Looking in: {LINEAR_ATTACHMENTS_DIR}", flush=True)
-        print(f"   Full path: {zip_path}", flush=True)
-        print(f"   Exists: {zip_path.exists()}", flush=True)
-        
-        if not zip_path.exists():
-            # List available files for debugging
-            available_files = list(LINEAR_ATTACHMENTS_DIR.glob('*.zip'))
-            print(f"   Available ZIP files: {[f.name for f in available_files]}", flush=True)
+        # Built here if its job has not run yet or eviction removed it
+        zip_path = ensure_attachment_zip(filename)
+        if zip_path is None:
+            log.warning("ZIP download not found: %s", filename)
             return jsonify({'error': 'ZIP file not found'}), 404
         
-        print(f"   ✅ Sending file: {zip_path.name}", flush=True)
-        return send_file(
-            zip_path,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=filename
-        )
+        log.debug("Sending ZIP %s", zip_path)
+        return send_download(zip_path, filename, 'application/zip')
     except Exception as e:
-        print(f"   ❌ Error downloading ZIP: {str(e)}", flush=True)
+        log.exception("Error downloading ZIP %s", filename)
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/scroll/raw')
+@login_required
+def download_scroll():
+    """One scroll of the workspace as stored, as a download; ?branch=main|feat"""
+    folder = request.args.get('folder')
+    file_id = request.args.get('file')
+    branch = request.args.get('branch')
+    if not folder or not file_id or branch not in ('main', 'feat'):
+        return jsonify({'error': 'Invalid parameters'}), 400
+    
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return jsonify({'error': 'Workspace not found'}), 404
+    
+    scroll_path = artifacts_dir / folder / f"{file_id}-{branch}"
+    # Only scrolls inside the workspace can be downloaded
+    if not scroll_path.resolve().is_relative_to(artifacts_dir.resolve()):
+        return jsonify({'error': 'Invalid parameters'}), 400
+    if not scroll_path.is_file():
+        return jsonify({'error': 'File not found'}), 404
+    
+    return send_download(scroll_path, f"{folder}-{file_id}-{branch}", 'text/plain')
+
+
 @app.route('/api/use-sample')
 @login_required
 def use_sample():
     """Use the sample scroll directory (development only)"""
-    global ARTIFACTS_DIR
-    
     # Try to get sample path from environment variable first
     sample_path = os.getenv('SAMPLE_SCROLLS_PATH', '/Users/yeltsinz/Downloads/regression-diffs (1)')
     sample_path = Path(sample_path)
@@ -441,17 +3729,172 @@ def use_sample():
             'hint': 'Set SAMPLE_SCROLLS_PATH environment variable or upload scrolls via the dashboard'
         }), 404
     
-    ARTIFACTS_DIR = sample_path
-    structure = get_artifact_structure(ARTIFACTS_DIR)
+    structure = attach_stats(get_artifact_structure(sample_path), load_stats_index(sample_path))
+    workspace_id = path_workspace_id(sample_path)
+    register_workspace(workspace_id, sample_path, sample_path.name, 'sample', artifact_count=len(structure))
+    session['workspace'] = workspace_id
     
     return jsonify({
         'success': True,
         'message': f'Using sample scroll directory: {sample_path}',
+        'workspace': workspace_id,
         'artifact_count': len(structure),
         'structure': structure
     })
 
 
+@app.route('/api/workspaces')
+@login_required
+def list_workspaces():
+    """List every workspace in the shared registry, most recently used first"""
+    workspaces = [
+        entry for entry in load_workspace_registry().values()
+        if Path(entry['path']).exists()
+    ]
+    workspaces.sort(key=lambda e: e['last_used_at'], reverse=True)
+    return jsonify({
+        'success': True,
+        'current': session.get('workspace'),
+        'workspaces': workspaces
+    })
+
+
+@app.route('/api/workspaces/<workspace_id>/select', methods=['POST'])
+@login_required
+def select_workspace(workspace_id):
+    """Make a workspace the default for this session"""
+    workspace = get_workspace(workspace_id)
+    if workspace is None:
+        return jsonify({'success': False, 'error': 'Workspace not found'}), 404
+    
+    session['workspace'] = workspace_id
+    return jsonify({'success': True, 'workspace': workspace})
+
+
+def _public_job(job):
+    """Job fields the API exposes; params hold server paths and stay private"""
+    return {key: job[key] for key in (
+        'id', 'kind', 'status', 'progress', 'result', 'error', 'attempts',
+        'created_at', 'started_at', 'finished_at'
+    )}
+
+
+@app.before_request
+def start_job_runner():
+    # Queued jobs left by a restarted worker are picked up on the next request
+    ensure_job_runner()
+
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+@login_required
+def jobs():
+    """
+    GET lists recent jobs; POST {"kind": "analyze", "engine": ...} queues
+    a stats index rebuild of the current workspace
+    """
+    if request.method == 'GET':
+        return jsonify({'success': True, 'jobs': [_public_job(job) for job in list_jobs()]})
+    
+    data = request.json or {}
+    if data.get('kind') != 'analyze':
+        return jsonify({'success': False, 'error': f"Unknown job kind: {data.get('kind')}"}), 400
+    engine = data.get('engine', DEFAULT_DIFF_ENGINE)
+    if engine not in DIFF_ENGINES:
+        return jsonify({'success': False, 'error': f'Unknown diff engine: {engine}'}), 400
+    
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return jsonify({'success': False, 'error': 'Workspace not found'}), 404
+    
+    job_id = enqueue_job('analyze', {'path': str(artifacts_dir), 'engine': engine})
+    return jsonify({
+        'success': True,
+        'job': job_id,
+        'status': 'queued',
+        'status_url': url_for('job_status', job_id=job_id)
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """Status, progress and, once done, the result or error of one job"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    # A finished upload becomes this session's workspace, as with a synchronous upload
+    if job['kind'] == 'upload' and job['status'] == 'done':
+        session['workspace'] = job['result']['workspace']
+    
+    return jsonify({'success': True, 'job': _public_job(job)})
+
+
+def job_event_stream(job_id, after=0):
+    """
+    Server-Sent Events for one job: its recorded events (with their sequence
+    number as the event ID), 'progress' updates, and a closing 'done' or
+    'failed' event carrying the job ('failed' with status 'gone' if the job
+    was deleted meanwhile)
+    """
+    last_progress = None
+    last_sent = time.time()
+    while True:
+        # Read the status first, so a finished job's events are all recorded
+        job = get_job(job_id)
+        if job is None:
+            # Deleted past JOB_RETENTION_SECONDS while the stream was open
+            gone = {'id': job_id, 'status': 'gone', 'error': 'Job no longer exists'}
+            yield f"event: failed\ndata: {json.dumps(gone)}\n\n"
+            return
+        events = get_job_events(job_id, after)
+        sent = bool(events)
+        for seq, event_type, data in events:
+            yield f"id: {seq}\nevent: {event_type}\ndata: {data}\n\n"
+            after = seq
+        if job['progress'] != last_progress:
+            last_progress = job['progress']
+            sent = True
+            yield f"event: progress\ndata: {json.dumps(last_progress)}\n\n"
+        if job['status'] in ('done', 'failed') and len(events) < JOB_EVENTS_BATCH:
+            yield f"event: {job['status']}\ndata: {json.dumps(_public_job(job))}\n\n"
+            return
+        
+        if sent:
+            last_sent = time.time()
+        elif time.time() - last_sent >= JOB_EVENTS_KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.time()
+        if len(events) < JOB_EVENTS_BATCH:
+            time.sleep(JOB_EVENTS_POLL_SECONDS)
+
+
+@app.route('/api/jobs/<job_id>/events')
+@login_required
+def job_events(job_id):
+    """
+    Stream a job's progress as Server-Sent Events
+    EventSource resumes from Last-Event-ID after a reconnect; ?after=<seq> does
+    the same for other clients.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    after = request.headers.get('Last-Event-ID') or request.args.get('after') or '0'
+    if not after.isdigit():
+        return jsonify({'success': False, 'error': 'Invalid event ID'}), 400
+    
+    if job['kind'] == 'upload' and job['result']:
+        session['workspace'] = job['result']['workspace']
+    
+    return Response(
+        job_event_stream(job_id, int(after)),
+        mimetype='text/event-stream',
+        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'}
+    )
+
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for monitoring and keep-alive"""
@@ -462,6 +3905,18 @@ def health_check():
     }), 200
 
 
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus metrics summed over every worker and pool process
+    Open unless METRICS_TOKEN is set, then it needs 'Authorization: Bearer <token>'.
+    """
+    if METRICS_TOKEN and not secrets.compare_digest(
+            request.headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}"):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render_metrics(collect_metrics()), mimetype='text/plain', content_type='text/plain; version=0.0.4')
+
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     """Serve static files"""
@@ -471,78 +3926,260 @@ def serve_static(filename):
 
 # Linear API Integration
 
-# Cache for team UUID
-_team_uuid_cache = {}
-
-def linear_graphql_request(query, variables=None):
-    """Make a GraphQL request to Linear API"""
-    if not LINEAR_API_KEY:
-        return {'error': 'Linear API key not configured'}
-    
-    headers = {
-        'Authorization': LINEAR_API_KEY,
-        'Content-Type': 'application/json'
-    }
-    
-    payload = {'query': query}
-    if variables:
-        payload['variables'] = variables
-    
-    try:
-        response = requests.post(LINEAR_API_URL, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        # Get the actual error response from Linear
-        error_detail = {'error': str(e)}
-        try:
-            error_body = response.json()
-            error_detail['response'] = error_body
-            print(f"❌ Linear API Error: {error_body}", flush=True)
-        except:
-            error_detail['response'] = response.text
-            print(f"❌ Linear API Error (raw): {response.text}", flush=True)
-        return error_detail
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Request Exception: {str(e)}", flush=True)
-        return {'error': str(e)}
+# Team metadata (ids, members, active cycle, states) is cached on disk so
+# every gunicorn worker shares it
+LINEAR_CACHE_DIR = UPLOAD_FOLDER / 'linear_cache'
+LINEAR_CACHE_TTL = int(os.environ.get('LINEAR_CACHE_TTL', 300))
+LINEAR_CONCURRENCY = int(os.environ.get('LINEAR_CONCURRENCY', 8))
+# Aliased mutations per GraphQL document when filing issues in bulk
+LINEAR_BATCH_SIZE = int(os.environ.get('LINEAR_BATCH_SIZE', 20))
 
+# Threads for Linear work that can overlap with the request. Under the
+# gevent worker class these threads are monkey-patched into greenlets.
+_linear_executor = ThreadPoolExecutor(max_workers=LINEAR_CONCURRENCY)
 
-def get_team_uuid(team_key):
-    """Get the UUID for a team given its key (e.g., 'ENG')"""
-    # Check cache first
-    if team_key in _team_uuid_cache:
-        return _team_uuid_cache[team_key]
-    
-    query = """
-    query Teams {
-        teams {
-            nodes {
+# One query fetches everything the modal and issue creation need
+LINEAR_TEAM_METADATA_QUERY = """
+query TeamMetadata($teamKey: String!) {
+    teams(filter: { key: { eq: $teamKey } }) {
+        nodes {
+            id
+            key
+            name
+            members {
+                nodes {
+                    id
+                    name
+                    displayName
+                    email
+                    active
+                }
+            }
+            activeCycle {
                 id
-                key
                 name
             }
+            states {
+                nodes {
+                    id
+                    name
+                    type
+                }
+            }
         }
     }
+}
+"""
+
+
+# Operation name of a GraphQL document, used as a metrics label
+GRAPHQL_OPERATION_RE = re.compile(r'\b(query|mutation)\s+(\w+)')
+
+
+class TTLDiskCache:
+    """JSON values on disk with a per-entry expiry, safe to share between processes"""
+
+    def __init__(self, directory, ttl):
+        self.directory = Path(directory)
+        self.directory.mkdir(exist_ok=True)
+        self.ttl = ttl
+
+    def _path(self, key):
+        return self.directory / (hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['expires_at'] < time.time():
+            return None
+        return entry['value']
+
+    def set(self, key, value, ttl=None):
+        entry = {'expires_at': time.time() + (ttl or self.ttl), 'value': value}
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            log.warning("Linear cache write failed: %s", e)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class LinearClient:
     """
-    
-    result = linear_graphql_request(query)
-    
-    if 'errors' in result or 'error' in result:
-        print(f"Error fetching teams: {result}")
-        return None
-    
-    try:
-        teams = result['data']['teams']['nodes']
-        for team in teams:
-            _team_uuid_cache[team['key']] = team['id']
-            if team['key'] == team_key:
-                print(f"Found team UUID for '{team_key}': {team['id']}")
-                return team['id']
-    except (KeyError, TypeError) as e:
-        print(f"Error parsing teams: {e}")
+    Linear GraphQL client
+    Keeps a pooled requests.Session per process and caches team metadata
+    in a TTLDiskCache shared by all workers.
+    """
+
+    def __init__(self, api_url, api_key, team_key, cache, timeout=LINEAR_TIMEOUT):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.team_key = team_key
+        self.cache = cache
+        self.timeout = timeout
+
+        # Imported here so workers that never talk to Linear do not pay for it
+        import requests
+        import requests.adapters
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=LINEAR_CONCURRENCY)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': api_key or '',
+            'Content-Type': 'application/json'
+        })
+
+    def graphql(self, query, variables=None):
+        """Make a GraphQL request to Linear API"""
+        if not self.api_key:
+            return {'error': 'Linear API key not configured'}
+        
+        payload = {'query': query}
+        if variables:
+            payload['variables'] = variables
+        
+        import requests
+
+        match = GRAPHQL_OPERATION_RE.search(query)
+        operation = match.group(2) if match else 'anonymous'
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            outcome = 'ok'
+            return response.json()
+        except requests.exceptions.HTTPError as e:
+            # Get the actual error response from Linear
+            error_detail = {'error': str(e)}
+            try:
+                error_body = response.json()
+                error_detail['response'] = error_body
+                log.error("Linear API error: %s", error_body)
+            except:
+                error_detail['response'] = response.text
+                log.error("Linear API error (raw): %s", response.text)
+            return error_detail
+        except requests.exceptions.Timeout:
+            outcome = 'timeout'
+            log.error("Linear API timed out after %ss", self.timeout[1])
+            return {'error': 'Linear API request timed out'}
+        except requests.exceptions.RequestException as e:
+            log.error("Linear request failed: %s", e)
+            return {'error': str(e)}
+        finally:
+            observe('wizardview_linear_request_seconds', time.perf_counter() - start,
+                    operation=operation, outcome=outcome)
+
+    @property
+    def _metadata_key(self):
+        return f"team-metadata:{self.api_url}:{self.team_key}"
+
+    def team_metadata(self):
+        """
+        Team id, key, name, members, active cycle id and starting state id
+        Served from the shared cache; a miss costs exactly one round trip.
+        Returns {'error': ...} if the team cannot be loaded.
+        """
+        metadata = self.cache.get(self._metadata_key)
+        inc('wizardview_cache_requests_total', cache='linear_team', result='miss' if metadata is None else 'hit')
+        if metadata is not None:
+            return metadata
+
+        result = self.graphql(LINEAR_TEAM_METADATA_QUERY, {'teamKey': self.team_key})
+        if 'error' in result:
+            return {'error': result['error']}
+        if 'errors' in result:
+            return {'error': result['errors'][0]['message']}
+
+        try:
+            teams = result['data']['teams']['nodes']
+            team = next((t for t in teams if t['key'] == self.team_key), None)
+            if team is None:
+                return {'error': f'Could not find team with key: {self.team_key}'}
+
+            metadata = {
+                'id': team['id'],
+                'key': team['key'],
+                'name': team.get('name', ''),
+                'members': team['members']['nodes'],
+                'cycle_id': (team.get('activeCycle') or {}).get('id'),
+                'state_id': pick_issue_state(team['states']['nodes'])
+            }
+        except (KeyError, TypeError) as e:
+            log.error("Error parsing team metadata: %s", e)
+            return {'error': f'Failed to parse team metadata: {str(e)}'}
+
+        log.info("Loaded Linear metadata for team '%s': %d members", metadata['key'], len(metadata['members']))
+        self.cache.set(self._metadata_key, metadata)
+        return metadata
+
+    def invalidate_metadata(self):
+        """Forget cached team metadata, e.g. after Linear rejected a cached id"""
+        self.cache.delete(self._metadata_key)
+
+
+_linear_client = None
+
+
+def get_linear_client():
+    """Per-process LinearClient, created on first use"""
+    global _linear_client
+    if _linear_client is None:
+        _linear_client = LinearClient(
+            LINEAR_API_URL, LINEAR_API_KEY, LINEAR_TEAM_ID,
+            TTLDiskCache(LINEAR_CACHE_DIR, LINEAR_CACHE_TTL)
+        )
+    return _linear_client
+
+
+def linear_graphql_request(query, variables=None):
+    """Make a GraphQL request to Linear API through the pooled client"""
+    return get_linear_client().graphql(query, variables)
+
+
+def get_team_uuid(team_key):
+    """Get the UUID for the configured team (e.g., 'ENG')"""
+    metadata = get_linear_client().team_metadata()
+    if 'error' in metadata or metadata['key'] != team_key:
         return None
+    return metadata['id']
+
+
+def pick_issue_state(states):
+    """Choose the Todo state, falling back to Backlog or any unstarted state"""
+    # Find "Todo" state specifically (prioritize Todo over Backlog)
+    todo_state = None
+    backlog_state = None
+    
+    for state in states:
+        state_name_lower = state['name'].lower()
+        if state_name_lower == 'todo':
+            todo_state = state['id']
+            break  # Found Todo, use it immediately
+        elif state_name_lower == 'backlog' and not todo_state:
+            backlog_state = state['id']
+        elif state['type'] == 'unstarted' and not todo_state and not backlog_state:
+            backlog_state = state['id']
     
+    # Prioritize Todo, then Backlog, then any unstarted state
+    if todo_state:
+        log.debug("Using Todo state: %s", todo_state)
+        return todo_state
+    if backlog_state:
+        log.debug("Using Backlog/Unstarted state: %s", backlog_state)
+        return backlog_state
     return None
 
 
@@ -556,72 +4193,341 @@ def get_linear_team_members():
             'error': 'Linear API key not configured. Please set LINEAR_API_KEY environment variable.'
         }), 400
     
-    # Get team UUID from key
-    team_uuid = get_team_uuid(LINEAR_TEAM_ID)
-    if not team_uuid:
-        return jsonify({
-            'success': False,
-            'error': f'Could not find team with key: {LINEAR_TEAM_ID}'
-        }), 404
+    # Members come from the cached team metadata (one round trip on a miss)
+    metadata = get_linear_client().team_metadata()
+    if 'error' in metadata:
+        return jsonify({'success': False, 'error': metadata['error']}), 500
     
-    # GraphQL query to get team members (with team info for verification)
-    query = """
-    query TeamMembers($teamId: String!) {
-        team(id: $teamId) {
-            key
-            name
-            members {
-                nodes {
-                    id
-                    name
-                    displayName
-                    email
-                    active
-                }
-            }
-        }
-    }
-    """
+    team_key = metadata['key']
+    members = metadata['members']
     
-    variables = {'teamId': team_uuid}
+    # Filter active members only from the ENG team
+    # Use displayName (nickname) if available, otherwise fall back to full name
+    active_members = [
+        {
+            'id': m['id'], 
+            'name': m.get('displayName') or m['name'],  # Prefer displayName (nickname)
+            'email': m.get('email', '')
+        }
+        for m in members if m.get('active', True)
+    ]
     
-    print(f"Fetching team members for team UUID: {team_uuid} (key: {LINEAR_TEAM_ID})")
+    log.debug("Returning %d active members from team '%s' (key: %s)", len(active_members), metadata['name'], team_key)
     
-    result = linear_graphql_request(query, variables)
+    return jsonify({'success': True, 'members': active_members, 'team': team_key})
+
+
+# Linear attachment ZIPs
+# Named after the content of the scrolls they hold (<folder>-<file>-<key>.zip),
+# so filing the same pair again reuses its ZIP and an issue's link never
+# starts serving different scrolls. The scrolls are pinned under scrolls/<sha256>
+# (a hard link to the blob while the file system allows it) and a <name>.json
+# sidecar lists them, so a ZIP can be rebuilt long after its workspace is gone:
+# ZIPs are built by an 'attachment-zip' job, off the request path, and rebuilt
+# on download if eviction removed them in the meantime. Sidecars and pinned
+# scrolls are never deleted, as the link on a filed issue must keep working.
+
+# Bump whenever the ZIP layout changes
+ATTACHMENT_FORMAT_VERSION = '1'
+ATTACHMENT_SCROLLS_DIR = LINEAR_ATTACHMENTS_DIR / 'scrolls'
+ATTACHMENT_MAX_BYTES = int(os.environ.get('ATTACHMENT_MAX_BYTES', 1024 * 1024 * 1024))
+# ZIPs not downloaded or filed again for this long are deleted
+ATTACHMENT_RETENTION_SECONDS = float(os.environ.get('ATTACHMENT_RETENTION_DAYS', 90)) * 86400
+# Minimum seconds between eviction sweeps in one worker
+ATTACHMENT_EVICT_INTERVAL = 300
+_last_attachment_eviction = 0.0
+
+
+def attachment_sources(artifacts_dir, folder_id, file_id):
+    """[(branch, path)] of the main and feat scrolls of one chart/model that exist"""
+    tenant_path = os.path.join(artifacts_dir, folder_id)
+    if not os.path.exists(tenant_path):
+        log.warning("Tenant folder not found: %s", tenant_path)
+        return []
     
-    if 'error' in result:
-        return jsonify({'success': False, 'error': result['error']}), 500
+    # Pattern 1: tenant/main/MODEL.csv and tenant/feat/MODEL.csv
+    # Pattern 2: tenant/MODEL-main and tenant/MODEL-feat (no extension)
+    sources = []
+    for branch in ('main', 'feat'):
+        patterns = [
+            os.path.join(tenant_path, branch, f"{file_id}.csv"),
+            os.path.join(tenant_path, f"{file_id}-{branch}"),
+        ]
+        found = next((pattern for pattern in patterns if os.path.exists(pattern)), None)
+        if found:
+            sources.append((branch, found))
+        else:
+            log.warning("%s file not found. Tried: %s", branch.capitalize(), patterns)
+    return sources
+
+
+def attachment_name(folder_id, file_id, scrolls):
+    """Content-addressed ZIP filename for [(branch, SHA-256 hex digest)] scrolls"""
+    raw = f"{ATTACHMENT_FORMAT_VERSION}:{folder_id}:{file_id}"
+    for branch, digest in scrolls:
+        raw += f":{branch}={digest}"
+    return f"{folder_id}-{file_id}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}.zip"
+
+
+def _attachment_sidecar(filename):
+    return LINEAR_ATTACHMENTS_DIR / f"{filename}.json"
+
+
+def pin_attachment_scroll(path):
+    """
+    Keep a copy of a scroll that outlives its workspace; returns its digest
+    A read-only scroll from the blob store is hard linked, which also keeps
+    its blob from being swept; anything else is copied, so a later edit of
+    the source cannot change the pinned scroll.
+    """
+    with ScrollReader(path) as scroll:
+        digest = scroll.content_hash
+    pinned = ATTACHMENT_SCROLLS_DIR / digest
+    if pinned.exists():
+        return digest
+    ATTACHMENT_SCROLLS_DIR.mkdir(exist_ok=True)
+    if not os.stat(path).st_mode & 0o222:
+        _link_blob(path, pinned)
+        return digest
+    fd, tmp_path = tempfile.mkstemp(dir=ATTACHMENT_SCROLLS_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as dst, open(path, 'rb') as src:
+            shutil.copyfileobj(src, dst, INGEST_CHUNK_SIZE)
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, pinned)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return digest
+
+
+def write_attachment_zip(filename, folder_id, file_id, sources):
+    """Build a ZIP into linear_attachments, atomically; returns its size"""
+    zip_filepath = LINEAR_ATTACHMENTS_DIR / filename
+    fd, tmp_path = tempfile.mkstemp(dir=LINEAR_ATTACHMENTS_DIR, suffix='.tmp')
+    try:
+        with timed('wizardview_zip_seconds', op='create'), \
+                os.fdopen(fd, 'wb') as f, zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for branch, file_path in sources:
+                # Use structure: tenant_folder/filename-branch (no extension, matching the original format)
+                zipf.write(file_path, f"{folder_id}/{file_id}-{branch}")
+        # mkstemp creates 0600; nginx must be able to read offloaded downloads
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, zip_filepath)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
     
-    if 'errors' in result:
-        return jsonify({'success': False, 'error': result['errors'][0]['message']}), 500
+    file_size = zip_filepath.stat().st_size
+    inc('wizardview_zip_bytes_total', file_size, op='create')
+    log.info("ZIP file saved: %s (%d bytes)", zip_filepath, file_size)
+    evict_attachments()
+    return file_size
+
+
+def ensure_attachment_zip(filename):
+    """
+    Path of an attachment ZIP, built from its sidecar if it is missing
+    Returns None if the ZIP is unknown or its scrolls are gone.
+    """
+    zip_path = LINEAR_ATTACHMENTS_DIR / filename
+    sidecar = _attachment_sidecar(filename)
+    try:
+        # mtime is the LRU clock
+        os.utime(zip_path)
+        if sidecar.exists():
+            os.utime(sidecar)
+        return zip_path
+    except FileNotFoundError:
+        pass
     
     try:
-        team_data = result['data']['team']
-        team_key = team_data.get('key', '')
-        team_name = team_data.get('name', '')
-        members = team_data['members']['nodes']
-        
-        print(f"Found {len(members)} members in team '{team_name}' (key: {team_key})")
-        
-        # Filter active members only from the ENG team
-        # Use displayName (nickname) if available, otherwise fall back to full name
-        active_members = [
-            {
-                'id': m['id'], 
-                'name': m.get('displayName') or m['name'],  # Prefer displayName (nickname)
-                'email': m.get('email', '')
-            }
-            for m in members if m.get('active', True)
-        ]
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            source = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if 'scrolls' in source:
+        listed = [(branch, ATTACHMENT_SCROLLS_DIR / digest) for branch, digest in source['scrolls']]
+    else:
+        # Sidecars written before scrolls were pinned point into the workspace
+        listed = source['sources']
+    sources = [(branch, path) for branch, path in listed if os.path.exists(path)]
+    if len(sources) != len(listed):
+        return None
+    write_attachment_zip(filename, source['folder'], source['file'], sources)
+    os.utime(sidecar)
+    return zip_path
+
+
+def build_attachment_zip(artifacts_dir, folder_id, file_id, wait=True):
+    """
+    ZIP only the main and feat scrolls of one chart/model into linear_attachments
+    A ZIP of the same scrolls is reused. With wait=False a missing ZIP is not
+    built here: 'ready' is False and the caller queues it with queue_attachment_zips.
+    Returns {'filename', 'filepath', 'size', 'ready'} or None if there is nothing to zip.
+    """
+    try:
+        sources = attachment_sources(artifacts_dir, folder_id, file_id)
+        if not sources:
+            log.warning("No files found to add to ZIP for %s/%s", folder_id, file_id)
+            return None
         
-        print(f"Returning {len(active_members)} active members from ENG team")
-        for member in active_members:
-            print(f"  - {member['name']} ({member['email']})")
+        scrolls = [(branch, pin_attachment_scroll(path)) for branch, path in sources]
+        filename = attachment_name(folder_id, file_id, scrolls)
+        _write_json_atomic(_attachment_sidecar(filename), {
+            'folder': folder_id,
+            'file': file_id,
+            'scrolls': scrolls
+        })
+        zip_filepath = LINEAR_ATTACHMENTS_DIR / filename
+        if wait:
+            ensure_attachment_zip(filename)
+        else:
+            try:
+                os.utime(zip_filepath)
+            except FileNotFoundError:
+                pass
         
-        return jsonify({'success': True, 'members': active_members, 'team': team_key})
-    except (KeyError, TypeError) as e:
-        print(f"Error parsing team members: {e}")
-        return jsonify({'success': False, 'error': f'Failed to parse team members: {str(e)}'}), 500
+        ready = zip_filepath.exists()
+        inc('wizardview_cache_requests_total', cache='attachment_zip', result='hit' if ready else 'miss')
+        return {
+            'filename': filename,
+            'filepath': str(zip_filepath),
+            'size': zip_filepath.stat().st_size if ready else None,
+            'ready': ready
+        }
+    except Exception:
+        log.exception("Failed to create ZIP file for %s/%s", folder_id, file_id)
+        return None
+
+
+def queue_attachment_zips(zips):
+    """Queue one 'attachment-zip' job for the ZIPs build_attachment_zip(wait=False) left unbuilt"""
+    pending = [z['filename'] for z in zips if z and not z['ready']]
+    if pending:
+        enqueue_job('attachment-zip', {'filenames': pending})
+
+
+def _attachment_rebuildable(filename):
+    """True if the sidecar of a ZIP lists pinned scrolls that all exist"""
+    try:
+        with open(_attachment_sidecar(filename), 'r', encoding='utf-8') as f:
+            scrolls = json.load(f).get('scrolls')
+    except (OSError, ValueError):
+        return False
+    return bool(scrolls) and all((ATTACHMENT_SCROLLS_DIR / digest).exists() for _, digest in scrolls)
+
+
+def evict_attachments(force=False):
+    """
+    Delete ZIPs unused for ATTACHMENT_RETENTION_SECONDS, then least-recently-used
+    ZIPs until the store fits ATTACHMENT_MAX_BYTES
+    Only ZIPs whose sidecar lists pinned scrolls are deleted, so every one of
+    them is rebuilt if downloaded again. Sweeps are rate limited per worker
+    unless force=True.
+    """
+    global _last_attachment_eviction
+    now = time.time()
+    if not force and now - _last_attachment_eviction < ATTACHMENT_EVICT_INTERVAL:
+        return
+    _last_attachment_eviction = now
+    
+    cutoff = now - ATTACHMENT_RETENTION_SECONDS
+    zips = []
+    total = 0
+    for entry in os.scandir(LINEAR_ATTACHMENTS_DIR):
+        if not entry.name.endswith(('.zip', '.tmp')):
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if entry.name.endswith('.tmp'):
+            # Temp files of builds that died are removed after an hour
+            if st.st_mtime < now - 3600:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            continue
+        if not _attachment_rebuildable(entry.name):
+            continue
+        if st.st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        else:
+            zips.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    
+    if total <= ATTACHMENT_MAX_BYTES:
+        return
+    
+    # Drop oldest first down to 90% of the budget to avoid sweeping on every build
+    target = ATTACHMENT_MAX_BYTES * 0.9
+    for _, size, path in sorted(zips):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def issue_description(folder_id, file_id, stats, app_url, attached_zip=None, after_attach=False):
+    """
+    Markdown description of a regression diff issue
+    after_attach=True gives the wording used once the ZIP is linked to the issue
+    """
+    total_changes = stats.get('added', 0) + stats.get('removed', 0) + stats.get('modified', 0)
+    header = f"""📊 Regression Diff Report
+
+**File**: {file_id}
+**Tenant**: {folder_id}
+
+**Statistics**:
+✅ Added: {stats.get('added', 0)}
+❌ Removed: {stats.get('removed', 0)}
+⚠️ Modified: {stats.get('modified', 0)}
+⚪ Unchanged: {stats.get('unchanged', 0)}
+
+**Total Changes**: {total_changes} items affected
+"""
+    
+    if not after_attach:
+        return header + f"""
+---
+📦 **Attached ZIP**: Contains main and feat files for this specific chart/model
+🔗 **View in WizardView**: Upload the attached ZIP at [{app_url}]({app_url}) to compare interactively
+"""
+    
+    # Determine if it's a chart or model intelligently
+    if file_id.upper().startswith('CHART-'):
+        resource_type = 'chart'
+    elif file_id.upper().startswith('MODEL-'):
+        resource_type = 'model'
+    else:
+        resource_type = 'chart/model'
+    
+    # Build attachment info message
+    attachment_info = ""
+    if attached_zip:
+        attachment_info = f"\n📦 **Auto-attached**: `{attached_zip}` (main + feat files)\n"
+    
+    return header + f"""{attachment_info}
+---
+📜 **Scroll Files**: Download the attached ZIP file from Resources that contains main and feat files for this {resource_type}.
+
+🔗 **Interactive Comparison**: Upload the ZIP file at [{app_url}]({app_url}) to view the full side-by-side diff in WizardView.
+"""
 
 
 @app.route('/api/linear/create-issue', methods=['POST'])
@@ -634,14 +4540,6 @@ def create_linear_issue():
             'error': 'Linear API key not configured. Please set LINEAR_API_KEY environment variable.'
         }), 400
     
-    # Get team UUID from key
-    team_uuid = get_team_uuid(LINEAR_TEAM_ID)
-    if not team_uuid:
-        return jsonify({
-            'success': False,
-            'error': f'Could not find team with key: {LINEAR_TEAM_ID}'
-        }), 404
-    
     data = request.json
     folder_id = data.get('folderId')
     file_id = data.get('fileId')
@@ -652,10 +4550,16 @@ def create_linear_issue():
     if not all([folder_id, file_id, assignee_id]):
         return jsonify({'success': False, 'error': 'Missing required fields'}), 400
     
-    print(f"\n{'='*60}", flush=True)
-    print(f"📝 Creating Linear issue with attachZip={attach_zip}", flush=True)
-    print(f"   Folder: {folder_id}, File: {file_id}", flush=True)
-    print(f"{'='*60}\n", flush=True)
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return jsonify({'success': False, 'error': 'Workspace not found'}), 404
+    
+    # Team, cycle and state come from cached metadata; on a miss the single
+    # lookup runs while the ZIP is built
+    linear_client = get_linear_client()
+    metadata_future = _linear_executor.submit(with_request_id(linear_client.team_metadata))
+    
+    log.info("Creating Linear issue for %s/%s", folder_id, file_id, extra={'attach_zip': attach_zip})
     
     # Create issue title
     title = f"Gandalf's WizardView Report for {folder_id}-{file_id}"
@@ -664,138 +4568,23 @@ def create_linear_issue():
     app_url = os.environ.get('WIZARDVIEW_URL', 'https://wizardview.onrender.com')
     
     # Create issue description with app link
-    description = f"""📊 Regression Diff Report
-
-**File**: {file_id}
-**Tenant**: {folder_id}
-
-**Statistics**:
-✅ Added: {stats.get('added', 0)}
-❌ Removed: {stats.get('removed', 0)}
-⚠️ Modified: {stats.get('modified', 0)}
-⚪ Unchanged: {stats.get('unchanged', 0)}
-
-**Total Changes**: {stats.get('added', 0) + stats.get('removed', 0) + stats.get('modified', 0)} items affected
-
----
-📦 **Attached ZIP**: Contains main and feat files for this specific chart/model
-🔗 **View in WizardView**: Upload the attached ZIP at [{app_url}]({app_url}) to compare interactively
-"""
+    description = issue_description(folder_id, file_id, stats, app_url)
     
-    # Step 1: Create ZIP file with only the specific chart/model files (if requested)
+    # Step 1: Name the ZIP with only the specific chart/model files (if requested);
+    # a new one is built by a job while the issue is filed
     zip_file_data = None
     if attach_zip:
-        try:
-            tenant_path = os.path.join(ARTIFACTS_DIR, folder_id)
-            
-            print(f"🔍 Checking tenant path: {tenant_path}", flush=True)
-            print(f"🔍 ARTIFACTS_DIR: {ARTIFACTS_DIR}", flush=True)
-            print(f"🔍 Folder ID: {folder_id}", flush=True)
-            print(f"🔍 File ID: {file_id}", flush=True)
-            
-            if not os.path.exists(tenant_path):
-                print(f"❌ Tenant folder not found: {tenant_path}", flush=True)
-            else:
-                print(f"✅ Tenant folder exists: {tenant_path}", flush=True)
-                print(f"📦 Creating ZIP for {file_id} from tenant {folder_id}", flush=True)
-                
-                # Try multiple file path patterns
-                # Pattern 1: tenant/main/MODEL.csv and tenant/feat/MODEL.csv
-                # Pattern 2: tenant/MODEL-main and tenant/MODEL-feat (no extension)
-                main_patterns = [
-                    os.path.join(tenant_path, 'main', f"{file_id}.csv"),
-                    os.path.join(tenant_path, f"{file_id}-main"),
-                ]
-                feat_patterns = [
-                    os.path.join(tenant_path, 'feat', f"{file_id}.csv"),
-                    os.path.join(tenant_path, f"{file_id}-feat"),
-                ]
-                
-                # Check if files exist
-                files_to_add = []
-                
-                # Find main file
-                main_file = None
-                for pattern in main_patterns:
-                    if os.path.exists(pattern):
-                        main_file = pattern
-                        files_to_add.append(('main', main_file))
-                        print(f"  ✅ Found main file: {main_file}", flush=True)
-                        break
-                if not main_file:
-                    print(f"  ⚠️ Main file not found. Tried: {main_patterns}", flush=True)
-                
-                # Find feat file
-                feat_file = None
-                for pattern in feat_patterns:
-                    if os.path.exists(pattern):
-                        feat_file = pattern
-                        files_to_add.append(('feat', feat_file))
-                        print(f"  ✅ Found feat file: {feat_file}", flush=True)
-                        break
-                if not feat_file:
-                    print(f"  ⚠️ Feat file not found. Tried: {feat_patterns}", flush=True)
-                
-                if files_to_add:
-                    # Save ZIP file to disk in linear_attachments folder
-                    filename = f"{folder_id}-{file_id}.zip"
-                    zip_filepath = LINEAR_ATTACHMENTS_DIR / filename
-                    
-                    print(f"  Creating ZIP file: {zip_filepath}", flush=True)
-                    
-                    with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                        # Add only the specific main and feat files
-                        for branch, file_path in files_to_add:
-                            # Use structure: tenant_folder/filename-branch (no extension, matching the original format)
-                            arcname = f"{folder_id}/{file_id}-{branch}"
-                            zipf.write(file_path, arcname)
-                            print(f"  ✅ Added to ZIP: {arcname}", flush=True)
-                    
-                    # Get the file size
-                    file_size = zip_filepath.stat().st_size
-                    
-                    print(f"✅ ZIP file saved: {zip_filepath} ({file_size} bytes)", flush=True)
-                    
-                    zip_file_data = {
-                        'filename': filename,
-                        'filepath': str(zip_filepath),
-                        'size': file_size
-                    }
-                else:
-                    print(f"❌ No files found to add to ZIP for {file_id}", flush=True)
-        except Exception as e:
-            print(f"❌ Failed to create ZIP file: {str(e)}", flush=True)
-            import traceback
-            traceback.print_exc()
-    else:
-        print(f"ℹ️ ZIP attachment disabled by user toggle", flush=True)
+        zip_file_data = build_attachment_zip(artifacts_dir, folder_id, file_id, wait=False)
+        queue_attachment_zips([zip_file_data])
     
-    # Check if ZIP was created
-    if zip_file_data:
-        print(f"✅ ZIP file data ready: {zip_file_data['filename']} ({zip_file_data['size']} bytes)", flush=True)
-    else:
-        print(f"⚠️ No ZIP file data created!", flush=True)
-    
-    # Step 2: Get the current cycle
-    cycle_query = """
-    query ActiveCycle($teamId: String!) {
-        team(id: $teamId) {
-            activeCycle {
-                id
-                name
-            }
-        }
-    }
-    """
-    
-    cycle_result = linear_graphql_request(cycle_query, {'teamId': team_uuid})
-    cycle_id = None
+    # Step 2: Collect the team, current cycle and starting state
+    metadata = metadata_future.result()
+    if 'error' in metadata:
+        return jsonify({'success': False, 'error': metadata['error']}), 500
     
-    if 'errors' not in cycle_result and 'data' in cycle_result:
-        try:
-            cycle_id = cycle_result['data']['team']['activeCycle']['id']
-        except (KeyError, TypeError):
-            pass  # No active cycle
+    team_uuid = metadata['id']
+    cycle_id = metadata['cycle_id']
+    state_id = metadata['state_id']
     
     # Step 3: Create the issue
     create_query = """
@@ -819,75 +4608,31 @@ def create_linear_issue():
         'assigneeId': assignee_id,
     }
     
-    # Get the "Todo" state ID for the team
-    state_query = """
-    query TeamStates($teamId: String!) {
-        team(id: $teamId) {
-            states {
-                nodes {
-                    id
-                    name
-                    type
-                }
-            }
-        }
-    }
-    """
-    
-    state_result = linear_graphql_request(state_query, {'teamId': team_uuid})
-    
-    if 'errors' not in state_result and 'data' in state_result:
-        try:
-            states = state_result['data']['team']['states']['nodes']
-            # Find "Todo" state specifically (prioritize Todo over Backlog)
-            todo_state = None
-            backlog_state = None
-            
-            for state in states:
-                state_name_lower = state['name'].lower()
-                if state_name_lower == 'todo':
-                    todo_state = state['id']
-                    break  # Found Todo, use it immediately
-                elif state_name_lower == 'backlog' and not todo_state:
-                    backlog_state = state['id']
-                elif state['type'] == 'unstarted' and not todo_state and not backlog_state:
-                    backlog_state = state['id']
-            
-            # Prioritize Todo, then Backlog, then any unstarted state
-            if todo_state:
-                issue_input['stateId'] = todo_state
-                print(f"Using Todo state: {todo_state}")
-            elif backlog_state:
-                issue_input['stateId'] = backlog_state
-                print(f"Using Backlog/Unstarted state: {backlog_state}")
-        except (KeyError, TypeError) as e:
-            print(f"Error finding state: {e}")
-            pass  # Will use default state
+    if state_id:
+        issue_input['stateId'] = state_id
     
     # Add cycle if available (automatically assign to current cycle)
     if cycle_id:
         issue_input['cycleId'] = cycle_id
-        print(f"Assigned to current cycle: {cycle_id}")
     
     # Set priority to High (2 = High in Linear)
     # Linear priority values: 0 = No priority, 1 = Urgent, 2 = High, 3 = Medium, 4 = Low
     issue_input['priority'] = 2
-    print(f"Set priority to High (2)")
     
-    # Debug log
-    print(f"Creating Linear issue with input: {issue_input}")
+    log.debug("Creating Linear issue with input: %s", issue_input)
     
     create_result = linear_graphql_request(create_query, {'input': issue_input})
     
-    # Debug log
-    print(f"Linear API response: {create_result}")
+    log.debug("Linear API response: %s", create_result)
     
     if 'error' in create_result:
         return jsonify({'success': False, 'error': create_result['error']}), 500
     
     if 'errors' in create_result:
+        # A cached cycle or state may have gone stale, refetch next time
+        linear_client.invalidate_metadata()
         error_msg = create_result['errors'][0]['message']
-        print(f"Linear API error: {error_msg}")
+        log.error("Linear API error: %s", error_msg)
         # Include more details in the error
         error_details = create_result['errors'][0].get('extensions', {})
         if error_details:
@@ -901,19 +4646,13 @@ def create_linear_issue():
             issue_identifier = issue_data['issue']['identifier']
             issue_url = issue_data['issue']['url']
             
-            print(f"✅ Issue created: {issue_identifier}", flush=True)
-            print(f"   Issue ID: {issue_id}", flush=True)
-            print(f"   Issue URL: {issue_url}", flush=True)
+            log.info("Issue created: %s", issue_identifier, extra={'issue_id': issue_id, 'issue_url': issue_url})
             
             # Step 4: Update issue description with ZIP file information
-            print(f"\n🔍 Checking if zip_file_data exists: {zip_file_data is not None}", flush=True)
             if zip_file_data:
-                print(f"✅ ZIP file data found: {zip_file_data['filename']} ({zip_file_data['size']} bytes)", flush=True)
-                print(f"✅ ZIP file saved at: {zip_file_data['filepath']}", flush=True)
                 try:
                     # Create attachment URL for the ZIP file
                     zip_download_url = f"{app_url}/api/download-zip/{zip_file_data['filename']}"
-                    print(f"   Creating attachment with URL: {zip_download_url}", flush=True)
                     
                     # Create attachment in Linear using attachmentLinkURL
                     attachment_query = """
@@ -934,47 +4673,20 @@ def create_linear_issue():
                     attachment_result = linear_graphql_request(attachment_query, attachment_vars)
                     
                     if 'errors' in attachment_result:
-                        print(f"   ❌ Failed to create attachment: {attachment_result['errors']}", flush=True)
+                        log.error("Failed to create attachment: %s", attachment_result['errors'])
                         attachment_created = False
                     elif attachment_result.get('data', {}).get('attachmentLinkURL', {}).get('success'):
-                        print(f"   ✅ Attachment created successfully!", flush=True)
                         attachment_created = True
                     else:
-                        print(f"   ⚠️ Unexpected attachment response: {attachment_result}", flush=True)
+                        log.warning("Unexpected attachment response: %s", attachment_result)
                         attachment_created = False
                     
-                    # Determine if it's a chart or model intelligently
-                    if file_id.upper().startswith('CHART-'):
-                        resource_type = 'chart'
-                    elif file_id.upper().startswith('MODEL-'):
-                        resource_type = 'model'
-                    else:
-                        resource_type = 'chart/model'
-                    
-                    # Build attachment info message
-                    attachment_info = ""
-                    if attachment_created:
-                        attachment_info = f"\n📦 **Auto-attached**: `{zip_file_data['filename']}` (main + feat files)\n"
-                    
                     # Update issue description
-                    updated_description = f"""📊 Regression Diff Report
-
-**File**: {file_id}
-**Tenant**: {folder_id}
-
-**Statistics**:
-✅ Added: {stats.get('added', 0)}
-❌ Removed: {stats.get('removed', 0)}
-⚠️ Modified: {stats.get('modified', 0)}
-⚪ Unchanged: {stats.get('unchanged', 0)}
-
-**Total Changes**: {stats.get('added', 0) + stats.get('removed', 0) + stats.get('modified', 0)} items affected
-{attachment_info}
----
-📜 **Scroll Files**: Download the attached ZIP file from Resources that contains main and feat files for this {resource_type}.
-
-🔗 **Interactive Comparison**: Upload the ZIP file at [{app_url}]({app_url}) to view the full side-by-side diff in WizardView.
-"""
+                    updated_description = issue_description(
+                        folder_id, file_id, stats, app_url,
+                        attached_zip=zip_file_data['filename'] if attachment_created else None,
+                        after_attach=True
+                    )
                     
                     update_query = """
                     mutation IssueUpdate($id: String!, $input: IssueUpdateInput!) {
@@ -997,28 +4709,19 @@ def create_linear_issue():
                     update_result = linear_graphql_request(update_query, update_vars)
                     
                     if 'errors' in update_result:
-                        print(f"   ❌ Failed to update issue description: {update_result['errors']}", flush=True)
+                        log.error("Failed to update issue description: %s", update_result['errors'])
                     elif update_result.get('data', {}).get('issueUpdate', {}).get('success'):
-                        print(f"   ✅ Issue description updated!", flush=True)
-                        print(f"\n{'='*60}", flush=True)
-                        print(f"🎉 SUCCESS! Linear issue {issue_identifier} created with attachment!", flush=True)
-                        print(f"   📎 ZIP File: {zip_file_data['filename']}", flush=True)
-                        print(f"   📁 Location: {zip_file_data['filepath']}", flush=True)
-                        print(f"   🔗 Download URL: {zip_download_url}", flush=True)
-                        print(f"{'='*60}\n", flush=True)
+                        log.info("Linear issue %s created with attachment %s", issue_identifier,
+                                 zip_file_data['filename'], extra={'download_url': zip_download_url})
                     else:
-                        print(f"   ⚠️ Unexpected update response: {update_result}", flush=True)
+                        log.warning("Unexpected update response: %s", update_result)
                         
-                except Exception as e:
-                    print(f"❌ Failed to update issue description: {str(e)}", flush=True)
-                    import traceback
-                    traceback.print_exc()
+                except Exception:
+                    log.exception("Failed to update issue description")
                     # Continue anyway, issue was created successfully
-            else:
-                print(f"⚠️ No ZIP file data available - scroll files not found in artifacts directory", flush=True)
-                print(f"   Expected path: {ARTIFACTS_DIR}/{folder_id}/main/{file_id}.csv", flush=True)
-                print(f"   Expected path: {ARTIFACTS_DIR}/{folder_id}/feat/{file_id}.csv", flush=True)
-                print(f"   Please upload scrolls first from the dashboard at http://localhost:5001/", flush=True)
+            elif attach_zip:
+                log.warning("No ZIP attached to %s: scrolls for %s/%s not found in %s",
+                            issue_identifier, folder_id, file_id, artifacts_dir)
             
             return jsonify({
                 'success': True,
@@ -1032,9 +4735,282 @@ def create_linear_issue():
         return jsonify({'success': False, 'error': f'Failed to parse issue response: {str(e)}'}), 500
 
 
+def linear_batch_mutation(operations):
+    """
+    Send many mutations as a single GraphQL document with aliased fields
+    operations: list of (field, {arg: (graphql_type, value)}, selection)
+    Returns a list of (field_result, error_message) in the same order
+    """
+    variable_defs = []
+    fields = []
+    variables = {}
+    for n, (field, args, selection) in enumerate(operations):
+        arg_parts = []
+        for arg, (graphql_type, value) in args.items():
+            variable = f"{arg}{n}"
+            variable_defs.append(f"${variable}: {graphql_type}")
+            variables[variable] = value
+            arg_parts.append(f"{arg}: ${variable}")
+        fields.append(f"    op{n}: {field}({', '.join(arg_parts)}) {{ {selection} }}")
+    
+    query = f"mutation Batch({', '.join(variable_defs)}) {{\n" + "\n".join(fields) + "\n}"
+    result = linear_graphql_request(query, variables)
+    
+    if 'error' in result:
+        return [(None, result['error'])] * len(operations)
+    
+    # Errors carry the alias of the failed field in their path
+    field_errors = {}
+    for error in result.get('errors') or []:
+        path = error.get('path') or []
+        field_errors[path[0] if path else None] = error.get('message', 'Unknown error')
+    
+    data = result.get('data') or {}
+    outcomes = []
+    for n in range(len(operations)):
+        alias = f"op{n}"
+        message = field_errors.get(alias) or (field_errors.get(None) if data.get(alias) is None else None)
+        outcomes.append((data.get(alias), message))
+    return outcomes
+
+
+def _batches(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+@app.route('/api/linear/create-issues', methods=['POST'])
+@login_required
+def create_linear_issues():
+    """
+    Create one Linear issue per folder/file pair in a single request
+    With ?async=1 the filing is queued as a 'linear-issues' job and the job
+    ID is returned at once (202).
+    """
+    if not LINEAR_API_KEY:
+        return jsonify({
+            'success': False,
+            'error': 'Linear API key not configured. Please set LINEAR_API_KEY environment variable.'
+        }), 400
+    
+    data = request.json or {}
+    items = data.get('items') or []
+    assignee_id = data.get('assigneeId')
+    attach_zip = data.get('attachZip', True)
+    
+    valid_items = isinstance(items, list) and all(
+        isinstance(item, dict)
+        and isinstance(item.get('folderId'), str) and item['folderId']
+        and isinstance(item.get('fileId'), str) and item['fileId']
+        for item in items
+    )
+    if not items or not assignee_id or not valid_items:
+        return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+    
+    artifacts_dir = current_artifacts_dir()
+    if artifacts_dir is None:
+        return jsonify({'success': False, 'error': 'Workspace not found'}), 404
+    
+    if request.args.get('async') == '1':
+        job_id = enqueue_job('linear-issues', {
+            'path': str(artifacts_dir),
+            'items': items,
+            'assigneeId': assignee_id,
+            'attachZip': attach_zip
+        })
+        return jsonify({
+            'success': True,
+            'job': job_id,
+            'status': 'queued',
+            'status_url': url_for('job_status', job_id=job_id)
+        }), 202
+    
+    body, status = file_linear_issues(artifacts_dir, items, assignee_id, attach_zip)
+    return jsonify(body), status
+
+
+def file_linear_issues(artifacts_dir, items, assignee_id, attach_zip, progress=None):
+    """
+    File the issues of a bulk request, returns (response body, HTTP status)
+    ZIPs are built in parallel and the issueCreate and attachment mutations
+    are sent as batched GraphQL documents. progress(stage=..., done=..., total=...)
+    is called between steps.
+    """
+    linear_client = get_linear_client()
+    metadata_future = _linear_executor.submit(with_request_id(linear_client.team_metadata))
+    
+    # Stats default to the bundle's precomputed index
+    index = load_stats_index(artifacts_dir) or {'files': {}}
+    for item in items:
+        if not item.get('stats'):
+            item['stats'] = index['files'].get(item['folderId'], {}).get(item['fileId'], {})
+    
+    # Step 1: Name every ZIP in parallel (hashing releases the GIL); ZIPs
+    # not built before are built by one job while the issues are filed
+    zips = [None] * len(items)
+    if progress:
+        progress(stage='zip', done=0, total=len(items))
+    if attach_zip:
+        with ThreadPoolExecutor(max_workers=LINEAR_CONCURRENCY) as pool:
+            zips = list(pool.map(
+                with_request_id(lambda item: build_attachment_zip(
+                    artifacts_dir, item['folderId'], item['fileId'], wait=False)),
+                items
+            ))
+        queue_attachment_zips(zips)
+    
+    metadata = metadata_future.result()
+    if 'error' in metadata:
+        return {'success': False, 'error': metadata['error']}, 500
+    
+    app_url = os.environ.get('WIZARDVIEW_URL', 'https://wizardview.onrender.com')
+    results = [
+        {'folderId': item['folderId'], 'fileId': item['fileId'], 'success': False}
+        for item in items
+    ]
+    
+    # Step 2: Create the issues, batches are sent concurrently
+    operations = []
+    for item, zip_file_data in zip(items, zips):
+        issue_input = {
+            'teamId': metadata['id'],
+            'title': f"Gandalf's WizardView Report for {item['folderId']}-{item['fileId']}",
+            # With a ZIP the final wording is used straight away, saving the issueUpdate
+            'description': issue_description(
+                item['folderId'], item['fileId'], item['stats'], app_url,
+                attached_zip=zip_file_data['filename'] if zip_file_data else None,
+                after_attach=zip_file_data is not None
+            ),
+            'assigneeId': assignee_id,
+            'priority': 2,
+        }
+        if metadata['state_id']:
+            issue_input['stateId'] = metadata['state_id']
+        if metadata['cycle_id']:
+            issue_input['cycleId'] = metadata['cycle_id']
+        operations.append(('issueCreate', {'input': ('IssueCreateInput!', issue_input)},
+                           'success issue { id identifier url }'))
+    
+    if progress:
+        progress(stage='issues', done=0, total=len(items))
+    created = [
+        outcome
+        for batch in _linear_executor.map(with_request_id(linear_batch_mutation), _batches(operations, LINEAR_BATCH_SIZE))
+        for outcome in batch
+    ]
+    
+    attach_positions = []
+    for position, (issue_data, error) in enumerate(created):
+        result = results[position]
+        if error or not issue_data or not issue_data.get('success'):
+            result['error'] = error or 'Failed to create issue'
+            continue
+        result.update({
+            'success': True,
+            'issueId': issue_data['issue']['id'],
+            'issueIdentifier': issue_data['issue']['identifier'],
+            'issueUrl': issue_data['issue']['url']
+        })
+        if zips[position]:
+            attach_positions.append(position)
+    
+    if any('error' in r for r in results):
+        # A cached cycle or state may have gone stale, refetch next time
+        linear_client.invalidate_metadata()
+    
+    # Step 3: Link every ZIP to its issue in batched attachment mutations
+    operations = [
+        ('attachmentLinkURL', {
+            'issueId': ('String!', results[position]['issueId']),
+            'url': ('String!', f"{app_url}/api/download-zip/{zips[position]['filename']}"),
+            'title': ('String', f"📦 {zips[position]['filename']}")
+        }, 'success')
+        for position in attach_positions
+    ]
+    if progress:
+        progress(stage='attachments', done=0, total=len(operations))
+    attached = [
+        outcome
+        for batch in _linear_executor.map(with_request_id(linear_batch_mutation), _batches(operations, LINEAR_BATCH_SIZE))
+        for outcome in batch
+    ]
+    
+    # Issues whose attachment failed get the description without the ZIP note
+    failed_positions = []
+    for position, (attachment_data, error) in zip(attach_positions, attached):
+        ok = not error and bool(attachment_data and attachment_data.get('success'))
+        results[position]['attachment'] = ok
+        if not ok:
+            failed_positions.append(position)
+    
+    if failed_positions:
+        operations = [
+            ('issueUpdate', {
+                'id': ('String!', results[position]['issueId']),
+                'input': ('IssueUpdateInput!', {'description': issue_description(
+                    items[position]['folderId'], items[position]['fileId'], items[position]['stats'],
+                    app_url, after_attach=True
+                )})
+            }, 'success')
+            for position in failed_positions
+        ]
+        for batch in _batches(operations, LINEAR_BATCH_SIZE):
+            linear_batch_mutation(batch)
+    
+    created_count = sum(1 for r in results if r['success'])
+    log.info("Bulk Linear filing: %d/%d issues created, %d attachments",
+             created_count, len(items), len(attach_positions) - len(failed_positions))
+    
+    return {
+        'success': created_count == len(items),
+        'created': created_count,
+        'issues': results
+    }, 200
+
+# Startup
+# gunicorn builds the app with 'app:create_app()' in every worker, and a
+# worker only accepts connections once that returns. With WARM_UP=1 the
+# factory also loads what the first requests would otherwise pay for.
+
+WARM_UP = os.environ.get('WARM_UP', '').lower() in ('1', 'true', 'yes')
+
+
+def warm_up():
+    """
+    Load the indexes and start the helpers the first requests need
+    Structure indexes of the scroll directory and every registered workspace
+    are kept in memory, stats indexes are read once so they are in the page
+    cache, and the job runner is started.
+    Returns the seconds it took.
+    """
+    start = time.perf_counter()
+    directories = [ARTIFACTS_DIR] + [Path(entry['path']) for entry in load_workspace_registry().values()]
+    for base_path in directories:
+        if not base_path.is_dir():
+            continue
+        load_structure_index(base_path)
+        load_stats_index(base_path)
+    ensure_job_runner()
+    elapsed = time.perf_counter() - start
+    observe('wizardview_warm_up_seconds', elapsed)
+    log.info("Warmed up %d scroll directories in %.2fs", len(directories), elapsed)
+    return elapsed
+
+
+def create_app(warm=None):
+    """
+    The WSGI app, warmed up first if warm (default: the WARM_UP variable) is set
+    Routes are registered on the module-level app at import; the factory is
+    where per-worker startup work belongs.
+    """
+    configure_logging()
+    if WARM_UP if warm is None else warm:
+        warm_up()
+    return app
+
+
 if __name__ == '__main__':
     print("🧙‍♂️ Starting WizardView...")
     print("   Gandalf's tool for regression clarity")
     print(f"   Using scrolls from: {ARTIFACTS_DIR}")
-    app.run(debug=True, port=5001, host='127.0.0.1')
+    create_app().run(debug=True, port=5001, host='127.0.0.1')
 
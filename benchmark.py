@@ -0,0 +1,1099 @@
+#!/usr/bin/env python3
+"""
+WizardView benchmarks
+Measure the hot paths of the app on synthetic scroll data
+
+Usage:
+    python benchmark.py diff [--sizes 1000,10000,100000,1000000]
+    python benchmark.py ingest [--tenants 40 --pairs 25 --lines 2000]
+    python benchmark.py scroll [--sizes 100000,500000,2000000]
+    python benchmark.py csv [--rows 20000 --columns 120]
+    python benchmark.py numeric [--rows 8000 --columns 125 --noise 0.3]
+    python benchmark.py summary [--tenants 200 --pairs 25 --lines 500 --round-trips 500]
+    python benchmark.py rerun [--tenants 40 --pairs 25 --lines 1000 --changed 0.05]
+    python benchmark.py structure [--tenants 400 --pairs 50 --calls 20]
+    python benchmark.py payload [--sizes 10000,100000,500000]
+    python benchmark.py blobs [--tenants 60 --pairs 25 --lines 2000 --shared 0.7 --changed 0.05]
+    python benchmark.py clusters [--tenants 120 --pairs 25 --lines 300 --regressions 30]
+    python benchmark.py linear [--issues 200 --concurrency 16 --latency 50]
+    python benchmark.py linear-bulk [--pairs 100 --latency 50]
+    python benchmark.py startup [--tenants 200 --pairs 25 --runs 5]
+"""
+import argparse
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import app
+
+SEED = 42
+
+
+def make_scroll_pair(lines, change_rate=0.01, repeat_rate=0.3, seed=SEED):
+    """
+    Build a synthetic main/feat CSV pair shaped like a model export
+    A share of rows is drawn from a small pool so the data has many
+    repeated lines, which is the worst case for SequenceMatcher.
+    """
+    rng = random.Random(seed)
+    header = "date,account,department,scenario,value"
+    repeated = [
+        f"2024-{m:02d},Account {a},Dept {d},Actual,0"
+        for m in range(1, 13) for a in range(3) for d in range(2)
+    ]
+
+    main = [header]
+    for i in range(lines - 1):
+        if rng.random() < repeat_rate:
+            main.append(rng.choice(repeated))
+        else:
+            main.append(f"2024-{i % 12 + 1:02d},Account {i % 97},Dept {i % 13},Actual,{rng.random() * 10000:.4f}")
+
+    feat = list(main)
+    for _ in range(max(1, int(lines * change_rate))):
+        op = rng.random()
+        pos = rng.randrange(1, len(feat))
+        if op < 0.6:
+            feat[pos] = feat[pos].rsplit(',', 1)[0] + f",{rng.random() * 10000:.4f}"
+        elif op < 0.8:
+            feat.insert(pos, f"2025-01,Account {rng.randrange(97)},Dept New,Plan,{rng.random():.4f}")
+        else:
+            del feat[pos]
+
+    return "\n".join(main) + "\n", "\n".join(feat) + "\n"
+
+
+def bench_diff(args):
+    """Wall time of every diff engine against the SequenceMatcher path"""
+    sizes = [int(s) for s in args.sizes.split(',')]
+    engines = list(app.DIFF_ENGINES)
+
+    print(f"{'lines':>10}  " + "  ".join(f"{e:>12}" for e in engines) + "  stats match")
+    for size in sizes:
+        main_content, feat_content = make_scroll_pair(size)
+        timings = {}
+        results = {}
+        for engine in engines:
+            if engine == 'difflib' and size > args.difflib_limit:
+                timings[engine] = None
+                continue
+            start = time.perf_counter()
+            results[engine] = app.calculate_diff_stats(main_content, feat_content, engine)
+            timings[engine] = time.perf_counter() - start
+
+        cells = []
+        for engine in engines:
+            elapsed = timings[engine]
+            cells.append(f"{'skipped':>12}" if elapsed is None else f"{elapsed:>11.3f}s")
+        match = len({tuple(sorted(r.items())) for r in results.values()}) == 1
+        print(f"{size:>10}  " + "  ".join(cells) + f"  {'yes' if match else 'no'}")
+
+
+def make_bundle(zip_path, tenants, pairs, lines):
+    """Write a regression bundle ZIP: tenant folders of -main/-feat scrolls plus some noise"""
+    main_content, feat_content = make_scroll_pair(lines)
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for t in range(tenants):
+            for p in range(pairs):
+                kind = 'CHART' if p % 2 else 'MODEL'
+                zf.writestr(f"{500 + t}/{kind}-{p}-main", main_content)
+                zf.writestr(f"{500 + t}/{kind}-{p}-feat", feat_content)
+            zf.writestr(f"{500 + t}/.DS_Store", b"\0" * 4096)
+        zf.writestr("README.txt", "regression run\n")
+
+
+def _run_measured(func, *args):
+    """Run func in a forked child and return (seconds, peak RSS in MB)"""
+    def target(queue):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=target, args=(queue,))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def disk_usage(path):
+    """Bytes of the files under path, counting hard-linked files once"""
+    sizes = {}
+    for f in Path(path).rglob('*'):
+        if f.is_file() and not f.is_symlink():
+            st = f.stat()
+            sizes[(st.st_dev, st.st_ino)] = st.st_size
+    return sum(sizes.values())
+
+
+def _legacy_ingest(zip_path, workdir):
+    """Previous upload path: save the upload to disk, then extractall"""
+    saved = workdir / 'upload.zip'
+    shutil.copyfile(zip_path, saved)
+    app.extract_artifact(saved, workdir / 'extracted')
+
+
+def _streaming_ingest(zip_path, workdir):
+    """New upload path: stream scroll members out of the (already spooled) upload"""
+    with open(zip_path, 'rb') as stream:
+        app.ingest_artifact(stream, workdir / 'extracted')
+
+
+def bench_ingest(args):
+    """Ingest time and peak RSS of the legacy and streaming upload paths"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        zip_path = tmp / 'bundle.zip'
+        make_bundle(zip_path, args.tenants, args.pairs, args.lines)
+        print(f"bundle: {zip_path.stat().st_size / 1e6:.1f} MB compressed, "
+              f"{args.tenants * args.pairs} pairs")
+
+        print(f"{'path':>10}  {'time':>9}  {'peak RSS':>9}  {'disk used':>10}")
+        for name, func in (('legacy', _legacy_ingest), ('streaming', _streaming_ingest)):
+            workdir = tmp / name
+            workdir.mkdir()
+            app.BLOBS_DIR = workdir / 'blobs'
+            app.BLOBS_DIR.mkdir()
+            elapsed, rss = _run_measured(func, zip_path, workdir)
+            disk = disk_usage(workdir)
+            print(f"{name:>10}  {elapsed:>8.3f}s  {rss:>6.1f} MB  {disk / 1e6:>7.1f} MB")
+            shutil.rmtree(workdir)
+
+
+def _legacy_window(main_path, feat_path):
+    """Previous /api/compare/lines: read and split the whole scroll for one window"""
+    with open(feat_path, 'r', encoding='utf-8') as f:
+        f.read().splitlines()[1000:1500]
+
+
+def _mapped_window(main_path, feat_path):
+    with app.ScrollReader(feat_path) as feat:
+        feat.lines(1000, 1500)
+
+
+def _legacy_scroll_diff(main_path, feat_path):
+    """Previous compare path: both scrolls read, decoded and split before diffing"""
+    with open(main_path, 'rb') as f:
+        main_bytes = f.read()
+    with open(feat_path, 'rb') as f:
+        feat_bytes = f.read()
+    app.content_hash(main_bytes), app.content_hash(feat_bytes)
+    app.calculate_diff(main_bytes.decode('utf-8'), feat_bytes.decode('utf-8'))
+
+
+def _mapped_scroll_diff(main_path, feat_path):
+    with app.ScrollReader(main_path) as main, app.ScrollReader(feat_path) as feat:
+        app.diff_lines(main.line_hashes(), feat.line_hashes())
+
+
+def bench_scroll(args):
+    """Peak RSS growth of whole-file reads versus memory-mapped ScrollReader access"""
+    sizes = [int(s) for s in args.sizes.split(',')]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        # Keep line indexes out of the real cache
+        app.DIFF_CACHE_DIR = tmp / 'cache'
+        app.DIFF_CACHE_DIR.mkdir()
+        _, baseline = _run_measured(lambda: None)
+
+        print(f"{'lines':>10}  {'size':>8}  {'workload':>8}  {'path':>7}  {'time':>9}  {'RSS growth':>10}")
+        for size in sizes:
+            main_content, feat_content = make_scroll_pair(size)
+            main_path, feat_path = tmp / f'{size}-main', tmp / f'{size}-feat'
+            main_path.write_text(main_content)
+            feat_path.write_text(feat_content)
+            del main_content, feat_content
+            megabytes = main_path.stat().st_size / 1e6
+
+            # The first mapped run builds the line index, later ones reuse it
+            for workload, runs in (('window', (('legacy', _legacy_window),
+                                               ('mmap', _mapped_window),
+                                               ('warm', _mapped_window))),
+                                   ('diff', (('legacy', _legacy_scroll_diff),
+                                             ('warm', _mapped_scroll_diff)))):
+                for name, func in runs:
+                    elapsed, rss = _run_measured(func, main_path, feat_path)
+                    print(f"{size:>10}  {megabytes:>5.1f} MB  {workload:>8}  {name:>7}  "
+                          f"{elapsed:>8.3f}s  {rss - baseline:>7.1f} MB")
+
+
+def make_wide_export(rows, columns, seed=SEED):
+    """
+    Build a wide main/feat model export: three dimension columns plus
+    one value column per period. feat gets rows inserted near the top,
+    a few rows dropped and scattered cell edits.
+    Returns (main, feat, truth) where truth counts the real row changes.
+    """
+    rng = random.Random(seed)
+    periods = [f"P{p:03d}" for p in range(columns)]
+    header = ["account", "department", "scenario"] + periods
+
+    def row(i):
+        return [f"Account {i // 20}", f"Dept {i % 20}", "Actual"] + [f"{rng.random() * 1000:.2f}" for _ in periods]
+
+    main = [row(i) for i in range(rows)]
+    feat = [list(r) for r in main]
+    truth = {'added': 5, 'removed': 3, 'modified': 0}
+
+    edited = set()
+    for _ in range(max(1, rows // 100)):
+        i = rng.randrange(len(feat))
+        feat[i][rng.randrange(3, len(header))] = f"{rng.random() * 1000:.2f}"
+        edited.add(i)
+    truth['modified'] = len(edited)
+
+    for r in sorted(rng.sample(sorted(set(range(10, rows)) - edited), truth['removed']), reverse=True):
+        del feat[r]
+    for n in range(truth['added']):
+        feat.insert(1 + n, [f"Account new{n}", "Dept 0", "Plan"] + ["0.00"] * len(periods))
+
+    def render(data):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(data)
+        return buffer.getvalue()
+
+    return render(main), render(feat), truth
+
+
+def bench_csv(args):
+    """Positional, line and key-aligned cell diffs of a wide model export"""
+    main_content, feat_content, truth = make_wide_export(args.rows, args.columns)
+    print(f"export: {args.rows} rows x {args.columns + 3} columns, "
+          f"{len(main_content) / 1e6:.1f} MB; real changes: {truth}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'main').write_text(main_content)
+        (tmp / 'feat').write_text(feat_content)
+        app.DIFF_CACHE_DIR = tmp / 'cache'
+        app.DIFF_CACHE_DIR.mkdir()
+
+        def positional():
+            return app.compare_files(tmp / 'feat', tmp / 'main')['stats']
+
+        def lines():
+            return app.calculate_diff(main_content, feat_content)[0]
+
+        def cells():
+            return app.diff_csv(main_content, feat_content)['stats']
+
+        print(f"{'path':>11}  {'time':>9}  {'added':>7}  {'removed':>7}  {'modified':>8}")
+        for name, func in (('positional', positional), ('lines', lines), ('cells', cells)):
+            start = time.perf_counter()
+            stats = func()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>11}  {elapsed:>8.3f}s  {stats['added']:>7}  {stats['removed']:>7}  {stats['modified']:>8}")
+
+    result = app.diff_csv(main_content, feat_content)
+    print(f"cell diff keyed on {result['key_columns']}, "
+          f"{len(result['column_changes'])} columns with changes")
+
+
+def make_noisy_export(rows, columns, noise, real_changes=20, seed=SEED):
+    """
+    Wide export where feat re-renders a share of the values with float noise
+    (1234.56 -> 1234.5600001) and a handful of values really change
+    """
+    rng = random.Random(seed)
+    main_content, _, _ = make_wide_export(rows, columns, seed)
+    main_rows = list(csv.reader(io.StringIO(main_content)))
+    feat_rows = [list(r) for r in main_rows]
+    for r in feat_rows[1:]:
+        for c in range(3, len(r)):
+            if rng.random() < noise:
+                r[c] = repr(float(r[c]) + rng.choice((1e-7, -1e-7, 1e-10)))
+    for _ in range(real_changes):
+        r = feat_rows[rng.randrange(1, len(feat_rows))]
+        c = rng.randrange(3, len(r))
+        r[c] = f"{float(r[c]) + 1:.2f}"
+
+    def render(data):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(data)
+        return buffer.getvalue()
+
+    return main_content, render(feat_rows)
+
+
+def _python_tolerance_cells(matched, column_pairs, atol, rtol):
+    """
+    Per-cell loop with math.isclose and running per-column delta stats,
+    the baseline for the vectorized stage
+    """
+    changes = [{} for _ in matched]
+    stats = {name: {'changed': 0, 'within_tolerance': 0, 'count': 0, 'sum': 0.0, 'max': 0.0}
+             for name, _, _ in column_pairs}
+    for row, (_, _, _, main_cells, feat_cells) in enumerate(matched):
+        for name, main_col, feat_col in column_pairs:
+            main_value, feat_value = main_cells[main_col], feat_cells[feat_col]
+            if main_value == feat_value:
+                continue
+            try:
+                main_number, feat_number = float(main_value), float(feat_value)
+            except ValueError:
+                changes[row][name] = [main_value, feat_value]
+                continue
+            column = stats[name]
+            delta = abs(feat_number - main_number)
+            if delta > 0 and math.isfinite(delta):
+                column['count'] += 1
+                column['sum'] += delta
+                column['max'] = max(column['max'], delta)
+            if math.isclose(feat_number, main_number, rel_tol=rtol, abs_tol=atol):
+                column['within_tolerance'] += 1
+            else:
+                column['changed'] += 1
+                changes[row][name] = [main_value, feat_value]
+    return changes
+
+
+def _best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def bench_numeric(args):
+    """Text versus tolerance-aware cell diff of a noisy ~1M-cell export"""
+    main_content, feat_content = make_noisy_export(args.rows, args.columns, args.noise)
+    tolerance = (app.NUMERIC_ATOL, app.NUMERIC_RTOL)
+    cells = args.rows * (args.columns + 3)
+    print(f"export: {args.rows} rows x {args.columns + 3} columns = {cells / 1e6:.2f}M cells, "
+          f"{args.noise:.0%} of values re-rendered with float noise, 20 real changes")
+
+    # The numeric mode imports NumPy on first use; keep that out of the timings
+    start = time.perf_counter()
+    import numpy  # noqa: F401
+    print(f"numpy import: {time.perf_counter() - start:.3f}s (once per worker)")
+
+    print(f"{'end to end':>22}  {'best of 3':>9}  {'modified rows':>13}")
+    for name, tol in (('text', None), ('numeric', tolerance)):
+        elapsed, result = _best_of(lambda: app.diff_csv(main_content, feat_content, tolerance=tol))
+        print(f"{name:>22}  {elapsed:>8.3f}s  {result['stats']['modified']:>13}")
+
+    # The tolerance stage alone, on rows already parsed and aligned
+    main_rows = list(csv.reader(io.StringIO(main_content)))
+    feat_rows = list(csv.reader(io.StringIO(feat_content)))
+    column_pairs = [(name, i, i) for i, name in enumerate(main_rows[0])]
+    matched = [(None, None, None, m, f) for m, f in zip(main_rows[1:], feat_rows[1:])]
+    print(f"{'tolerance stage only':>22}")
+    for name, func in (('python loop', _python_tolerance_cells), ('numpy', app._numeric_cell_changes)):
+        elapsed, result = _best_of(lambda: func(matched, column_pairs, *tolerance))
+        changes = result if name == 'python loop' else result[0]
+        print(f"{name:>22}  {elapsed:>8.3f}s  {sum(1 for c in changes if c):>13}")
+
+
+class MockLinearHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the Linear GraphQL API
+    Answers every query and mutation WizardView sends (aliased mutations
+    included) after an artificial delay, and counts requests.
+    """
+    latency = 0.05
+    requests_served = 0
+    counter_lock = threading.Lock()
+
+    MUTATION_FIELD = re.compile(r'(?:(\w+)\s*:\s*)?\b(issueCreate|attachmentLinkURL|issueUpdate)\s*\(')
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.latency)
+        with self.counter_lock:
+            type(self).requests_served += 1
+
+        payload = json.dumps({'data': self.answer(body['query'])}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def answer(self, query):
+        if query.lstrip().startswith('mutation'):
+            data = {}
+            for alias, field in self.MUTATION_FIELD.findall(query):
+                n = random.randrange(1_000_000)
+                if field == 'issueCreate':
+                    result = {'success': True, 'issue': {
+                        'id': f'issue-{n}', 'identifier': f'ENG-{n}',
+                        'url': f'https://linear.app/mock/issue/ENG-{n}'}}
+                elif field == 'attachmentLinkURL':
+                    result = {'success': True, 'lastSyncId': n}
+                else:
+                    result = {'success': True, 'issue': {'id': f'issue-{n}'}}
+                data[alias or field] = result
+            return data
+
+        team = {'id': 'team-eng', 'key': 'ENG', 'name': 'Engineering'}
+        if 'members' in query:
+            team['members'] = {'nodes': [
+                {'id': f'user-{i}', 'name': f'User {i}', 'displayName': f'user{i}',
+                 'email': f'user{i}@example.com', 'active': True} for i in range(25)]}
+        if 'activeCycle' in query:
+            team['activeCycle'] = {'id': 'cycle-1', 'name': 'Cycle 1'}
+        if 'states' in query:
+            team['states'] = {'nodes': [
+                {'id': 'state-backlog', 'name': 'Backlog', 'type': 'backlog'},
+                {'id': 'state-todo', 'name': 'Todo', 'type': 'unstarted'}]}
+
+        data = {}
+        if re.search(r'\bteams\s*[({]', query):
+            data['teams'] = {'nodes': [team]}
+        if re.search(r'\bteam\s*\(', query):
+            data['team'] = team
+        return data
+
+
+def start_mock_linear(latency):
+    """Start the mock Linear server on a free port and point the app at it"""
+    MockLinearHandler.latency = latency
+    MockLinearHandler.requests_served = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockLinearHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    app.LINEAR_API_URL = f"http://127.0.0.1:{server.server_address[1]}/graphql"
+    app.LINEAR_API_KEY = 'mock-key'
+    app._linear_client = None
+    return server
+
+
+def make_artifacts_dir(tmp, tenants=4, pairs=5, lines=500):
+    """Lay out a small extracted bundle for endpoints that read scrolls"""
+    main_content, feat_content = make_scroll_pair(lines)
+    for t in range(tenants):
+        folder = tmp / str(500 + t)
+        folder.mkdir(parents=True)
+        for p in range(pairs):
+            (folder / f"CHART-{p}-main").write_text(main_content)
+            (folder / f"CHART-{p}-feat").write_text(feat_content)
+    app.ARTIFACTS_DIR = tmp
+    return [(str(500 + t), f"CHART-{p}") for t in range(tenants) for p in range(pairs)]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the app's log records and prints while a benchmark runs"""
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def logged_in_client():
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+    return client
+
+
+def bench_summary(args):
+    """Per-pair /api/compare/summary round trips versus one streamed /api/summary"""
+    total = args.tenants * args.pairs
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        # Set in the environment too so the diff pool's workers cache here as well
+        app.DIFF_CACHE_DIR = tmp / 'cache'
+        app.DIFF_CACHE_DIR.mkdir()
+        os.environ['DIFF_CACHE_DIR'] = str(app.DIFF_CACHE_DIR)
+        bundle = tmp / 'bundle'
+        pairs = []
+        for t in range(args.tenants):
+            folder = bundle / str(500 + t)
+            folder.mkdir(parents=True)
+            for p in range(args.pairs):
+                # A distinct seed per pair so no pair is served from another's cache entry
+                main_content, feat_content = make_scroll_pair(args.lines, seed=SEED + len(pairs))
+                (folder / f"CHART-{p}-main").write_text(main_content)
+                (folder / f"CHART-{p}-feat").write_text(feat_content)
+                pairs.append((str(500 + t), f"CHART-{p}"))
+        app.ARTIFACTS_DIR = bundle
+        print(f"bundle: {total} pairs of {args.lines} lines, {app.STATS_INDEX_WORKERS} workers")
+
+        client = logged_in_client()
+        print(f"{'path':>12}  {'pairs':>6}  {'first pair':>10}  {'total':>9}  {'pairs/s':>8}")
+
+        sample = pairs[:args.round_trips]
+        start = time.perf_counter()
+        with quiet():
+            for folder_id, file_id in sample:
+                response = client.get(f'/api/compare/summary?folder={folder_id}&file={file_id}')
+                assert response.status_code == 200, response.json
+        elapsed = time.perf_counter() - start
+        print(f"{'round trips':>12}  {len(sample):>6}  {elapsed / len(sample) * 1000:>7.1f} ms  "
+              f"{elapsed:>8.2f}s  {len(sample) / elapsed:>8.0f}")
+        if len(sample) < total:
+            print(f"{'':>12}  {total:>6}  {'':>10}  {elapsed / len(sample) * total:>8.2f}s  (extrapolated)")
+
+        # Start from a cold cache so the pool diffs every pair from scratch
+        shutil.rmtree(app.DIFF_CACHE_DIR)
+        app.DIFF_CACHE_DIR.mkdir()
+        for name in ('summary', 'indexed'):
+            start = time.perf_counter()
+            first = None
+            with quiet(), client.get('/api/summary') as response:
+                for line in response.response:
+                    record = json.loads(line)
+                    if first is None and record['type'] == 'pair':
+                        first = time.perf_counter() - start
+            elapsed = time.perf_counter() - start
+            assert record['type'] == 'summary' and record['pairs'] == total, record
+            print(f"{name:>12}  {total:>6}  {first * 1000:>7.1f} ms  {elapsed:>8.2f}s  {total / elapsed:>8.0f}")
+
+
+def make_run_bundles(tmp, tenants, pairs, lines, changed):
+    """
+    Two successive nightly bundles with distinct scrolls per pair
+    In the second, a share of the feat scrolls gained a row and one tenant is new.
+    """
+    rng = random.Random(SEED)
+    first, second = tmp / 'night-1.zip', tmp / 'night-2.zip'
+    with zipfile.ZipFile(first, 'w', zipfile.ZIP_DEFLATED) as z1, \
+            zipfile.ZipFile(second, 'w', zipfile.ZIP_DEFLATED) as z2:
+        for t in range(tenants + 1):
+            for p in range(pairs):
+                main_content, feat_content = make_scroll_pair(lines, seed=SEED + t * pairs + p)
+                if t < tenants:
+                    z1.writestr(f"{500 + t}/CHART-{p}-main", main_content)
+                    z1.writestr(f"{500 + t}/CHART-{p}-feat", feat_content)
+                if rng.random() < changed:
+                    feat_content += f"2025-01,Account {p},Dept {t},Actual,1.0000\n"
+                z2.writestr(f"{500 + t}/CHART-{p}-main", main_content)
+                z2.writestr(f"{500 + t}/CHART-{p}-feat", feat_content)
+    return first, second
+
+
+def _upload(client, zip_path, baseline=''):
+    with open(zip_path, 'rb') as f:
+        response = client.post('/api/upload', data={'file': (f, zip_path.name), 'baseline': baseline},
+                               content_type='multipart/form-data')
+    assert response.json.get('success'), response.json
+    return response.json
+
+
+def bench_rerun(args):
+    """Uploading the next night's bundle with and without the previous run as a baseline"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        first, second = make_run_bundles(tmp, args.tenants, args.pairs, args.lines, args.changed)
+        print(f"bundle: {second.stat().st_size / 1e6:.1f} MB compressed, "
+              f"{(args.tenants + 1) * args.pairs} pairs, {app.STATS_INDEX_WORKERS} workers")
+
+        def fresh(name):
+            # Empty workspace registry and diff cache, pool workers included
+            root = tmp / name
+            app.WORKSPACES_DIR = root / 'workspaces'
+            app.WORKSPACES_DIR.mkdir(parents=True)
+            app.WORKSPACE_REGISTRY = root / 'workspaces.json'
+            app.WORKSPACE_LOCK = root / 'workspaces.lock'
+            app.DIFF_CACHE_DIR = root / 'cache'
+            app.DIFF_CACHE_DIR.mkdir()
+            os.environ['DIFF_CACHE_DIR'] = str(app.DIFF_CACHE_DIR)
+
+        client = logged_in_client()
+        print(f"{'upload':>12}  {'time':>9}  {'new':>5}  {'changed':>7}  {'carried':>7}")
+        with quiet():
+            fresh('full')
+            start = time.perf_counter()
+            _upload(client, second)
+            full = time.perf_counter() - start
+
+            fresh('incremental')
+            _upload(client, first)
+            shutil.rmtree(app.DIFF_CACHE_DIR)
+            app.DIFF_CACHE_DIR.mkdir()
+            start = time.perf_counter()
+            changes = _upload(client, second)['changes']
+            incremental = time.perf_counter() - start
+        print(f"{'full':>12}  {full:>8.2f}s  {'':>5}  {'':>7}  {'':>7}")
+        print(f"{'incremental':>12}  {incremental:>8.2f}s  {changes['new']:>5}  "
+              f"{changes['changed']:>7}  {changes['carried_over']:>7}  ({incremental / full:.0%} of full)")
+
+
+def _legacy_structure(base_path):
+    """Previous get_artifact_structure: list and stat every file on every call"""
+    structure = {}
+    for folder in sorted(base_path.iterdir()):
+        if folder.is_dir():
+            file_groups = {}
+            for file_name in sorted(f.name for f in folder.iterdir() if f.is_file()):
+                if '-feat' in file_name:
+                    file_groups.setdefault(file_name.replace('-feat', ''), {})['feat'] = file_name
+                elif '-main' in file_name:
+                    file_groups.setdefault(file_name.replace('-main', ''), {})['main'] = file_name
+            structure[folder.name] = file_groups
+    return structure
+
+
+def bench_structure(args):
+    """/api/structure cost: full walk per call versus the persisted structure index and ETags"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = Path(tmp) / 'bundle'
+        for t in range(args.tenants):
+            folder = bundle / str(500 + t)
+            folder.mkdir(parents=True)
+            for p in range(args.pairs):
+                (folder / f"CHART-{p}-main").touch()
+                (folder / f"CHART-{p}-feat").touch()
+        # Folders modified within the mtime slack are listed on every call
+        past = time.time() - 60
+        for folder in bundle.iterdir():
+            os.utime(folder, (past, past))
+        app.ARTIFACTS_DIR = bundle
+        print(f"bundle: {args.tenants} tenants, {args.tenants * args.pairs * 2} files")
+
+        def timed(func):
+            start = time.perf_counter()
+            for _ in range(args.calls):
+                func()
+            return (time.perf_counter() - start) / args.calls * 1000
+
+        client = logged_in_client()
+        etag = client.get('/api/structure').headers['ETag']
+        assert app.get_artifact_structure(bundle) == _legacy_structure(bundle)
+
+        print(f"{'path':>22}  {'per call':>9}")
+        for name, func in (
+                ('legacy walk', lambda: _legacy_structure(bundle)),
+                ('indexed', lambda: app.get_artifact_structure(bundle)),
+                ('indexed, new process', lambda: (app._structure_indexes.clear(),
+                                                  app.get_artifact_structure(bundle))),
+                ('/api/structure 200', lambda: client.get('/api/structure')),
+                ('/api/structure 304', lambda: client.get('/api/structure', headers={'If-None-Match': etag}))):
+            print(f"{name:>22}  {timed(func):>6.1f} ms")
+
+
+def bench_payload(args):
+    """Bytes on the wire for /api/compare: full or delta payloads, per content encoding"""
+    sizes = [int(s) for s in args.sizes.split(',')]
+    encodings = ['identity', 'gzip'] + (['br'] if app.brotli else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        app.DIFF_CACHE_DIR = tmp / 'cache'
+        app.DIFF_CACHE_DIR.mkdir()
+        folder = tmp / 'bundle' / '500'
+        folder.mkdir(parents=True)
+        app.ARTIFACTS_DIR = folder.parent
+        client = logged_in_client()
+
+        print(f"{'lines':>8}  {'format':>6}  {'encoding':>8}  {'bytes':>11}  {'vs full':>7}  {'server':>8}")
+        for size in sizes:
+            main_content, feat_content = make_scroll_pair(size)
+            (folder / f"CHART-{size}-main").write_text(main_content)
+            (folder / f"CHART-{size}-feat").write_text(feat_content)
+            url = f'/api/compare?folder=500&file=CHART-{size}'
+            # Warm the diff cache so only payload building and compression are timed
+            client.get(url)
+
+            full = None
+            for payload_format in ('full', 'delta'):
+                for encoding in encodings:
+                    start = time.perf_counter()
+                    response = client.get(f'{url}&format={payload_format}', headers={'Accept-Encoding': encoding})
+                    elapsed = time.perf_counter() - start
+                    assert response.headers.get('Content-Encoding', 'identity') == encoding
+                    size_on_wire = len(response.data)
+                    full = full or size_on_wire
+                    print(f"{size:>8}  {payload_format:>6}  {encoding:>8}  {size_on_wire:>11,}  "
+                          f"{size_on_wire / full:>7.1%}  {elapsed * 1000:>5.0f} ms")
+
+
+def make_regressed_pair(lines, regression, seed):
+    """
+    A tenant's main/feat pair with one of a few recurring regressions applied
+    Values differ per tenant, so the same regression never gives identical bytes.
+    """
+    rng = random.Random(seed)
+    main_content, _ = make_scroll_pair(lines, seed=seed)
+    if regression is None:
+        return main_content, main_content
+    name = f"{chr(65 + regression % 26)}{chr(65 + regression // 26 % 26)}"
+    feat = main_content.splitlines()
+    # Rows of one department move to another scenario...
+    feat = [line.replace(',Actual,', f',Scenario {name},') if f',Dept {regression % 13},' in line else line
+            for line in feat]
+    # ...and the rule behind the regression adds a few rows
+    position = rng.randrange(1, len(feat))
+    feat[position:position] = [f"2025-{m:02d},Rule {name},Dept New,Plan,{rng.random() * 100:.2f}" for m in range(1, 4)]
+    return main_content, "\n".join(feat) + "\n"
+
+
+def bench_clusters(args):
+    """Distinct regressions found by /api/clusters in a bundle where a few regressions repeat across tenants"""
+    total = args.tenants * args.pairs
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        app.DIFF_CACHE_DIR = tmp / 'cache'
+        app.DIFF_CACHE_DIR.mkdir()
+        os.environ['DIFF_CACHE_DIR'] = str(app.DIFF_CACHE_DIR)
+        bundle = tmp / 'bundle'
+        rng = random.Random(SEED)
+        applied = set()
+        for t in range(args.tenants):
+            folder = bundle / str(500 + t)
+            folder.mkdir(parents=True)
+            for p in range(args.pairs):
+                regression = rng.randrange(args.regressions) if rng.random() < args.changed else None
+                applied.add(regression)
+                main_content, feat_content = make_regressed_pair(args.lines, regression, SEED + t * args.pairs + p)
+                (folder / f"CHART-{p}-main").write_text(main_content)
+                (folder / f"CHART-{p}-feat").write_text(feat_content)
+        app.ARTIFACTS_DIR = bundle
+        applied.discard(None)
+        print(f"bundle: {total} pairs of {args.lines} lines, {len(applied)} regressions, "
+              f"{app.STATS_INDEX_WORKERS} workers")
+
+        client = logged_in_client()
+        print(f"{'run':>8}  {'changed pairs':>13}  {'exact groups':>12}  {'clusters':>8}  {'time':>8}")
+        for name in ('cold', 'cached'):
+            start = time.perf_counter()
+            with quiet():
+                response = client.get('/api/clusters')
+            elapsed = time.perf_counter() - start
+            result = response.json
+            assert response.status_code == 200, result
+            exact_groups = sum(cluster['distinct_diffs'] for cluster in result['clusters'])
+            print(f"{name:>8}  {result['changed_pairs']:>13}  {exact_groups:>12}  "
+                  f"{len(result['clusters']):>8}  {elapsed:>7.2f}s")
+
+
+def make_tenant_bundles(tmp, tenants, pairs, lines, shared, changed):
+    """
+    Two successive nightly bundles shaped like a real multi-tenant run
+    A share of the charts are tenant independent, so their scrolls are the
+    same bytes in every tenant, and most pairs have an unchanged feat.
+    """
+    rng = random.Random(SEED)
+    is_shared = [rng.random() < shared for _ in range(pairs)]
+    is_changed = {(t, p): rng.random() < 0.2 for t in range(tenants) for p in range(pairs)}
+    nightly = {(t, p): rng.random() < changed for t in range(tenants) for p in range(pairs)}
+    first, second = tmp / 'night-1.zip', tmp / 'night-2.zip'
+    with zipfile.ZipFile(first, 'w', zipfile.ZIP_DEFLATED) as z1, \
+            zipfile.ZipFile(second, 'w', zipfile.ZIP_DEFLATED) as z2:
+        for t in range(tenants):
+            for p in range(pairs):
+                seed = SEED + p if is_shared[p] else SEED + 1000 * (t + 1) + p
+                main_content, feat_content = make_scroll_pair(lines, seed=seed)
+                if not is_changed[(t, p)]:
+                    feat_content = main_content
+                z1.writestr(f"{500 + t}/CHART-{p}-main", main_content)
+                z1.writestr(f"{500 + t}/CHART-{p}-feat", feat_content)
+                if nightly[(t, p)]:
+                    feat_content += f"2025-01,Account {p},Dept {t},Actual,1.0000\n"
+                z2.writestr(f"{500 + t}/CHART-{p}-main", main_content)
+                z2.writestr(f"{500 + t}/CHART-{p}-feat", feat_content)
+    return first, second
+
+
+def bench_blobs(args):
+    """Extraction time and disk use with and without the content-addressed blob store"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        first, second = make_tenant_bundles(tmp, args.tenants, args.pairs, args.lines, args.shared, args.changed)
+        with zipfile.ZipFile(first) as zf:
+            raw = sum(info.file_size for info in zf.infolist())
+        print(f"bundle: {first.stat().st_size / 1e6:.1f} MB compressed, {raw / 1e6:.1f} MB of scrolls, "
+              f"{args.tenants * args.pairs} pairs")
+
+        def extract_files(zip_path, target):
+            # Previous ingestion: every member hashed and written out as its own file
+            with zipfile.ZipFile(zip_path) as zf:
+                for info in zf.infolist():
+                    path = target / info.filename
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    digest = hashlib.sha256()
+                    with zf.open(info) as src, open(path, 'wb') as dst:
+                        for chunk in iter(lambda: src.read(app.INGEST_CHUNK_SIZE), b''):
+                            digest.update(chunk)
+                            dst.write(chunk)
+
+        print(f"{'run':>22}  {'time':>8}  {'new on disk':>12}  {'total on disk':>13}")
+        legacy = tmp / 'legacy'
+        for name, zip_path in (('night 1, files', first), ('night 2, files', second)):
+            before = disk_usage(legacy) if legacy.exists() else 0
+            start = time.perf_counter()
+            extract_files(zip_path, legacy / zip_path.stem)
+            elapsed = time.perf_counter() - start
+            total = disk_usage(legacy)
+            print(f"{name:>22}  {elapsed:>7.2f}s  {(total - before) / 1e6:>9.1f} MB  {total / 1e6:>10.1f} MB")
+
+        store = tmp / 'store'
+        app.BLOBS_DIR = store / 'blobs'
+        app.BLOBS_DIR.mkdir(parents=True)
+        for name, zip_path in (('night 1, blob store', first), ('night 2, blob store', second)):
+            before = disk_usage(store)
+            start = time.perf_counter()
+            with open(zip_path, 'rb') as stream:
+                result = app.ingest_artifact(stream, store / zip_path.stem)
+            elapsed = time.perf_counter() - start
+            total = disk_usage(store)
+            print(f"{name:>22}  {elapsed:>7.2f}s  {(total - before) / 1e6:>9.1f} MB  {total / 1e6:>10.1f} MB  "
+                  f"({result['reused']}/{result['members']} scrolls already stored)")
+
+
+def bench_linear(args):
+    """Issue creations per second through /api/linear/create-issue against a mock Linear"""
+    server = start_mock_linear(args.latency / 1000)
+    local = threading.local()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pairs = make_artifacts_dir(Path(tmp))
+        app.LINEAR_ATTACHMENTS_DIR = Path(tmp) / 'attachments'
+        app.LINEAR_ATTACHMENTS_DIR.mkdir()
+        app.LINEAR_CACHE_DIR = Path(tmp) / 'linear_cache'
+
+        def create(i):
+            if not hasattr(local, 'client'):
+                local.client = logged_in_client()
+            folder_id, file_id = pairs[i % len(pairs)]
+            start = time.perf_counter()
+            response = local.client.post('/api/linear/create-issue', json={
+                'folderId': folder_id, 'fileId': file_id, 'assigneeId': 'user-1',
+                'stats': {'added': 1, 'removed': 0, 'modified': 2, 'unchanged': 10}})
+            assert response.json['success'], response.json
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with quiet(), ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = sorted(pool.map(create, range(args.issues)))
+        elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    print(f"{args.issues} issues, concurrency {args.concurrency}, mock latency {args.latency}ms")
+    print(f"  throughput:        {args.issues / elapsed:.1f} issues/s")
+    print(f"  latency p50 / p95: {statistics.median(latencies) * 1000:.0f}ms / "
+          f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms")
+    print(f"  Linear round trips per issue: {MockLinearHandler.requests_served / args.issues:.2f}")
+
+
+def bench_linear_bulk(args):
+    """Filing many diffs one click at a time versus one bulk request"""
+    server = start_mock_linear(args.latency / 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        pairs = make_artifacts_dir(tmp / 'scrolls', tenants=max(1, args.pairs // 10), pairs=10)[:args.pairs]
+        app.LINEAR_ATTACHMENTS_DIR = tmp / 'attachments'
+        app.LINEAR_ATTACHMENTS_DIR.mkdir()
+        app.LINEAR_CACHE_DIR = tmp / 'linear_cache'
+        client = logged_in_client()
+        stats = {'added': 1, 'removed': 0, 'modified': 2, 'unchanged': 10}
+
+        print(f"{len(pairs)} pairs, mock latency {args.latency}ms")
+        print(f"{'path':>10}  {'time':>9}  {'round trips':>11}  {'created':>7}")
+
+        MockLinearHandler.requests_served = 0
+        start = time.perf_counter()
+        with quiet():
+            created = sum(
+                client.post('/api/linear/create-issue', json={
+                    'folderId': folder_id, 'fileId': file_id,
+                    'assigneeId': 'user-1', 'stats': stats}).json['success']
+                for folder_id, file_id in pairs
+            )
+        print(f"{'per-file':>10}  {time.perf_counter() - start:>8.2f}s  "
+              f"{MockLinearHandler.requests_served:>11}  {created:>7}")
+
+        MockLinearHandler.requests_served = 0
+        start = time.perf_counter()
+        with quiet():
+            response = client.post('/api/linear/create-issues', json={
+                'assigneeId': 'user-1',
+                'items': [{'folderId': f, 'fileId': i, 'stats': stats} for f, i in pairs]})
+        print(f"{'bulk':>10}  {time.perf_counter() - start:>8.2f}s  "
+              f"{MockLinearHandler.requests_served:>11}  {response.json['created']:>7}")
+
+    server.shutdown()
+
+
+# Runs in a fresh interpreter so the import is timed too; prints its timings as JSON
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+if sys.argv[1] == 'eager':
+    # What every worker paid before the factory: requests and a scrypt hash at import
+    import requests, requests.adapters
+    from werkzeug.security import generate_password_hash
+    generate_password_hash('OneRing2RuleThemAll')
+import app
+imported = time.perf_counter()
+wsgi = app.create_app(warm=sys.argv[1] == 'warm')
+created = time.perf_counter()
+client = wsgi.test_client()
+with client.session_transaction() as sess:
+    sess['logged_in'] = True
+assert client.get('/health').status_code == 200
+health = time.perf_counter()
+assert client.get('/api/structure').status_code == 200
+structure = time.perf_counter()
+print(json.dumps({'import': imported - start, 'factory': created - imported,
+                  'health': health - created, 'structure': structure - health}))
+"""
+
+
+def bench_startup(args):
+    """Import-to-first-response time of a new worker, with and without warm-up"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = Path(tmp) / 'bundle'
+        main_content, feat_content = make_scroll_pair(200)
+        for t in range(args.tenants):
+            folder = bundle / str(500 + t)
+            folder.mkdir(parents=True)
+            for p in range(args.pairs):
+                (folder / f"CHART-{p}-main").write_text(main_content)
+                (folder / f"CHART-{p}-feat").write_text(feat_content)
+        past = time.time() - 60
+        for folder in bundle.iterdir():
+            os.utime(folder, (past, past))
+        env = dict(os.environ, ARTIFACTS_DIR=str(bundle), LOG_LEVEL='ERROR',
+                   DIFF_CACHE_DIR=os.path.join(tmp, 'diff_cache'),
+                   METRICS_DIR=os.path.join(tmp, 'metrics'),
+                   BLOBS_DIR=os.path.join(tmp, 'blobs'),
+                   JOB_RUNNER_THREADS='0')
+        env.pop('WARM_UP', None)
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        print(f"bundle: {args.tenants} tenants, {args.tenants * args.pairs * 2} files; best of {args.runs} runs")
+
+        def probe(mode):
+            output = subprocess.run([sys.executable, '-c', STARTUP_PROBE, mode], env=env, cwd=cwd,
+                                    check=True, capture_output=True, text=True).stdout
+            return json.loads(output.splitlines()[-1])
+
+        # A deployed bundle already has its structure index on disk
+        probe('cold')
+        print(f"{'startup':>24}  {'import':>7}  {'factory':>7}  {'/health':>7}  {'/api/structure':>14}  {'to first response':>17}")
+        for name, mode in (('eager imports (before)', 'eager'), ('lazy imports', 'cold'), ('lazy imports + warm-up', 'warm')):
+            runs = [probe(mode) for _ in range(args.runs)]
+            best = {key: min(run[key] for run in runs) for key in runs[0]}
+            first_response = min(run['import'] + run['factory'] + run['health'] for run in runs)
+            print(f"{name:>24}  {best['import'] * 1000:>4.0f} ms  {best['factory'] * 1000:>4.0f} ms  "
+                  f"{best['health'] * 1000:>4.0f} ms  {best['structure'] * 1000:>11.0f} ms  {first_response * 1000:>14.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WizardView benchmarks")
+    suites = parser.add_subparsers(dest='suite', required=True)
+
+    diff = suites.add_parser('diff', help='diff engines vs SequenceMatcher')
+    diff.add_argument('--sizes', default='1000,10000,100000,1000000')
+    diff.add_argument('--difflib-limit', type=int, default=200000,
+                      help='skip SequenceMatcher above this many lines')
+    diff.set_defaults(func=bench_diff)
+
+    ingest = suites.add_parser('ingest', help='upload ingestion time and peak RSS')
+    ingest.add_argument('--tenants', type=int, default=40)
+    ingest.add_argument('--pairs', type=int, default=25)
+    ingest.add_argument('--lines', type=int, default=2000)
+    ingest.set_defaults(func=bench_ingest)
+
+    scroll = suites.add_parser('scroll', help='peak RSS of whole-file reads vs memory-mapped scrolls')
+    scroll.add_argument('--sizes', default='100000,500000,2000000')
+    scroll.set_defaults(func=bench_scroll)
+
+    wide = suites.add_parser('csv', help='positional, line and cell diffs of a wide model export')
+    wide.add_argument('--rows', type=int, default=20000)
+    wide.add_argument('--columns', type=int, default=120, help='value columns besides the three dimensions')
+    wide.set_defaults(func=bench_csv)
+
+    numeric = suites.add_parser('numeric', help='text vs tolerance-aware cell diff of a noisy export')
+    numeric.add_argument('--rows', type=int, default=8000)
+    numeric.add_argument('--columns', type=int, default=125, help='value columns besides the three dimensions')
+    numeric.add_argument('--noise', type=float, default=0.3, help='share of values re-rendered with float noise')
+    numeric.set_defaults(func=bench_numeric)
+
+    summary = suites.add_parser('summary', help='per-pair compare round trips vs the streamed bundle summary')
+    summary.add_argument('--tenants', type=int, default=200)
+    summary.add_argument('--pairs', type=int, default=25)
+    summary.add_argument('--lines', type=int, default=500)
+    summary.add_argument('--round-trips', type=int, default=500, help='pairs to time one request at a time')
+    summary.set_defaults(func=bench_summary)
+
+    rerun = suites.add_parser('rerun', help='full versus incremental analysis of the next nightly bundle')
+    rerun.add_argument('--tenants', type=int, default=40)
+    rerun.add_argument('--pairs', type=int, default=25)
+    rerun.add_argument('--lines', type=int, default=1000)
+    rerun.add_argument('--changed', type=float, default=0.05, help='share of pairs whose feat scroll changed')
+    rerun.set_defaults(func=bench_rerun)
+
+    tree = suites.add_parser('structure', help='per-call directory walk vs the persisted structure index')
+    tree.add_argument('--tenants', type=int, default=400)
+    tree.add_argument('--pairs', type=int, default=50)
+    tree.add_argument('--calls', type=int, default=20)
+    tree.set_defaults(func=bench_structure)
+
+    payload = suites.add_parser('payload', help='/api/compare bytes on the wire per format and encoding')
+    payload.add_argument('--sizes', default='10000,100000,500000')
+    payload.set_defaults(func=bench_payload)
+
+    blobs = suites.add_parser('blobs', help='disk use and extraction time with the content-addressed blob store')
+    blobs.add_argument('--tenants', type=int, default=60)
+    blobs.add_argument('--pairs', type=int, default=25)
+    blobs.add_argument('--lines', type=int, default=2000)
+    blobs.add_argument('--shared', type=float, default=0.7, help='share of charts identical in every tenant')
+    blobs.add_argument('--changed', type=float, default=0.05, help='share of feat scrolls that change overnight')
+    blobs.set_defaults(func=bench_blobs)
+
+    clusters = suites.add_parser('clusters', help='cross-tenant clustering of repeated regressions')
+    clusters.add_argument('--tenants', type=int, default=120)
+    clusters.add_argument('--pairs', type=int, default=25)
+    clusters.add_argument('--lines', type=int, default=300)
+    clusters.add_argument('--regressions', type=int, default=30)
+    clusters.add_argument('--changed', type=float, default=0.5, help='share of pairs with a regression')
+    clusters.set_defaults(func=bench_clusters)
+
+    linear = suites.add_parser('linear', help='Linear issue creation load test against a mock server')
+    linear.add_argument('--issues', type=int, default=200)
+    linear.add_argument('--concurrency', type=int, default=16)
+    linear.add_argument('--latency', type=float, default=50.0, help='mock Linear latency in ms')
+    linear.set_defaults(func=bench_linear)
+
+    bulk = suites.add_parser('linear-bulk', help='per-file versus bulk Linear filing against a mock server')
+    bulk.add_argument('--pairs', type=int, default=100)
+    bulk.add_argument('--latency', type=float, default=50.0, help='mock Linear latency in ms')
+    bulk.set_defaults(func=bench_linear_bulk)
+
+    startup = suites.add_parser('startup', help='import-to-first-response time of a new worker')
+    startup.add_argument('--tenants', type=int, default=200)
+    startup.add_argument('--pairs', type=int, default=25)
+    startup.add_argument('--runs', type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
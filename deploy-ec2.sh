@@ -90,7 +90,11 @@ User=$APP_USER
 Group=$APP_USER
 WorkingDirectory=$APP_DIR
 Environment="PATH=$APP_DIR/venv/bin"
-ExecStart=$APP_DIR/venv/bin/gunicorn app:app --config gunicorn_config.py
+# Downloads are sent by nginx (X-Accel-Redirect), not by the gunicorn workers
+Environment="DOWNLOAD_OFFLOAD=nginx"
+# Workers load the scroll indexes before they accept connections
+Environment="WARM_UP=1"
+ExecStart=$APP_DIR/venv/bin/gunicorn 'app:create_app()' --config gunicorn_config.py
 Restart=always
 RestartSec=10
 
@@ -139,6 +143,22 @@ server {
         expires 30d;
         add_header Cache-Control "public, immutable";
     }
+    
+    # Only reachable through an X-Accel-Redirect from the app, which has
+    # already authorized the download; nginx handles Range and If-* headers
+    location /_protected/uploads/ {
+        internal;
+        alias $APP_DIR/uploads/;
+        sendfile on;
+        tcp_nopush on;
+    }
+    
+    location /_protected/linear_attachments/ {
+        internal;
+        alias $APP_DIR/linear_attachments/;
+        sendfile on;
+        tcp_nopush on;
+    }
 }
 EOF
 
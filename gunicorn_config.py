@@ -10,7 +10,11 @@ backlog = 2048
 
 # Worker processes
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
+# Threaded workers, so an open progress stream (Server-Sent Events) or a
+# request waiting on the Linear API holds a thread rather than a whole worker.
+# GUNICORN_WORKER_CLASS=gevent (requires `pip install gevent`) also works.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -21,6 +25,24 @@ errorlog = '-'
 loglevel = 'info'
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
 
+# Metrics: every worker writes its counters to METRICS_DIR/<pid>.json and
+# /metrics adds them up. Files from a previous run are removed at startup so
+# a reused pid never inherits old counts (the same default as app.py).
+metrics_dir = os.getenv('METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'metrics'))
+
+
+def on_starting(server):
+    if os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.endswith('.json'):
+                os.remove(os.path.join(metrics_dir, name))
+
+
+# Application: every worker calls the factory before accepting connections,
+# and with WARM_UP=1 the factory loads the scroll indexes first.
+# A module given on the command line (gunicorn app:app) overrides this.
+wsgi_app = 'app:create_app()'
+
 # Process naming
 proc_name = 'staffview'
 
@@ -14,9 +14,9 @@ PING_INTERVAL = 14 * 60  # 14 minutes in seconds
 def ping_service():
     """Ping the service to keep it alive"""
     try:
-        response = requests.get(f"{WIZARDVIEW_URL}/api/structure", timeout=30)
+        response = requests.get(f"{WIZARDVIEW_URL}/health", timeout=30)
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        if response.status_code in [200, 302]:  # 302 is redirect to login
+        if response.status_code == 200:
             print(f"[{timestamp}] ✓ Service is alive (status: {response.status_code})")
         else:
             print(f"[{timestamp}] ⚠ Unexpected status: {response.status_code}")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+WizardView bundle summary
+Which tenants and charts changed in a regression run, and by how much
+
+Usage:
+    python summarize.py path/to/extracted-bundle [--top 20] [--workers 8]
+    python summarize.py path/to/bundle.zip --ndjson > summary.ndjson
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import app
+
+
+def print_table(summary, top):
+    """Human readable ranking from the closing summary record"""
+    print(f"{summary['pairs']} pairs, {summary['changed_pairs']} changed, "
+          f"{summary['failed']} failed, {summary['elapsed']:.1f}s ({summary['engine']})")
+    if not summary['top']:
+        return
+
+    print()
+    print(f"{'tenant':>8}  {'files changed':>13}  {'added':>8}  {'removed':>8}  {'modified':>8}")
+    for folder_id, totals in summary['folders'].items():
+        if not totals['changed']:
+            continue
+        print(f"{folder_id:>8}  {totals['changed']:>6}/{totals['files']:<6}  {totals['added']:>8}  "
+              f"{totals['removed']:>8}  {totals['modified']:>8}")
+
+    print()
+    print(f"{'tenant':>8}  {'scroll':<30}  {'changed':>8}  {'share':>7}")
+    for record in summary['top'][:top]:
+        print(f"{record['folder']:>8}  {record['file']:<30}  {record['changed']:>8}  {record['change_ratio']:>7.2%}")
+
+
+def summarize(bundle_dir, args):
+    summary = None
+    for record in app.iter_bundle_summary(bundle_dir, args.engine, args.workers, top=max(args.top, 1)):
+        if args.ndjson:
+            print(json.dumps(record, separators=(',', ':')), flush=True)
+        elif record['type'] == 'pair' or record['type'] == 'error':
+            print(f"\r{record['done']} pairs done", end='', file=sys.stderr, flush=True)
+        if record['type'] == 'summary':
+            summary = record
+
+    if not args.ndjson:
+        print(file=sys.stderr)
+        print_table(summary, args.top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank the pairs of a regression bundle by how much they changed")
+    parser.add_argument('bundle', type=Path, help='extracted bundle directory or bundle ZIP')
+    parser.add_argument('--engine', choices=sorted(app.DIFF_ENGINES), default=app.DEFAULT_DIFF_ENGINE)
+    parser.add_argument('--workers', type=int, default=app.STATS_INDEX_WORKERS, help='diff processes')
+    parser.add_argument('--top', type=int, default=20, help='pairs to list')
+    parser.add_argument('--ndjson', action='store_true', help='stream raw records instead of a table')
+    args = parser.parse_args()
+
+    if not args.bundle.exists():
+        parser.error(f"{args.bundle} does not exist")
+
+    if args.bundle.is_dir():
+        summarize(args.bundle, args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp, open(args.bundle, 'rb') as stream:
+        # Plain files: the scrolls of a one-off run stay out of the server's blob store
+        app.ingest_artifact(stream, Path(tmp), blobs=False)
+        summarize(Path(tmp), args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""Shared setup: point app.py's stores at a scratch directory before it is imported"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix='wizardview-tests-')
+for name in ('DIFF_CACHE_DIR', 'METRICS_DIR', 'BLOBS_DIR'):
+    os.environ.setdefault(name, os.path.join(_scratch, name.lower()))
+os.environ.setdefault('JOB_RUNNER_THREADS', '0')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+@pytest.fixture
+def blob_store(tmp_path, monkeypatch):
+    """An empty blob store for one test"""
+    blobs = tmp_path / 'blobs'
+    blobs.mkdir()
+    monkeypatch.setattr(app, 'BLOBS_DIR', blobs)
+    return blobs
@@ -0,0 +1,69 @@
+import errno
+import hashlib
+import os
+import warnings
+import zipfile
+
+import pytest
+
+import app
+
+
+def ingest(zip_path, target, **kwargs):
+    with open(zip_path, 'rb') as stream:
+        return app.ingest_artifact(stream, target, **kwargs)
+
+
+def test_duplicate_member_does_not_write_through_shared_blob(tmp_path, blob_store):
+    first, second = tmp_path / 'first.zip', tmp_path / 'second.zip'
+    with zipfile.ZipFile(first, 'w') as zf:
+        zf.writestr('500/X-main', 'aaa\n')
+    with zipfile.ZipFile(second, 'w') as zf, warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # zipfile warns about the duplicate name
+        zf.writestr('600/X-main', 'aaa\n')
+        zf.writestr('600/X-main', 'bbb\n')
+
+    ingest(first, tmp_path / 'one')
+    ingest(second, tmp_path / 'two')
+
+    assert (tmp_path / 'one' / '500' / 'X-main').read_text() == 'aaa\n'
+    assert (tmp_path / 'two' / '600' / 'X-main').read_text() == 'bbb\n'
+    assert app._blob_path(hashlib.sha256(b'aaa\n').hexdigest()).read_text() == 'aaa\n'
+    assert not list((tmp_path / 'two' / '600').glob('.*.tmp'))
+
+
+@pytest.mark.parametrize('code', [errno.EPERM, errno.EACCES, errno.EXDEV, errno.EMLINK, errno.ENOTSUP])
+def test_link_falls_back_to_copy(tmp_path, monkeypatch, code):
+    blob = tmp_path / 'blob'
+    blob.write_text('aaa\n')
+    target = tmp_path / 'target'
+    target.write_text('old\n')
+
+    def refuse(src, dst):
+        raise OSError(code, os.strerror(code))
+    monkeypatch.setattr(app.os, 'link', refuse)
+
+    app._link_blob(blob, target)
+    assert target.read_text() == 'aaa\n'
+    assert blob.read_text() == 'aaa\n'
+    assert os.stat(target).st_ino != os.stat(blob).st_ino
+
+
+def test_link_of_swept_blob_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        app._link_blob(tmp_path / 'missing', tmp_path / 'target')
+    assert not list(tmp_path.iterdir())
+
+
+def test_plain_ingest_leaves_blob_store_empty(tmp_path, blob_store):
+    bundle = tmp_path / 'bundle.zip'
+    with zipfile.ZipFile(bundle, 'w') as zf:
+        zf.writestr('500/X-main', 'aaa\n')
+        zf.writestr('500/X-feat', 'bbb\n')
+
+    summary = ingest(bundle, tmp_path / 'plain', blobs=False)
+
+    assert summary['members'] == 2
+    assert (tmp_path / 'plain' / '500' / 'X-feat').read_text() == 'bbb\n'
+    assert app.load_fingerprints(tmp_path / 'plain')['files']['500/X-main'] == hashlib.sha256(b'aaa\n').hexdigest()
+    assert not list(blob_store.iterdir())